@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import sync, table_cache, tokens
+        table_cache.conectar_senales()
+        sync.conectar_senales()
+        tokens.conectar_senales()
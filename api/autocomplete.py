@@ -0,0 +1,79 @@
+"""
+Búsqueda paginada para los campos relacionados de formularios y filtros.
+
+Un `<select>` con todas las filas de `User`, `Residente` o `Cuota` hace que
+dibujar un formulario cueste una query (más el `__str__` de cada fila, con sus
+propias queries) proporcional al tamaño de la tabla. En su lugar, los campos
+relacionados se dibujan como un input de ID con autocompletado que consulta:
+
+    GET /api/autocompletar/<recurso>/?q=<texto>&pagina=<n>
+    -> {"resultados": [{"id": 1, "texto": "..."}], "pagina": 1, "siguiente": true}
+
+Cada página es una sola query de `PAGE_SIZE` filas (con los `select_related`
+que necesita el `__str__` del modelo) y no se cuenta el total: se pide una fila
+extra para saber si hay página siguiente. La validación del ID enviado sigue
+siendo la del campo: un `get(pk=...)` al guardar o filtrar.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from .models import AreaComun, Cuota, PersonalMantenimiento, Residente, Seguridad, UnidadHabitacional
+
+DEFAULTS = {
+    'PAGE_SIZE': 20,
+}
+
+
+def config(clave):
+    return getattr(settings, 'AUTOCOMPLETE', {}).get(clave, DEFAULTS[clave])
+
+
+class Buscador:
+    """Cómo buscar y mostrar un modelo en el autocompletado."""
+
+    def __init__(self, modelo, busqueda, relacionados=()):
+        self.modelo = modelo
+        self.busqueda = busqueda
+        self.relacionados = relacionados
+
+    def queryset(self, q):
+        queryset = self.modelo._default_manager.select_related(*self.relacionados).order_by('pk')
+        q = q.strip()
+        if not q:
+            return queryset
+        condicion = Q()
+        for campo in self.busqueda:
+            condicion |= Q(**{f'{campo}__icontains': q})
+        if q.isdigit():
+            condicion |= Q(pk=int(q))
+        return queryset.filter(condicion)
+
+
+BUSCADORES = {
+    b.modelo._meta.model_name: b for b in (
+        Buscador(User, ('username', 'first_name', 'last_name', 'email')),
+        Buscador(UnidadHabitacional, ('numero', 'torre')),
+        Buscador(AreaComun, ('nombre',)),
+        Buscador(Residente, ('user__username', 'user__first_name', 'user__last_name', 'unidad_habitacional__numero'),
+                 ('user', 'unidad_habitacional')),
+        Buscador(Cuota, ('mes', 'residente__user__username', 'residente__user__last_name'), ('residente__user',)),
+        Buscador(Seguridad, ('user__username', 'user__first_name', 'user__last_name'), ('user',)),
+        Buscador(PersonalMantenimiento, ('user__username', 'user__first_name', 'user__last_name', 'especialidad'),
+                 ('user',)),
+    )
+}
+
+
+def recurso(modelo):
+    """Nombre del recurso de autocompletado de `modelo`, o None si no tiene."""
+    nombre = modelo._meta.model_name
+    return nombre if nombre in BUSCADORES else None
+
+
+def buscar(nombre, q='', pagina=1):
+    """(resultados, hay_siguiente) de la página `pagina` (desde 1)."""
+    tamano = config('PAGE_SIZE')
+    inicio = (pagina - 1) * tamano
+    filas = list(BUSCADORES[nombre].queryset(q)[inicio:inicio + tamano + 1])
+    return [{'id': fila.pk, 'texto': str(fila)} for fila in filas[:tamano]], len(filas) > tamano
@@ -0,0 +1,273 @@
+"""
+Peticiones agrupadas: varias llamadas a la API en un solo POST /api/batch/.
+
+    POST /api/batch/
+    {"peticiones": [
+        {"id": "cuotas", "method": "GET", "path": "/api/cuotas/?estado=pendiente"},
+        {"id": "ticket", "method": "POST", "path": "/api/tickets-mantenimiento/", "body": {...}},
+        {"id": "visitas", "method": "GET", "path": "/api/visitas/", "headers": {"If-None-Match": "W/\\"...\\""}}
+    ]}
+
+Cada sub-petición se resuelve con el urlconf y se ejecuta en el mismo proceso
+llamando directamente a la vista: sin volver a pasar por el stack de middleware
+ni por la red. Hereda del POST original las cabeceras (Authorization, cookies),
+el usuario y la sesión; sus `headers` propios se agregan encima.
+
+Orden y paralelismo:
+    - Los GET/HEAD consecutivos son independientes y se ejecutan en paralelo en
+      un pool de hilos (`PARALLEL_WORKERS`).
+    - Cada escritura es una barrera: se ejecuta sola, en orden, y las lecturas
+      posteriores del mismo batch van al primario (lectura después de escritura).
+    - Dentro de una transacción abierta (ATOMIC_REQUESTS, tests) todo se ejecuta
+      en serie en el hilo de la petición, que comparte conexión y transacción.
+
+Las sub-peticiones en serie usan la conexión de la petición; las paralelas, la
+conexión persistente de cada hilo del pool (mismo alias y `CONN_MAX_AGE`).
+Todas comparten la caché de respuestas (`api.table_cache`) y el ruteo por carga
+(`api.db_routing`), y cada una pasa por el descarte de carga (`api.load_shedding`)
+con el nivel de su propia vista: un batch no saltea el límite de los reportes.
+Las paralelas miden en sus propias estadísticas y rama de la traza, que el hilo
+de la petición suma al terminar (ni RequestStats ni la pila de spans se
+comparten entre hilos).
+
+Respuesta: {"respuestas": [{"id", "status", "headers", "body"}, ...]} en el
+mismo orden que las peticiones (`body` es null en 304 y en descargas que no son JSON).
+"""
+import contextvars
+import io
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connections
+from django.urls import Resolver404, resolve
+
+from . import db_routing, load_shedding, metrics, tracing
+from .middleware import PerformanceMetricsMiddleware, resolver_vista
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_REQUESTS': 20,
+    'PARALLEL_WORKERS': 4,
+    'PREFIX': '/api/',
+    # Cabeceras de la sub-respuesta que se devuelven al cliente
+    'HEADERS': ('ETag', 'Last-Modified', 'Location'),
+}
+
+METODOS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Cabeceras del POST agrupado que no se heredan: son del batch, no de cada sub-petición
+NO_HEREDADAS = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_X_PROFILE')
+
+
+def config(clave):
+    return getattr(settings, 'BATCH', {}).get(clave, DEFAULTS[clave])
+
+
+class BatchInvalido(Exception):
+    """El cuerpo del batch no tiene la forma esperada."""
+
+
+# ========================
+# VALIDACIÓN DEL BATCH
+# ========================
+
+def normalizar(datos):
+    """Lista de especificaciones {'id', 'method', 'path', 'body', 'headers'} o `BatchInvalido`."""
+    peticiones = datos.get('peticiones') if isinstance(datos, dict) else datos
+    if not isinstance(peticiones, list) or not peticiones:
+        raise BatchInvalido('Se esperaba "peticiones": una lista no vacía.')
+    if len(peticiones) > config('MAX_REQUESTS'):
+        raise BatchInvalido(f"El batch supera el máximo de {config('MAX_REQUESTS')} peticiones.")
+    especificaciones = []
+    for indice, peticion in enumerate(peticiones):
+        if not isinstance(peticion, dict) or not isinstance(peticion.get('path'), str):
+            raise BatchInvalido(f'Petición {indice}: se requiere "path".')
+        metodo = str(peticion.get('method', 'GET')).upper()
+        if metodo not in METODOS:
+            raise BatchInvalido(f'Petición {indice}: método no soportado "{metodo}".')
+        if not peticion['path'].startswith(config('PREFIX')):
+            raise BatchInvalido(f"Petición {indice}: la ruta debe empezar con {config('PREFIX')}.")
+        headers = peticion.get('headers') or {}
+        if not isinstance(headers, dict):
+            raise BatchInvalido(f'Petición {indice}: "headers" debe ser un objeto.')
+        especificaciones.append({
+            'id': peticion.get('id', indice),
+            'method': metodo,
+            'path': peticion['path'],
+            'body': peticion.get('body'),
+            'headers': headers,
+        })
+    return especificaciones
+
+
+def _grupos(especificaciones):
+    """Índices agrupados: lecturas consecutivas juntas, cada escritura sola."""
+    grupos, lecturas = [], []
+    for indice, especificacion in enumerate(especificaciones):
+        if especificacion['method'] in db_routing.METODOS_SEGUROS:
+            lecturas.append(indice)
+            continue
+        if lecturas:
+            grupos.append(lecturas)
+            lecturas = []
+        grupos.append([indice])
+    if lecturas:
+        grupos.append(lecturas)
+    return grupos
+
+
+# ========================
+# EJECUCIÓN DE UNA SUB-PETICIÓN
+# ========================
+
+def _subpeticion(padre, especificacion):
+    ruta, _, query = especificacion['path'].partition('?')
+    cuerpo = b'' if especificacion['body'] is None else json.dumps(especificacion['body']).encode()
+    environ = {
+        **{k: v for k, v in padre.META.items() if not k.startswith('wsgi.') and k not in NO_HEREDADAS},
+        'REQUEST_METHOD': especificacion['method'],
+        'PATH_INFO': ruta,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(cuerpo)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(cuerpo),
+    }
+    for nombre, valor in especificacion['headers'].items():
+        environ['HTTP_' + nombre.upper().replace('-', '_')] = str(valor)
+    sub = WSGIRequest(environ)
+    # Ya autenticada (y verificada contra CSRF) como parte del POST agrupado
+    sub.user = getattr(padre, 'user', None)
+    sub.session = getattr(padre, 'session', None)
+    sub._dont_enforce_csrf_checks = True
+    return sub
+
+
+def _cuerpo(response):
+    if response.status_code == 304:
+        return None
+    datos = getattr(response, 'data', None)
+    if datos is not None:
+        # Respuesta de DRF sin renderizar: el renderer del batch la serializa una sola vez
+        return datos
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content)
+    return None
+
+
+def ejecutar_una(padre, especificacion, forzar_primario=False):
+    __tracebackhide__ = True  # Las queries se atribuyen a la vista resuelta
+    sub = _subpeticion(padre, especificacion)
+    try:
+        coincidencia = resolve(sub.path_info)
+    except Resolver404:
+        return {'status': 404, 'headers': {}, 'body': {'detail': 'No encontrado.'}}
+    if coincidencia.url_name == 'batch':
+        return {'status': 400, 'headers': {}, 'body': {'detail': 'No se permiten batches anidados.'}}
+
+    vista, accion = sub._metricas_vista = resolver_vista(coincidencia.func, sub.method)
+    nivel = load_shedding.clasificar(vista, accion) if load_shedding.config('ENABLED') else None
+    if nivel is not None:
+        decision = load_shedding.limitador.admitir(nivel, load_shedding.cliente(sub, nivel))
+        load_shedding.registrar(nivel, decision)
+        if not decision.admitida:
+            return {'status': decision.status, 'headers': {'Retry-After': str(decision.retry_after)}, 'body': decision.cuerpo(nivel)}
+    carga = db_routing.clasificar(accion, sub.method, forzar_primario or db_routing.primario_forzado(sub))
+    token = db_routing.activar(carga)
+    inicio = time.perf_counter()
+    try:
+        with tracing.span('batch.subpeticion', **{'http.route': f'{vista}.{accion}', 'http.method': sub.method}):
+            response = coincidencia.func(sub, *coincidencia.args, **coincidencia.kwargs)
+    except Exception:
+        logger.exception('Error en sub-petición %s %s', sub.method, especificacion['path'])
+        return {'status': 500, 'headers': {}, 'body': {'detail': 'Error interno.'}}
+    finally:
+        db_routing.restaurar(token)
+        if nivel is not None:
+            load_shedding.limitador.liberar(nivel, time.perf_counter() - inicio)
+    return {
+        'status': response.status_code,
+        'headers': {h: response[h] for h in config('HEADERS') if response.has_header(h)},
+        'body': _cuerpo(response),
+    }
+
+
+# ========================
+# EJECUCIÓN DEL BATCH
+# ========================
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=config('PARALLEL_WORKERS'), thread_name_prefix='batch')
+        return _pool
+
+
+def _en_hilo(padre, especificacion, forzar_primario, rama):
+    """
+    Sub-petición en un hilo del pool, con la conexión persistente de ese hilo.
+    Retorna (respuesta, estadísticas propias o None, rama de la traza o None).
+    """
+    stats = metrics.start_request()[0] if metrics.current_stats() is not None else None
+    if rama is not None:
+        tracing.activar(rama)
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            # Las conexiones del hilo no tienen los wrappers que instala el middleware
+            for conn in connections.all():
+                if stats is not None:
+                    stack.enter_context(conn.execute_wrapper(PerformanceMetricsMiddleware._medir_query))
+                if rama is not None:
+                    stack.enter_context(conn.execute_wrapper(tracing.medir_query))
+            return ejecutar_una(padre, especificacion, forzar_primario), stats, rama
+    finally:
+        close_old_connections()
+
+
+def en_transaccion():
+    return any(conn.in_atomic_block for conn in connections.all(initialized_only=True))
+
+
+def ejecutar(padre, especificaciones):
+    """Respuestas alineadas con `especificaciones`; escrituras en orden, lecturas en paralelo."""
+    respuestas = [None] * len(especificaciones)
+    paralelo = config('PARALLEL_WORKERS') > 1 and not en_transaccion()
+    escribio = False
+    for grupo in _grupos(especificaciones):
+        if paralelo and len(grupo) > 1:
+            # Cada tarea corre en una copia del contexto (carga de BD) con sus propias
+            # estadísticas y rama de la traza; se suman acá, en el hilo de la petición
+            traza = tracing.current_trace()
+            futuros = {
+                indice: pool().submit(
+                    contextvars.copy_context().run, _en_hilo, padre, especificaciones[indice], escribio,
+                    traza.rama() if traza is not None else None,
+                )
+                for indice in grupo
+            }
+            for indice, futuro in futuros.items():
+                respuestas[indice], stats, rama = futuro.result()
+                if stats is not None:
+                    metrics.current_stats().sumar(stats)
+                if rama is not None:
+                    traza.unir(rama)
+        else:
+            for indice in grupo:
+                respuestas[indice] = ejecutar_una(padre, especificaciones[indice], escribio)
+        if especificaciones[grupo[0]]['method'] not in db_routing.METODOS_SEGUROS:
+            escribio = escribio or respuestas[grupo[0]]['status'] < 400
+    respuestas = [{'id': e['id'], **r} for e, r in zip(especificaciones, respuestas)]
+    return respuestas, escribio
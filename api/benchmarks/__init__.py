@@ -0,0 +1,112 @@
+"""
+Micro-benchmarks de las piezas calientes de la API, sin pasar por HTTP.
+
+Los casos se registran con el decorador `caso` (ver `casos.py`) y se ejecutan con
+`python manage.py benchmark_micro`. Cada caso:
+    1. Se prepara una vez sobre un dataset sintético de `filas` filas
+       (sembrado en una transacción que se revierte al terminar).
+    2. Calibra cuántas llamadas caben en ~`OBJETIVO_REPETICION` segundos.
+    3. Hace `calentamiento` repeticiones descartadas y luego `repeticiones`
+       mediciones con el GC desactivado (igual que timeit).
+    4. Reporta mediana, IQR y un intervalo de confianza del 95% de la media.
+       Con `tamano=True` el callable retorna bytes y también se reporta su
+       largo; `crudo` nombra el caso con el contenido sin comprimir, para
+       mostrar la proporción.
+
+La comparación con el baseline solo marca regresión/mejora cuando el cambio
+supera la tolerancia y los intervalos de confianza no se solapan.
+"""
+import gc
+import math
+import statistics
+import time
+
+OBJETIVO_REPETICION = 0.05  # segundos por repetición tras la calibración
+
+# t de Student (dos colas, 95%) por grados de libertad; para df > 30 se usa 1.96
+_T_95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31, 9: 2.26, 10: 2.23,
+         12: 2.18, 15: 2.13, 20: 2.09, 25: 2.06, 30: 2.04}
+
+
+class Caso:
+    def __init__(self, nombre, filas, preparar, repeticiones=20, calentamiento=3, tamano=False, crudo=None):
+        self.nombre = nombre
+        self.filas = filas
+        self.preparar = preparar
+        self.repeticiones = repeticiones
+        self.calentamiento = calentamiento
+        self.tamano = tamano
+        self.crudo = crudo
+
+
+REGISTRO = []
+
+
+def caso(nombre, filas, **opciones):
+    """
+    Registra `preparar(datos) -> callable`. `datos` es el resultado de
+    `api.datasets.sembrar_completo(filas)`; el callable retornado es lo que se mide.
+    """
+    def decorador(preparar):
+        REGISTRO.append(Caso(nombre, filas, preparar, **opciones))
+        return preparar
+    return decorador
+
+
+def _t_95(df):
+    if df > 30:
+        return 1.96
+    return _T_95[max(k for k in _T_95 if k <= df)]
+
+
+def medir(funcion, repeticiones, calentamiento):
+    """Retorna los segundos por llamada de cada repetición."""
+    llamadas = 1
+    while True:  # Calibración (cuenta como calentamiento)
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            funcion()
+        if time.perf_counter() - inicio >= OBJETIVO_REPETICION or llamadas >= 1_000_000:
+            break
+        llamadas *= 10
+
+    for _ in range(calentamiento):
+        for _ in range(llamadas):
+            funcion()
+
+    muestras = []
+    gc_activo = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for _ in range(llamadas):
+                funcion()
+            muestras.append((time.perf_counter() - inicio) / llamadas)
+    finally:
+        if gc_activo:
+            gc.enable()
+    return muestras
+
+
+def resumir(muestras):
+    cuartiles = statistics.quantiles(muestras, n=4) if len(muestras) > 1 else [muestras[0]] * 3
+    media = statistics.fmean(muestras)
+    desvio = statistics.stdev(muestras) if len(muestras) > 1 else 0.0
+    margen = _t_95(len(muestras) - 1) * desvio / math.sqrt(len(muestras)) if len(muestras) > 1 else 0.0
+    return {
+        'n': len(muestras),
+        'mediana': statistics.median(muestras),
+        'iqr': cuartiles[2] - cuartiles[0],
+        'media': media,
+        'ic95': [media - margen, media + margen],
+    }
+
+
+def comparar(actual, base, tolerancia):
+    """'regresion', 'mejora' o 'igual' respecto del baseline."""
+    cambio = actual['mediana'] / base['mediana'] - 1
+    solapan = actual['ic95'][0] <= base['ic95'][1] and base['ic95'][0] <= actual['ic95'][1]
+    if abs(cambio) <= tolerancia or solapan:
+        return 'igual', cambio
+    return ('regresion' if cambio > 0 else 'mejora'), cambio
@@ -0,0 +1,132 @@
+"""
+Casos de micro-benchmark: serializers, reportes y búsquedas de portería.
+"""
+import itertools
+import random
+from types import SimpleNamespace
+
+from rest_framework.renderers import JSONRenderer as JSONRendererDRF
+
+from api import compression, renderers, tokens
+from api.models import Residente, Pago, VehiculoAutorizado, Visita, normalizar_placa
+from api.report_utils import generar_reporte_finanzas_excel, generar_reporte_seguridad_pdf
+from api.fast_serialization import plan_para
+from api.serializers import ResidenteSerializer, PagoSerializer
+
+from . import caso
+
+ESCALA_BASE = 20_000  # 1000 residentes, ~10k pagos, 20k visitas y vehículos
+
+
+# ========================
+# SERIALIZERS
+# ========================
+
+for n in (100, 1000):
+    @caso(f'serializer.residente[{n}]', filas=ESCALA_BASE)
+    def _residentes(datos, n=n):
+        instancias = list(Residente.objects.select_related('user', 'unidad_habitacional')[:n])
+        return lambda: ResidenteSerializer(instancias, many=True).data
+
+    @caso(f'serializer.pago[{n}]', filas=ESCALA_BASE)
+    def _pagos(datos, n=n):
+        instancias = list(Pago.objects.select_related('cuota__residente__user')[:n])
+        return lambda: PagoSerializer(instancias, many=True).data
+
+    @caso(f'serializer.pago.rapido[{n}]', filas=ESCALA_BASE)
+    def _pagos_rapido(datos, n=n):
+        plan = plan_para(PagoSerializer())
+        consulta = Pago.objects.order_by('pk')[:n]
+        return lambda: plan.filas(consulta)
+
+
+# ========================
+# RENDER Y COMPRESIÓN
+# ========================
+
+def _pagos_serializados(n):
+    instancias = list(Pago.objects.select_related('cuota__residente__user')[:n])
+    return PagoSerializer(instancias, many=True).data
+
+
+@caso('render.pago.drf[1000]', filas=ESCALA_BASE, tamano=True)
+def _render_drf(datos):
+    data = _pagos_serializados(1000)
+    return lambda: JSONRendererDRF().render(data)
+
+
+@caso('render.pago.orjson[1000]', filas=ESCALA_BASE, tamano=True)
+def _render_orjson(datos):
+    data = _pagos_serializados(1000)
+    return lambda: renderers.JSONRenderer().render(data)
+
+
+if renderers.msgpack is not None:
+    @caso('render.pago.msgpack[1000]', filas=ESCALA_BASE, tamano=True)
+    def _render_msgpack(datos):
+        data = _pagos_serializados(1000)
+        return lambda: renderers.MessagePackRenderer().render(data)
+
+
+# Formato -> (renderer, caso de render con el mismo contenido sin comprimir)
+FORMATOS = {
+    'json': (renderers.JSONRenderer, 'render.pago.orjson[1000]'),
+    **({'msgpack': (renderers.MessagePackRenderer, 'render.pago.msgpack[1000]')} if renderers.msgpack is not None else {}),
+}
+
+for (formato, (renderer, crudo)), codificacion in itertools.product(
+        FORMATOS.items(), ('gzip', 'br') if compression.brotli is not None else ('gzip',)):
+    @caso(f'compresion.pago.{formato}.{codificacion}[1000]', filas=ESCALA_BASE, tamano=True, crudo=crudo)
+    def _comprimir(datos, renderer=renderer, codificacion=codificacion):
+        contenido = renderer().render(_pagos_serializados(1000))
+        return lambda: compression.comprimir(contenido, codificacion)
+
+
+# ========================
+# REPORTES
+# ========================
+
+for filas in (1_000, 5_000):
+    caso(f'reporte.finanzas_excel[{filas}]', filas=filas, repeticiones=5, calentamiento=1)(
+        lambda datos: generar_reporte_finanzas_excel
+    )
+    caso(f'reporte.seguridad_pdf[{filas}]', filas=filas, repeticiones=10)(
+        lambda datos: generar_reporte_seguridad_pdf
+    )
+
+
+# ========================
+# PORTERÍA (placas y QR)
+# ========================
+
+@caso('placa.normalizar[1000]', filas=ESCALA_BASE)
+def _normalizar(datos):
+    rng = random.Random(7)
+    lecturas = [f' {p[:4]}-{p[4:].lower()} ' for p in (v.placa for v in rng.sample(list(VehiculoAutorizado.objects.all()), 1000))]
+    return lambda: [normalizar_placa(lectura) for lectura in lecturas]
+
+
+@caso('placa.lookup', filas=ESCALA_BASE)
+def _lookup_placa(datos):
+    placas = itertools.cycle(VehiculoAutorizado.objects.values_list('placa', flat=True)[:500])
+    consulta = VehiculoAutorizado.objects.select_related('residente__user', 'residente__unidad_habitacional')
+    return lambda: consulta.get(placa=next(placas), autorizado=True)
+
+
+@caso('qr.lookup', filas=ESCALA_BASE)
+def _lookup_qr(datos):
+    codigos = itertools.cycle(Visita.objects.values_list('codigo_qr_acceso', flat=True)[:500])
+    consulta = Visita.objects.select_related('residente__user', 'residente__unidad_habitacional')
+    return lambda: consulta.get(codigo_qr_acceso=next(codigos))
+
+
+# ========================
+# AUTENTICACIÓN
+# ========================
+
+@caso('token.verificar', filas=ESCALA_BASE)
+def _verificar_token(datos):
+    user = Residente.objects.select_related('user').first().user
+    request = SimpleNamespace(META={'HTTP_AUTHORIZATION': f"Bearer {tokens.emitir(user)['access']}"})
+    autenticacion = tokens.TokenFirmadoAuthentication()
+    return lambda: autenticacion.authenticate(request)
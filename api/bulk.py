@@ -0,0 +1,221 @@
+"""
+Alta y actualización masiva (bulk) sobre los ModelViewSets.
+
+    POST  /api/<recurso>/   con una lista JSON  -> bulk_create
+    PATCH /api/<recurso>/   con una lista JSON  -> bulk_update parcial (cada ítem con "id", sin repetir)
+
+La validación reutiliza el serializer de la vista (un solo serializer hijo para
+todos los ítems, como `ListSerializer`), pero antes de recorrer el lote:
+    - cada `PrimaryKeyRelatedField` resuelve todas sus PKs con un `in_bulk` (una query IN),
+    - cada `UniqueValidator` trae los valores ya existentes con una query IN y
+      además detecta duplicados dentro del mismo lote. Los campos únicos del
+      modelo sin validador en el serializer (p. ej. los OneToOne `user_id`
+      declarados a mano) reciben uno: si no, el duplicado llega a la base y el
+      lote termina en un IntegrityError en lugar del 400 por índice. Los
+      valores se comparan ya normalizados por el `validate_<campo>` del
+      serializer (p. ej. "abc-123" y "ABC123" son la misma placa).
+
+Si algún ítem es inválido no se escribe nada y se responde 400 con los errores
+por índice; si todos son válidos se escriben con `bulk_create`/`bulk_update`
+en una sola transacción.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.validators import UniqueValidator
+
+DEFAULTS = {
+    'MAX_ITEMS': 10_000,
+    'BATCH_SIZE': 1000,
+}
+
+
+def config(clave):
+    return getattr(settings, 'BULK', {}).get(clave, DEFAULTS[clave])
+
+
+class LoteInvalido(Exception):
+    """Errores del lote: lista de {'indice': i, 'errores': {...}}."""
+
+    def __init__(self, errores):
+        super().__init__(errores)
+        self.errores = errores
+
+
+# ========================
+# PRE-RESOLUCIÓN DEL LOTE
+# ========================
+
+def _valores_crudos(items, nombre):
+    return [item[nombre] for item in items if isinstance(item, dict) and item.get(nombre) not in (None, '')]
+
+
+def _fk_desde_mapa(campo, objetos, pk):
+    """Reemplazo de `PrimaryKeyRelatedField.to_internal_value` con los mismos errores."""
+    def to_internal_value(data):
+        if isinstance(data, bool):
+            campo.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            clave = pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            campo.fail('incorrect_type', data_type=type(data).__name__)
+        objeto = objetos.get(clave)
+        if objeto is None:
+            campo.fail('does_not_exist', pk_value=data)
+        return objeto
+    return to_internal_value
+
+
+def _resolver_fk(campo, items):
+    modelo = campo.get_queryset().model
+    claves = set()
+    for valor in _valores_crudos(items, campo.field_name):
+        try:
+            claves.add(modelo._meta.pk.to_python(valor))
+        except (DjangoValidationError, TypeError, ValueError):
+            continue  # El ítem fallará con incorrect_type al validarse
+    objetos = campo.get_queryset().in_bulk(claves) if claves else {}
+    campo.to_internal_value = _fk_desde_mapa(campo, objetos, modelo._meta.pk)
+
+
+def _clave(valor):
+    return getattr(valor, 'pk', valor)  # Campos relacionados: la instancia resuelta vale por su pk
+
+
+def _normalizador(campo):
+    """
+    `validate_<campo>` del serializer (p. ej. `normalizar_placa`): corre después
+    de los validadores, así que la unicidad se compara con el valor que se guardará.
+    """
+    return getattr(campo.parent, f'validate_{campo.field_name}', None) or (lambda valor: valor)
+
+
+class UnicoEnLote:
+    """`UniqueValidator` contra los valores existentes precargados y el resto del lote."""
+    requires_context = True
+
+    def __init__(self, validador, campo, items):
+        self.validador = validador
+        self.campo_modelo = campo.source
+        self.normalizar = _normalizador(campo)
+        internos = []
+        for valor in _valores_crudos(items, campo.field_name):
+            try:
+                internos.append(self.normalizar(campo.to_internal_value(valor)))
+            except serializers.ValidationError:
+                continue
+        self.existentes = dict(
+            validador.queryset.filter(**{f'{self.campo_modelo}__in': internos})
+            .values_list(self.campo_modelo, 'pk')
+        ) if internos else {}
+        self.vistos = {}
+
+    def __call__(self, valor, campo):
+        instancia = campo.parent.instance
+        pk_propio = instancia.pk if instancia is not None else None
+        valor = _clave(self.normalizar(valor))
+        existente = self.existentes.get(valor)
+        if existente is not None and existente != pk_propio:
+            raise serializers.ValidationError(self.validador.message, code='unique')
+        if valor in self.vistos and (pk_propio is None or self.vistos[valor] != pk_propio):
+            raise serializers.ValidationError('Valor repetido dentro del lote.', code='unique')
+        self.vistos[valor] = pk_propio
+
+
+def _unico_en_modelo(modelo, campo):
+    """True si la columna detrás de `campo` es única (unique=True u OneToOne), salvo la pk."""
+    try:
+        campo_modelo = modelo._meta.get_field(campo.source)
+    except FieldDoesNotExist:
+        return False
+    return campo_modelo.concrete and campo_modelo.unique and not campo_modelo.primary_key
+
+
+def preparar(serializer, items):
+    """Instala en los campos del serializer las búsquedas precargadas del lote."""
+    modelo = serializer.Meta.model
+    for campo in serializer._writable_fields:
+        if isinstance(campo, PrimaryKeyRelatedField):
+            _resolver_fk(campo, items)
+        validadores = campo.validators
+        if not any(isinstance(v, UniqueValidator) for v in validadores) and _unico_en_modelo(modelo, campo):
+            validadores = [*validadores, UniqueValidator(queryset=modelo._default_manager.all())]
+        if any(isinstance(v, UniqueValidator) for v in validadores):
+            campo.validators = [
+                UnicoEnLote(v, campo, items) if isinstance(v, UniqueValidator) else v
+                for v in validadores
+            ]
+
+
+# ========================
+# VALIDACIÓN
+# ========================
+
+def _verificar_lista(items):
+    if not isinstance(items, list) or not items:
+        raise LoteInvalido([{'indice': None, 'errores': {'non_field_errors': ['Se esperaba una lista no vacía.']}}])
+    if len(items) > config('MAX_ITEMS'):
+        raise LoteInvalido([{'indice': None, 'errores': {
+            'non_field_errors': [f"El lote supera el máximo de {config('MAX_ITEMS')} ítems."]
+        }}])
+
+
+def validar(serializer, items, instancias=None):
+    """
+    Valida el lote con un único serializer hijo. `instancias` (lista alineada con
+    `items`) activa la validación parcial de actualizaciones.
+    Retorna la lista de `validated_data` o lanza `LoteInvalido`.
+    """
+    _verificar_lista(items)
+    preparar(serializer, items)
+    modelo = serializer.Meta.model
+    validados, errores = [], []
+    for indice, item in enumerate(items):
+        serializer.instance = instancias[indice] if instancias is not None else None
+        serializer.partial = instancias is not None
+        serializer.initial_data = item
+        try:
+            datos = serializer.run_validation(item)
+        except serializers.ValidationError as exc:
+            errores.append({'indice': indice, 'errores': exc.detail})
+            continue
+        m2m = [k for k in datos if modelo._meta.get_field(k).many_to_many]
+        if m2m:
+            errores.append({'indice': indice, 'errores': {k: ['No soportado en operaciones masivas.'] for k in m2m}})
+            continue
+        validados.append(datos)
+    serializer.instance, serializer.partial = None, False
+    if errores:
+        raise LoteInvalido(errores)
+    return validados
+
+
+def instancias_para_actualizar(queryset, items):
+    """Instancias alineadas con `items` (una query); lanza `LoteInvalido` por ids ausentes o repetidos."""
+    _verificar_lista(items)
+    errores, ids, vistos = [], [], set()
+    campo_pk = queryset.model._meta.pk
+    for indice, item in enumerate(items):
+        pk = item.get('id') if isinstance(item, dict) else None
+        try:
+            pk = campo_pk.to_python(pk) if pk is not None else None
+        except DjangoValidationError:
+            pk = None
+        if pk is None:
+            errores.append({'indice': indice, 'errores': {'id': ['Se requiere un id válido.']}})
+        elif pk in vistos:
+            # bulk_update aplicaría solo el último: se rechaza en lugar de perder cambios en silencio
+            errores.append({'indice': indice, 'errores': {'id': ['Id repetido dentro del lote.']}})
+        vistos.add(pk)
+        ids.append(pk)
+    if errores:
+        raise LoteInvalido(errores)
+    encontrados = queryset.in_bulk({pk for pk in ids})
+    faltantes = [
+        {'indice': i, 'errores': {'id': [f'No existe el registro {pk}.']}}
+        for i, pk in enumerate(ids) if pk not in encontrados
+    ]
+    if faltantes:
+        raise LoteInvalido(faltantes)
+    return [encontrados[pk] for pk in ids]
@@ -0,0 +1,222 @@
+"""
+Datasets sintéticos a escala para benchmarks y pruebas de rendimiento.
+
+A diferencia de los comandos `poblar_datos*` (pensados para demos, fila por fila
+con Faker), aquí todo se inserta con `bulk_create` y es determinista, para poder
+sembrar 10k, 100k o 1M filas en segundos. `restaurar_o_sembrar` evita incluso
+eso: siembra una vez, captura un snapshot (api.snapshots) y las corridas
+siguientes lo restauran.
+"""
+import hashlib
+import inspect
+import random
+import sys
+import zipfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import snapshots, table_cache
+from .models import (
+    UnidadHabitacional, Administrador, Seguridad, PersonalMantenimiento, Residente,
+    Cuota, Pago, AreaComun, Reserva, TicketMantenimiento,
+    Visita, VehiculoAutorizado, AlertaSeguridad
+)
+
+BATCH_SIZE = 5000
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+         'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+TIPOS_ALERTA = [tipo for tipo, _ in AlertaSeguridad.TIPOS_ALERTA]
+
+
+def _en_lotes(modelo, objetos):
+    creados = modelo.objects.bulk_create(objetos, batch_size=BATCH_SIZE)
+    table_cache.invalidar(modelo)  # bulk_create no emite post_save
+    return creados
+
+
+def sembrar_residentes(cantidad, prefijo='bench'):
+    """Crea `cantidad` unidades, usuarios y residentes (uno por unidad)."""
+    password = make_password(None)
+    unidades = _en_lotes(UnidadHabitacional, [
+        UnidadHabitacional(numero=f'{prefijo[0].upper()}-{i:06d}', torre=f'Torre {i % 10}', area_m2=Decimal('80.00'))
+        for i in range(cantidad)
+    ])
+    usuarios = _en_lotes(User, [
+        User(username=f'{prefijo}_{i}', first_name=f'Nombre{i}', last_name=f'Apellido{i}', password=password)
+        for i in range(cantidad)
+    ])
+    return _en_lotes(Residente, [
+        Residente(user=u, unidad_habitacional=un, es_propietario=i % 3 != 0)
+        for i, (u, un) in enumerate(zip(usuarios, unidades))
+    ])
+
+
+def sembrar_cuotas(residentes, filas, seed=42):
+    """`filas` cuotas repartidas entre los residentes; la mitad pagadas con un pago."""
+    rng = random.Random(seed)
+    hoy = date.today()
+    estados = ['pagada', 'pendiente', 'vencida', 'pagada']
+    cuotas = _en_lotes(Cuota, [
+        Cuota(
+            residente=residentes[i % len(residentes)],
+            monto=Decimal(rng.randrange(30000, 90000)) / 100,
+            mes=f'{MESES[i % 12]} {hoy.year}',
+            fecha_vencimiento=hoy - timedelta(days=i % 365),
+            estado=estados[i % len(estados)],
+        )
+        for i in range(filas)
+    ])
+    pagos = _en_lotes(Pago, [
+        Pago(cuota=c, monto_pagado=c.monto, metodo_pago='transferencia', referencia_comprobante=f'REF-{c.pk}')
+        for c in cuotas if c.estado == 'pagada'
+    ])
+    return cuotas, pagos
+
+
+def sembrar_alertas(residentes, filas, seed=42):
+    rng = random.Random(seed)
+    return _en_lotes(AlertaSeguridad, [
+        AlertaSeguridad(
+            tipo_alerta=TIPOS_ALERTA[i % len(TIPOS_ALERTA)],
+            descripcion=f'Evento detectado por cámara {i % 40} en el sector {rng.randrange(1, 20)}.',
+            residente_relacionado=residentes[i % len(residentes)] if i % 3 else None,
+            resuelto=i % 2 == 0,
+        )
+        for i in range(filas)
+    ])
+
+
+def sembrar_personal(cantidad, prefijo='staff'):
+    """`cantidad` perfiles de cada tipo: administradores, guardias y técnicos."""
+    password = make_password(None)
+    perfiles = {}
+    for modelo, rol in ((Administrador, 'admin'), (Seguridad, 'guardia'), (PersonalMantenimiento, 'tecnico')):
+        usuarios = _en_lotes(User, [
+            User(username=f'{prefijo}_{rol}_{i}', first_name=rol.capitalize(), last_name=str(i), password=password)
+            for i in range(cantidad)
+        ])
+        perfiles[rol] = _en_lotes(modelo, [modelo(user=u, telefono=f'7000{i:04d}') for i, u in enumerate(usuarios)])
+    return perfiles
+
+
+def sembrar_areas(cantidad=5):
+    return _en_lotes(AreaComun, [
+        AreaComun(nombre=f'Área {i}', capacidad_personas=10 + i, costo_reserva=Decimal('50.00'))
+        for i in range(cantidad)
+    ])
+
+
+def sembrar_actividad(residentes, areas, personal, filas):
+    """Reservas, tickets, visitas (con QR) y vehículos: `filas` de cada uno."""
+    hoy = date.today()
+    guardias, tecnicos = personal['guardia'], personal['tecnico']
+    _en_lotes(Reserva, [
+        Reserva(area_comun=areas[i % len(areas)], residente=residentes[i % len(residentes)],
+                fecha_reserva=hoy + timedelta(days=i % 60), hora_inicio=time(10), hora_fin=time(12))
+        for i in range(filas)
+    ])
+    _en_lotes(TicketMantenimiento, [
+        TicketMantenimiento(residente=residentes[i % len(residentes)], asignado_a=tecnicos[i % len(tecnicos)] if i % 2 else None,
+                            titulo=f'Ticket {i}', descripcion='Revisión programada')
+        for i in range(filas)
+    ])
+    _en_lotes(Visita, [
+        Visita(residente=residentes[i % len(residentes)], nombre_visitante=f'Visitante {i}',
+               fecha_visita=hoy, hora_entrada_esperada=time(9 + i % 10), codigo_qr_acceso=f'QR-{i:08d}',
+               autorizado_por_seguridad=guardias[i % len(guardias)] if i % 2 else None)
+        for i in range(filas)
+    ])
+    _en_lotes(VehiculoAutorizado, [
+        VehiculoAutorizado(residente=residentes[i % len(residentes)], placa=f'{i:04d}ABC', modelo='Sedan', tipo_vehiculo='Auto')
+        for i in range(filas)
+    ])
+
+
+def sembrar_dataset(filas, seed=42):
+    """
+    Dataset de referencia para una escala: `filas` cuotas (con ~filas/2 pagos)
+    y `filas` alertas, sobre min(filas/20, 5000) residentes.
+    """
+    residentes = sembrar_residentes(min(max(filas // 20, 5), 5000))
+    cuotas, pagos = sembrar_cuotas(residentes, filas, seed)
+    alertas = sembrar_alertas(residentes, filas, seed)
+    return {'residentes': residentes, 'cuotas': cuotas, 'pagos': pagos, 'alertas': alertas}
+
+
+def sembrar_completo(filas, seed=42):
+    """Todas las tablas de la API a una misma escala (para suites de regresión)."""
+    datos = sembrar_dataset(filas, seed)
+    personal = sembrar_personal(min(max(filas // 50, 2), 200))
+    areas = sembrar_areas()
+    sembrar_actividad(datos['residentes'], areas, personal, filas)
+    return {**datos, **personal, 'areas': areas}
+
+
+def vaciar():
+    """Borra los datos de la API (salvo superusuarios). Usar dentro de una transacción revertida."""
+    for modelo in (AlertaSeguridad, VehiculoAutorizado, Visita, TicketMantenimiento, Reserva, AreaComun,
+                   Pago, Cuota, Residente, PersonalMantenimiento, Seguridad, Administrador, UnidadHabitacional):
+        modelo.objects.all().delete()
+    User.objects.filter(is_superuser=False).delete()
+
+
+# ========================
+# DESDE SNAPSHOT
+# ========================
+
+def _nombre_snapshot(sembrar, filas, seed):
+    """
+    Único por función, escala, semilla, código de este módulo y día (las fechas
+    del dataset son relativas a hoy): un cambio en el sembrado invalida el snapshot.
+    """
+    huella = hashlib.sha256(
+        f'{inspect.getsource(sys.modules[__name__])}{date.today().isoformat()}'.encode()
+    ).hexdigest()[:10]
+    return f'dataset-{sembrar.__name__}-{filas}-s{seed}-{huella}'
+
+
+def _releer():
+    """Los mismos objetos que retorna `sembrar_completo`, leídos de la base en orden de pk."""
+    return {
+        clave: list(modelo.objects.order_by('pk'))
+        for clave, modelo in (
+            ('residentes', Residente), ('cuotas', Cuota), ('pagos', Pago), ('alertas', AlertaSeguridad),
+            ('admin', Administrador), ('guardia', Seguridad), ('tecnico', PersonalMantenimiento), ('areas', AreaComun),
+        )
+    }
+
+
+def restaurar_o_sembrar(filas, seed=42, sembrar=sembrar_completo):
+    """
+    Reemplaza el contenido de las tablas por el dataset `sembrar(filas, seed)`:
+    lo restaura del snapshot si ya existe uno válido y si no lo siembra y lo
+    captura para la próxima vez. Vacía las tablas (incluidos los superusuarios):
+    usar con la base de pruebas o dentro de una transacción revertida.
+    Retorna el dict de `sembrar_completo` (las claves que `sembrar` no siembra, vacías).
+    """
+    if not snapshots.config('DATASETS'):
+        snapshots.vaciar()
+        sembrar(filas, seed)
+        return _releer()
+
+    nombre = _nombre_snapshot(sembrar, filas, seed)
+    try:
+        with transaction.atomic():
+            snapshots.restaurar(nombre)
+        return _releer()
+    except (snapshots.SnapshotInvalido, zipfile.BadZipFile, KeyError):
+        pass  # No existe, está corrupto o es de otras migraciones: se siembra de nuevo
+
+    with transaction.atomic():
+        snapshots.vaciar()
+        sembrar(filas, seed)
+        snapshots.capturar(nombre)
+    prefijo = nombre.rsplit('-', 1)[0] + '-'
+    for viejo in snapshots.listar():
+        if viejo.startswith(prefijo) and viejo != nombre:
+            snapshots.ruta(viejo).unlink(missing_ok=True)
+    return _releer()
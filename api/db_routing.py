@@ -0,0 +1,166 @@
+"""
+Ruteo primario/réplica por tipo de carga (workload).
+
+Cada petición se clasifica en `DatabaseRoutingMiddleware` según la vista y el método:
+    gate       validar_placa / validar_qr          -> alias 'gate' (primario, timeout corto)
+    reportes   exportaciones Excel / PDF           -> alias 'reportes' (réplica, timeout largo)
+    lectura    GET de listados, detalles, dashboard -> alias 'replica'
+    escritura  todo lo demás                       -> 'default' (primario)
+
+Cada alias tiene su propio `CONN_MAX_AGE` y `statement_timeout` (ver DATABASES en
+settings), así un reporte descontrolado no agota las conexiones ni bloquea el gate.
+
+Lectura después de escritura: tras un POST/PUT/PATCH/DELETE exitoso, durante
+`STICKY_SECONDS` las lecturas de ese cliente van al primario, para no leer de una
+réplica con retraso. El cliente se reconoce por el `sub` del token firmado o por
+la sesión, con la marca en la caché compartida `CACHE` (la App Móvil no guarda
+cookies y puede alternar entre workers); además se envía la cookie
+`DB_ROUTING['COOKIE']`, que cubre a los clientes anónimos. Sin réplicas
+configuradas no se consulta la caché.
+
+Los alias no definidos en DATABASES se reemplazan por 'default', por lo que con
+una sola base de datos (desarrollo) el router no cambia nada.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .load_shedding import cliente
+
+DEFAULTS = {
+    'ENABLED': True,
+    'STICKY_SECONDS': 5,
+    'COOKIE': 'db_primario',
+    'CACHE': 'default',  # Marca por usuario / sesión: tiene que ser compartida entre workers
+    'ALIASES': {
+        'gate': 'gate',
+        'reportes': 'reportes',
+        'lectura': 'replica',
+        'escritura': 'default',
+    },
+    'GATE_ACTIONS': ('validar_placa', 'validar_qr'),
+    'REPORT_ACTIONS': ('reporte_finanzas', 'reporte_seguridad'),
+}
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+_carga = ContextVar('db_carga', default=None)
+
+
+def config(clave):
+    return getattr(settings, 'DB_ROUTING', {}).get(clave, DEFAULTS[clave])
+
+
+def carga_actual():
+    return _carga.get()
+
+
+def activar(carga):
+    return _carga.set(carga)
+
+
+def restaurar(token):
+    _carga.reset(token)
+
+
+@contextmanager
+def usar_carga(carga):
+    """Fija la carga fuera de una petición (comandos de gestión, tareas)."""
+    token = activar(carga)
+    try:
+        yield
+    finally:
+        restaurar(token)
+
+
+def clasificar(accion, metodo, primario_forzado=False):
+    if accion in config('GATE_ACTIONS'):
+        return 'gate'
+    if metodo not in METODOS_SEGUROS or primario_forzado:
+        return 'escritura'
+    if accion in config('REPORT_ACTIONS'):
+        return 'reportes'
+    return 'lectura'
+
+
+def _clave_escritura(request):
+    """Marca del usuario (token) o de la sesión; None para clientes anónimos (solo la cookie)."""
+    quien = cliente(request, 'app')
+    return None if quien.startswith('ip:') else f'db_routing:escritura:{quien}'
+
+
+def hay_replicas():
+    return any(es_replica(alias(carga)) for carga in ('lectura', 'reportes'))
+
+
+def primario_forzado(request):
+    """True si el cliente escribió hace menos de STICKY_SECONDS."""
+    try:
+        if float(request.COOKIES.get(config('COOKIE'), 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    if not hay_replicas():
+        return False
+    clave = _clave_escritura(request)
+    return clave is not None and caches[config('CACHE')].get(clave) is not None
+
+
+def marcar_escritura(request, response):
+    # `_db_solo_lectura`: POST que no escribe (p. ej. un batch de solo lecturas).
+    # La validación de la guardia ('gate') no fija al dispositivo en el primario.
+    if (not config('ENABLED') or request.method in METODOS_SEGUROS or response.status_code >= 400
+            or getattr(request, '_db_solo_lectura', False) or getattr(request, '_db_carga', None) == 'gate'):
+        return
+    segundos = config('STICKY_SECONDS')
+    if hay_replicas() and (clave := _clave_escritura(request)) is not None:
+        caches[config('CACHE')].set(clave, 1, timeout=segundos)
+    response.set_cookie(
+        config('COOKIE'), f'{time.time() + segundos:.0f}',
+        max_age=segundos, httponly=True, samesite='Lax',
+    )
+
+
+def alias(carga):
+    destino = config('ALIASES').get(carga, 'default')
+    return destino if destino in settings.DATABASES else 'default'
+
+
+def es_replica(alias_):
+    """True si `alias_` apunta a otro servidor que el primario (puede ir atrasado)."""
+    if alias_ == 'default':
+        return False
+    destino, primario = settings.DATABASES[alias_], settings.DATABASES['default']
+    return any(destino.get(k) != primario.get(k) for k in ('HOST', 'PORT', 'NAME'))
+
+
+def lee_de_replica():
+    """True si las lecturas de la petición en curso van a una réplica."""
+    carga = _carga.get()
+    return carga is not None and config('ENABLED') and es_replica(alias(carga))
+
+
+class PrimaryReplicaRouter:
+    """Router de Django: las lecturas siguen la carga de la petición; las escrituras van al primario."""
+
+    def db_for_read(self, model, **hints):
+        carga = _carga.get()
+        if carga is None or not config('ENABLED'):
+            return None
+        return alias(carga)
+
+    def db_for_write(self, model, **hints):
+        if _carga.get() == 'gate' and config('ENABLED'):
+            # Mismo primario, pero con el pool y el timeout del gate
+            return alias('gate')
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todos los alias apuntan a la misma base (primario o sus réplicas)
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,172 @@
+"""
+Serialización rápida de solo lectura para listados y exportaciones.
+
+`ModelSerializer` instancia un modelo por fila y resuelve cada campo con
+`get_attribute` + `to_representation`. Para listados grandes, este módulo
+compila una vez por serializer (y selección de campos) un `Plan`:
+    - las columnas exactas a pedir con `values_list()` (JOINs incluidos),
+    - un conversor por campo que arma el valor final desde la tupla.
+
+Los conversores reutilizan `to_representation` de los propios campos del
+serializer (decimales, fechas), y se omiten cuando es la identidad (enteros,
+strings, booleanos, PKs). La salida es idéntica a `serializer.data`.
+
+Si un serializer tiene algo que el plan no sabe reproducir (campos de archivo,
+`SerializerMethodField`, relaciones múltiples, métodos arbitrarios),
+`plan_para` retorna None y la vista usa el camino normal.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from . import tracing
+from .metrics import current_stats
+from .serializers import ruta_relacion
+
+DEFAULTS = {
+    'ENABLED': True,
+}
+
+# Campos cuyo `to_representation` es la identidad para el tipo que devuelve la BD
+IDENTIDAD = (serializers.IntegerField, serializers.CharField, serializers.BooleanField, PrimaryKeyRelatedField)
+
+
+def config(clave):
+    return getattr(settings, 'FAST_SERIALIZATION', {}).get(clave, DEFAULTS[clave])
+
+
+class NoSoportado(Exception):
+    """El serializer tiene campos que el plan no puede reproducir."""
+
+
+def _nombre_completo(nombre, apellido):
+    # Igual que User.get_full_name()
+    return f'{nombre} {apellido}'.strip()
+
+
+# Métodos de modelo permitidos al final de un `source` con puntos: (modelo, método) -> (columnas, función)
+METODOS = {
+    (User, 'get_full_name'): (('first_name', 'last_name'), _nombre_completo),
+}
+
+
+def _conversor(campo):
+    if isinstance(campo, IDENTIDAD):
+        return None
+    if isinstance(campo, serializers.ChoiceField):
+        return None if all(isinstance(c, str) for c in campo.choices) else campo.to_representation
+    if isinstance(campo, (serializers.FileField, serializers.SerializerMethodField, serializers.ManyRelatedField)):
+        raise NoSoportado(campo.field_name)
+    return campo.to_representation
+
+
+class Plan:
+    """Columnas para `values_list` y el armado de cada fila."""
+
+    def __init__(self, serializer):
+        self.columnas = []
+        self._indices = {}
+        self.campos = self._compilar(serializer, serializer.Meta.model, '')
+
+    def _columna(self, ruta):
+        if ruta not in self._indices:
+            self._indices[ruta] = len(self.columnas)
+            self.columnas.append(ruta)
+        return self._indices[ruta]
+
+    def _compilar(self, serializer, modelo, prefijo):
+        campos = []
+        for campo in serializer._readable_fields:
+            campos.append((campo.field_name, self._compilar_campo(campo, modelo, prefijo)))
+        return campos
+
+    def _compilar_campo(self, campo, modelo, prefijo):
+        if isinstance(campo, serializers.ListSerializer):
+            raise NoSoportado(campo.field_name)
+        partes = campo.source.split('.')
+        ruta = ruta_relacion(modelo, campo.source)
+        tramos = ruta.split('__') if ruta else []
+        resto = partes[len(tramos):]
+        relacionado = modelo
+        for tramo in tramos:
+            relacionado = relacionado._meta.get_field(tramo).related_model
+
+        # Serializer anidado: sub-plan con prefijo; None si la FK es nula
+        if isinstance(campo, serializers.ModelSerializer):
+            if resto or not tramos:
+                raise NoSoportado(campo.field_name)
+            base = f'{prefijo}{ruta}__'
+            pk = self._columna(base + relacionado._meta.pk.name)
+            sub = self._compilar(campo, relacionado, base)
+            return lambda fila: None if fila[pk] is None else {n: c(fila) for n, c in sub}
+
+        # FK como PK (`cuota`, `residente`): la columna devuelve el id
+        if isinstance(campo, PrimaryKeyRelatedField) and len(tramos) == 1 and not resto:
+            i = self._columna(prefijo + ruta)
+            return lambda fila: fila[i]
+
+        if len(resto) != 1:
+            raise NoSoportado(campo.field_name)
+        atributo = resto[0]
+
+        metodo = METODOS.get((relacionado, atributo))
+        if metodo is not None:
+            columnas, funcion = metodo
+            base = f'{prefijo}{ruta}__' if ruta else prefijo
+            indices = [self._columna(base + c) for c in columnas]
+            primero = indices[0]
+            # Si la relación es nula, DRF corta el recorrido y devuelve None
+            return lambda fila: None if fila[primero] is None else funcion(*(fila[i] for i in indices))
+
+        try:
+            campo_modelo = relacionado._meta.get_field(atributo)
+        except FieldDoesNotExist:
+            raise NoSoportado(campo.field_name)
+        if not campo_modelo.concrete or campo_modelo.many_to_many or campo_modelo.is_relation:
+            raise NoSoportado(campo.field_name)
+        i = self._columna(f'{prefijo}{ruta}__{atributo}' if ruta else prefijo + atributo)
+        conversor = _conversor(campo)
+        if conversor is None:
+            return lambda fila: fila[i]
+        return lambda fila: None if fila[i] is None else conversor(fila[i])
+
+    def filas(self, queryset):
+        """Lista de dicts idéntica a `Serializer(queryset, many=True).data`."""
+        tuplas = list(queryset.values_list(*self.columnas))
+        stats = current_stats()
+        inicio = time.perf_counter()
+        with tracing.span('serializer.rapido', filas=len(tuplas)):
+            campos = self.campos
+            resultado = [{n: c(fila) for n, c in campos} for fila in tuplas]
+        if stats is not None:
+            stats.serializer_time += time.perf_counter() - inicio
+        return resultado
+
+
+_planes = {}
+_lock = threading.Lock()
+
+
+def plan_para(serializer):
+    """Plan (cacheado por clase y campos visibles) o None si no es compilable."""
+    clave = (type(serializer), tuple(serializer.fields))
+    with _lock:
+        if clave in _planes:
+            return _planes[clave]
+    # Se compila sobre una instancia sin contexto para no retener la petición en el caché
+    limpio = type(serializer)()
+    for nombre in list(limpio.fields):
+        if nombre not in serializer.fields:
+            limpio.fields.pop(nombre)
+    try:
+        plan = Plan(limpio)
+    except NoSoportado:
+        plan = None
+    with _lock:
+        _planes[clave] = plan
+    return plan
@@ -0,0 +1,351 @@
+"""
+Aplicación ASGI mínima de portería: solo validar-placa, validar-qr y validar-facial.
+
+`config.asgi` sirve el proyecto completo (admin, sesiones, mensajes, CSRF,
+drf-spectacular, toda la cadena de middleware) y las acciones de
+`SeguridadViewSet` son síncronas: cada cámara o lector conectado ocupa un hilo.
+`config.asgi_gate` sirve en cambio esta aplicación, un callable ASGI sin
+HttpRequest, sin DRF y sin el middleware de Django, con las mismas rutas y las
+mismas respuestas que las acciones del ViewSet:
+
+    POST /api/seguridad/validar-placa/    {placa}       (JSON, form o MessagePack)
+    POST /api/seguridad/validar-qr/       {codigo_qr}
+    POST /api/seguridad/validar-facial/   imagen        (multipart)
+    GET  /ready                           200 cuando terminó el calentamiento del gate
+
+    uvicorn config.asgi_gate:application --port 8001 --workers 2
+    gunicorn config.asgi_gate:application -k uvicorn.workers.UvicornWorker
+
+El proxy envía /api/seguridad/validar-* a este proceso y el resto a gunicorn.
+Cada petición pasa solo por `CAPAS` (métricas, descarte por tasa del gate y
+reciclado de conexiones) y consulta con el ORM asíncrono, sobre el alias del gate
+(`api.db_routing`). Las consultas se ejecutan de a una en el hilo de base de
+datos del proceso (`sync_to_async`, thread_sensitive): el event loop mantiene
+cientos de conexiones abiertas de cámaras y lectores sin un hilo por cada una.
+"""
+import asyncio
+import io
+import logging
+import time
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.uploadhandler import load_handler
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.http import QueryDict
+from django.http.multipartparser import MultiPartParser, MultiPartParserError
+from django.http.request import HttpHeaders
+from django.utils import timezone
+from django.utils.http import parse_header_parameters
+
+from . import db_routing, load_shedding, metrics, renderers, table_cache, warmup
+from .gate_responses import respuesta_facial, respuesta_placa, respuesta_qr
+from .models import Residente, VehiculoAutorizado, Visita
+from .serializers import ValidarFacialSerializer, ValidarPlacaSerializer, ValidarQRSerializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'PREFIJO': '/api/seguridad/',
+    'MAX_CUERPO_BYTES': 10 * 1024 * 1024,  # validar-facial recibe una foto
+}
+
+VISTA = 'GateApp'  # Etiqueta `view` en /metrics
+ETAPAS_CALENTAMIENTO = ['conexiones', 'placas', 'visitas_qr']
+
+
+def config(clave):
+    return getattr(settings, 'GATE_APP', {}).get(clave, DEFAULTS[clave])
+
+
+# ========================
+# PETICIÓN Y RESPUESTA ASGI
+# ========================
+
+class ErrorPeticion(Exception):
+    def __init__(self, status, datos):
+        super().__init__(datos)
+        self.status = status
+        self.datos = datos
+
+
+class Peticion:
+    """Lo mínimo de la petición: método, ruta, cabeceras (con META al estilo WSGI) y cuerpo."""
+
+    def __init__(self, scope, cuerpo):
+        self.scope = scope
+        self.metodo = scope['method']
+        self.ruta = scope['path']
+        self.cuerpo = cuerpo
+        self.META = {
+            'REQUEST_METHOD': self.metodo,
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        }
+        for nombre, valor in scope.get('headers', []):
+            clave = nombre.decode('latin1').upper().replace('-', '_')
+            clave = clave if clave in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{clave}'
+            valor = valor.decode('latin1')
+            self.META[clave] = f'{self.META[clave]},{valor}' if clave in self.META else valor
+        self.headers = HttpHeaders(self.META)
+        self.COOKIES = {}  # El gate no usa sesión: `load_shedding.cliente` cae en el dispositivo o la IP
+
+    def url_absoluta(self, ruta):
+        return f"{self.scope.get('scheme', 'http')}://{self.headers.get('Host', 'localhost')}{ruta}"
+
+    def datos(self):
+        """Cuerpo parseado según Content-Type, como `request.data` de DRF."""
+        tipo, parametros = parse_header_parameters(self.META.get('CONTENT_TYPE', ''))
+        try:
+            if tipo == 'application/json':
+                return orjson.loads(self.cuerpo or b'{}')
+            if tipo == 'application/x-www-form-urlencoded':
+                return QueryDict(self.cuerpo, encoding=parametros.get('charset', settings.DEFAULT_CHARSET))
+            if tipo == 'multipart/form-data':
+                self.META['CONTENT_LENGTH'] = str(len(self.cuerpo))
+                manejadores = [load_handler(ruta) for ruta in settings.FILE_UPLOAD_HANDLERS]
+                campos, archivos = MultiPartParser(self.META, io.BytesIO(self.cuerpo), manejadores).parse()
+                datos = campos.copy()
+                datos.update(archivos)
+                return datos
+            if tipo == 'application/msgpack' and renderers.msgpack is not None:
+                return renderers.msgpack.unpackb(self.cuerpo, raw=False)
+        except (ValueError, MultiPartParserError) as exc:
+            raise ErrorPeticion(400, {'detail': f'Error de formato en el cuerpo: {exc}'})
+        raise ErrorPeticion(415, {'detail': f'Tipo de medio no soportado "{tipo}" en la solicitud.'})
+
+
+class Respuesta:
+    def __init__(self, datos, status=200, cabeceras=None):
+        self.datos = datos
+        self.status = status
+        self.cabeceras = dict(cabeceras or {})
+
+    def render(self, peticion):
+        if renderers.msgpack is not None and 'application/msgpack' in peticion.headers.get('Accept', ''):
+            return renderers.MessagePackRenderer().render(self.datos), 'application/msgpack'
+        return renderers.JSONRenderer().render(self.datos), 'application/json'
+
+
+async def _leer_cuerpo(receive):
+    partes, total = [], 0
+    while True:
+        mensaje = await receive()
+        if mensaje['type'] == 'http.disconnect':
+            return None
+        partes.append(mensaje.get('body', b''))
+        total += len(partes[-1])
+        if total > config('MAX_CUERPO_BYTES'):
+            raise ErrorPeticion(413, {'detail': 'Cuerpo demasiado grande.'})
+        if not mensaje.get('more_body', False):
+            return b''.join(partes)
+
+
+async def _enviar(send, peticion, respuesta):
+    cuerpo, tipo = respuesta.render(peticion)
+    cabeceras = [(b'content-type', tipo.encode()), (b'content-length', str(len(cuerpo)).encode())]
+    cabeceras += [(k.lower().encode('latin1'), str(v).encode('latin1')) for k, v in respuesta.cabeceras.items()]
+    await send({'type': 'http.response.start', 'status': respuesta.status, 'headers': cabeceras})
+    await send({'type': 'http.response.body', 'body': cuerpo})
+    return len(cuerpo)
+
+
+# ========================
+# ACCIONES (ORM asíncrono)
+# ========================
+
+def _validar(serializer_class, datos):
+    serializer = serializer_class(data=datos)
+    if not serializer.is_valid():
+        raise ErrorPeticion(400, serializer.errors)
+    return serializer.validated_data
+
+
+async def validar_placa(peticion):
+    placa = _validar(ValidarPlacaSerializer, peticion.datos())['placa'].upper().strip()
+    try:
+        vehiculo = await VehiculoAutorizado.objects.select_related(
+            'residente__user', 'residente__unidad_habitacional'
+        ).aget(placa=placa, autorizado=True)
+    except VehiculoAutorizado.DoesNotExist:
+        vehiculo = None
+    return Respuesta(respuesta_placa(vehiculo))
+
+
+async def validar_qr(peticion):
+    codigo_qr = _validar(ValidarQRSerializer, peticion.datos())['codigo_qr']
+    try:
+        visita = await Visita.objects.select_related(
+            'residente__user', 'residente__unidad_habitacional'
+        ).aget(codigo_qr_acceso=codigo_qr)
+    except Visita.DoesNotExist:
+        return Respuesta(respuesta_qr(None, False))
+    if visita.hora_entrada_real:
+        return Respuesta(respuesta_qr(visita, False))
+    # Registrar entrada solo si sigue libre: de dos lecturas simultáneas del mismo QR, entra una
+    ahora = timezone.now()
+    actualizadas = await Visita.objects.filter(pk=visita.pk, hora_entrada_real__isnull=True).aupdate(
+        hora_entrada_real=ahora, fecha_actualizacion=ahora,
+    )
+    if actualizadas != 1:
+        return Respuesta(respuesta_qr(visita, False))
+    await sync_to_async(table_cache.invalidar)(Visita)  # update() no emite post_save
+    visita.hora_entrada_real = ahora
+    return Respuesta(respuesta_qr(visita, True))
+
+
+async def validar_facial(peticion):
+    # Multipart y verificación de la imagen (Pillow): CPU fuera del event loop
+    await sync_to_async(lambda: _validar(ValidarFacialSerializer, peticion.datos()), thread_sensitive=False)()
+    residente = await Residente.objects.select_related(
+        'user', 'unidad_habitacional'
+    ).filter(es_propietario=True).afirst()
+    return Respuesta(respuesta_facial(residente, peticion.url_absoluta))
+
+
+ACCIONES = {
+    'validar-placa': ('validar_placa', validar_placa),
+    'validar-qr': ('validar_qr', validar_qr),
+    'validar-facial': ('validar_facial', validar_facial),
+}
+
+
+# ========================
+# CAPAS (middleware mínimo)
+# ========================
+
+async def _metricas(peticion, accion, siguiente):
+    stats, token = metrics.start_request()
+    inicio = time.perf_counter()
+    try:
+        respuesta = await siguiente(peticion)
+    finally:
+        metrics.end_request(token)
+    total = time.perf_counter() - inicio
+    metrics.registry.record((VISTA, accion, peticion.metodo), total, stats, None)
+    respuesta.cabeceras['Server-Timing'] = (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", total;dur={total * 1000:.1f}'
+    )
+    return respuesta
+
+
+async def _descarte(peticion, accion, siguiente):
+    if not load_shedding.config('ENABLED'):
+        return await siguiente(peticion)
+    decision = load_shedding.limitador.admitir('gate', load_shedding.cliente(peticion, 'gate'))
+    load_shedding.registrar('gate', decision)
+    if not decision.admitida:
+        return Respuesta(decision.cuerpo('gate'), status=decision.status, cabeceras={'Retry-After': decision.retry_after})
+    inicio = time.perf_counter()
+    try:
+        return await siguiente(peticion)
+    finally:
+        load_shedding.limitador.liberar('gate', time.perf_counter() - inicio)
+
+
+async def _conexiones(peticion, accion, siguiente):
+    # Lo que hacen las señales request_started/request_finished en Django
+    await sync_to_async(close_old_connections)()
+    with db_routing.usar_carga('gate'):
+        return await siguiente(peticion)
+
+
+CAPAS = (_metricas, _descarte, _conexiones)
+
+
+def _encadenar(accion, vista):
+    async def interior(peticion):
+        try:
+            return await vista(peticion)
+        except ErrorPeticion as exc:  # 400/415: también pasan por métricas
+            return Respuesta(exc.datos, status=exc.status)
+
+    siguiente = interior
+    for capa in reversed(CAPAS):
+        siguiente = (lambda capa, interior: lambda peticion: capa(peticion, accion, interior))(capa, siguiente)
+    return siguiente
+
+
+def _medir_conexion(sender, connection, **kwargs):
+    from .middleware import PerformanceMetricsMiddleware
+
+    # Sin el middleware de Django: el wrapper queda instalado en cada conexión del proceso
+    # (connection_created se repite en cada reconexión del mismo DatabaseWrapper)
+    if PerformanceMetricsMiddleware._medir_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(PerformanceMetricsMiddleware._medir_query)
+
+
+# ========================
+# APLICACIÓN
+# ========================
+
+_calentamiento = None
+
+
+async def _calentar():
+    await sync_to_async(warmup.ejecutar)(ETAPAS_CALENTAMIENTO)
+
+
+async def _ready(peticion):
+    if not warmup.config('ENABLED'):
+        return Respuesta({'estado': 'deshabilitado'})
+    if warmup.listo():
+        return Respuesta(warmup.estado())
+    global _calentamiento
+    if _calentamiento is None and warmup.estado()['estado'] == 'pendiente':
+        _calentamiento = asyncio.ensure_future(_calentar())  # El servidor no envió lifespan
+    return Respuesta(warmup.estado(), status=503, cabeceras={'Retry-After': 1})
+
+
+async def _lifespan(receive, send):
+    while True:
+        mensaje = await receive()
+        if mensaje['type'] == 'lifespan.startup':
+            if warmup.config('ENABLED'):
+                await _calentar()
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensaje['type'] == 'lifespan.shutdown':
+            await sync_to_async(connections.close_all)()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+class GateApp:
+    def __init__(self):
+        self.cadenas = {nombre: _encadenar(accion, vista) for nombre, (accion, vista) in ACCIONES.items()}
+        connection_created.connect(_medir_conexion, dispatch_uid='gate_medir_queries')
+
+    def resolver(self, metodo, ruta):
+        """(cadena, None) o (None, Respuesta de error)."""
+        if ruta == '/ready':
+            return (_ready, None) if metodo == 'GET' else (None, Respuesta({'detail': 'Método no permitido.'}, 405, {'Allow': 'GET'}))
+        prefijo = config('PREFIJO')
+        nombre = ruta[len(prefijo):].rstrip('/') if ruta.startswith(prefijo) else None
+        if nombre not in self.cadenas:
+            return None, Respuesta({'detail': 'No encontrado.'}, status=404)
+        if metodo != 'POST':
+            return None, Respuesta({'detail': f'Método "{metodo}" no permitido.'}, 405, {'Allow': 'POST, OPTIONS'})
+        return self.cadenas[nombre], None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await _lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f"Tipo de conexión no soportado: {scope['type']}")
+
+        peticion = Peticion(scope, b'')
+        try:
+            cadena, respuesta = self.resolver(peticion.metodo, peticion.ruta)
+            if cadena is not None:
+                peticion.cuerpo = await _leer_cuerpo(receive)
+                if peticion.cuerpo is None:
+                    return  # El cliente se desconectó
+                respuesta = await cadena(peticion)
+        except ErrorPeticion as exc:
+            respuesta = Respuesta(exc.datos, status=exc.status)
+        except Exception:
+            logger.exception('Error en %s', peticion.ruta)
+            respuesta = Respuesta({'detail': 'Error interno del servidor.'}, status=500)
+        await _enviar(send, peticion, respuesta)
+
@@ -0,0 +1,70 @@
+"""
+Cuerpos de respuesta de las validaciones de portería (placa, QR y rostro).
+
+Los comparten las acciones de `SeguridadViewSet` (api/views.py) y la aplicación
+ASGI del gate (api/gate.py), que tienen que responder exactamente lo mismo a la
+App Móvil. Este módulo no importa ninguno de los dos: importar las respuestas no
+crea la aplicación del gate ni conecta sus señales.
+"""
+
+
+def respuesta_placa(vehiculo):
+    if vehiculo is None:
+        # La app espera 200 OK con valido: false, no 404
+        return {
+            'valido': False,
+            'mensaje': 'Vehículo no autorizado',
+            'residente': 'Desconocido',
+            'tipo': 'Desconocido'
+        }
+    # MATCH SPEC MÓVIL EXACTO: "valido": true, "residente": string nombre, "tipo": string
+    return {
+        'valido': True,
+        'mensaje': 'Vehículo autorizado',
+        'residente': f"{vehiculo.residente.user.first_name} {vehiculo.residente.user.last_name}",
+        'tipo': vehiculo.tipo_vehiculo or "Vehículo",
+        # Extras útiles pero opcionales para la app
+        'unidad': str(vehiculo.residente.unidad_habitacional)
+    }
+
+
+def respuesta_qr(visita, autorizado):
+    if visita is None:
+        return {
+            'autorizado': False,
+            'mensaje': 'Código QR inválido o no existe',
+            'visita': None
+        }
+    # MATCH SPEC MÓVIL: Las claves deben ser 'autorizado', 'visita' object
+    return {
+        'autorizado': autorizado,
+        'mensaje': 'Acceso permitido' if autorizado else 'QR ya utilizado anteriormente',
+        'visita': {
+            'nombre_visitante': visita.nombre_visitante,
+            'residente_nombre': str(visita.residente.user.get_full_name()),
+            'unidad': str(visita.residente.unidad_habitacional)
+        }
+    }
+
+
+def respuesta_facial(residente, url_absoluta):
+    if residente is None:
+        return {
+            'valido': True,
+            'mensaje': 'Rostro verificado (Demo)',
+            'es_propietario': True,
+            'residente': {
+                'nombre': 'Residente Demo',
+                'unidad': 'A-101 (Demo)'
+            }
+        }
+    return {
+        'valido': True,
+        'mensaje': 'Rostro verificado exitosamente',
+        'es_propietario': residente.es_propietario,
+        'residente': {
+            'nombre': residente.user.get_full_name(),
+            'unidad': str(residente.unidad_habitacional),
+            'foto_perfil': url_absoluta(residente.foto_perfil.url) if residente.foto_perfil else None
+        }
+    }
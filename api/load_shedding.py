@@ -0,0 +1,242 @@
+"""
+Descarte de carga por prioridad: la portería primero.
+
+Cada petición se clasifica (en `LoadSheddingMiddleware.process_view`, con la
+vista ya resuelta) en un nivel, de mayor a menor prioridad:
+
+    gate         validar_placa / validar_qr / validar_facial
+    app          el resto de la API (App Móvil y panel): listados, detalles, escrituras
+    analitica    dashboard de administración (KPIs)
+    exportacion  reportes Excel / PDF
+
+y pasa por tres controles:
+
+    concurrencia  peticiones en curso del nivel (`CONCURRENCIA`, None = sin tope)
+    degradación   si la latencia del gate (media móvil) supera `LATENCIA_GATE_MS`,
+                  los niveles `SACRIFICABLES` se rechazan hasta que se recupere
+    tasa          token bucket por cliente (`TASA` por segundo, `RAFAGA`)
+
+Lo descartado por concurrencia o degradación responde 503 con Retry-After antes
+de ejecutar la vista (sin consultas ni serialización); lo que excede la tasa de
+su cliente, 429. El cliente se identifica por el `sub` del token firmado, la
+cookie de sesión o la IP; en el nivel gate, un guardia autenticado puede además
+separar sus cámaras y lectores con la cabecera `X-Dispositivo`.
+
+La concurrencia y los buckets son por proceso: con gunicorn cada worker aplica
+los suyos. La latencia del gate en cambio se publica en la caché `CACHE` (como
+mucho cada `PUBLICAR_SEGUNDOS`, y se lee con la misma frecuencia): el gate suele
+correr en su propio proceso (`config.asgi_gate`) y la degradación se aplica en
+los workers de la app, que no ven sus validaciones. Si la caché es local a cada
+proceso (LocMem), cada uno solo ve la latencia del gate que sirve él mismo.
+Con varios workers de gate vale la última media publicada.
+Métrica: `condominio_load_shedding_total{nivel, decision}` con
+decision = admitida | concurrencia | degradacion | tasa.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics, tokens
+from .table_cache import compartida
+
+DEFAULTS = {
+    'ENABLED': True,
+    'GATE_ACTIONS': ('validar_placa', 'validar_qr', 'validar_facial'),
+    'EXPORT_ACTIONS': ('reporte_finanzas', 'reporte_seguridad'),
+    'ANALYTICS_VIEWS': ('DashboardAdminView',),
+    'EXENTAS': ('metrics_view', 'readiness_view'),  # Monitoreo: nunca se descarta
+    'NIVELES': {
+        'gate': {'CONCURRENCIA': None, 'TASA': 10, 'RAFAGA': 30},
+        'app': {'CONCURRENCIA': 32, 'TASA': 20, 'RAFAGA': 100},
+        'analitica': {'CONCURRENCIA': 4, 'TASA': 1, 'RAFAGA': 10},
+        'exportacion': {'CONCURRENCIA': 2, 'TASA': 0.1, 'RAFAGA': 3},
+    },
+    'LATENCIA_GATE_MS': 150,
+    'SACRIFICABLES': ('analitica', 'exportacion'),
+    'VENTANA_GATE_SEGUNDOS': 10,  # Sin validaciones recientes la latencia del gate no cuenta
+    'RETRY_AFTER': 5,
+    'MAX_CLIENTES': 10_000,  # Buckets en memoria (LRU)
+    'CACHE': 'default',  # Donde el gate publica su latencia para los demás procesos
+    'PUBLICAR_SEGUNDOS': 1,
+}
+
+NIVELES = ('gate', 'app', 'analitica', 'exportacion')
+SUAVIZADO = 0.2  # Peso de cada validación en la media móvil de latencia del gate
+CLAVE_LATENCIA = 'load_shedding:latencia_gate'
+
+
+def config(clave):
+    return getattr(settings, 'LOAD_SHEDDING', {}).get(clave, DEFAULTS[clave])
+
+
+def limites(nivel):
+    return {**DEFAULTS['NIVELES'][nivel], **config('NIVELES').get(nivel, {})}
+
+
+def clasificar(vista, accion):
+    """Nivel de la petición, o None si está exenta."""
+    if vista in config('EXENTAS'):
+        return None
+    if accion in config('GATE_ACTIONS'):
+        return 'gate'
+    if accion in config('EXPORT_ACTIONS'):
+        return 'exportacion'
+    if vista in config('ANALYTICS_VIEWS'):
+        return 'analitica'
+    return 'app'
+
+
+def _claims(request):
+    partes = request.headers.get('Authorization', '').split()
+    if len(partes) == 2 and partes[0] == 'Bearer':
+        try:
+            return tokens.decodificar(partes[1], 'access')
+        except tokens.TokenInvalido:
+            pass  # DRF responde 401 más adelante; acá cuenta como anónimo
+    return None
+
+
+def _es_guardia(request, claims):
+    if claims is not None:
+        return claims['rol'] == 'GUARDIA'
+    user = getattr(request, 'user', None)  # Sesión (AuthenticationMiddleware); el gate ASGI no tiene
+    return bool(user is not None and user.is_authenticated and tokens.rol_de(user)[0] == 'GUARDIA')
+
+
+def cliente(request, nivel):
+    """
+    Clave del token bucket. `X-Dispositivo` la elige el cliente: solo se acepta
+    en el nivel gate y de un guardia autenticado (cámaras y lectores comparten la
+    cuenta de la caseta); si no, cualquiera tendría un bucket nuevo por petición.
+    """
+    claims = _claims(request)
+    dispositivo = request.headers.get('X-Dispositivo')
+    if dispositivo and nivel == 'gate' and _es_guardia(request, claims):
+        return f'dispositivo:{dispositivo[:64]}'
+    if claims is not None:
+        return f"usuario:{claims['sub']}"
+    sesion = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if sesion:
+        return f'sesion:{hashlib.sha256(sesion.encode()).hexdigest()[:16]}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+class Decision:
+    __slots__ = ('admitida', 'motivo', 'retry_after')
+
+    def __init__(self, admitida, motivo, retry_after=None):
+        self.admitida = admitida
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+    @property
+    def status(self):
+        return 429 if self.motivo == 'tasa' else 503
+
+    def cuerpo(self, nivel):
+        return {'detail': 'Demasiadas peticiones, reintente más tarde.', 'nivel': nivel, 'motivo': self.motivo}
+
+
+def _backend():
+    return caches[config('CACHE')]
+
+
+class Limitador:
+    """Estado del proceso: peticiones en curso, buckets por cliente y latencia del gate."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.en_curso = dict.fromkeys(NIVELES, 0)
+            self.buckets = OrderedDict()  # (nivel, cliente) -> [tokens, monotonic]
+            self.latencia_gate_ms = 0.0
+            self.ultima_gate = None
+            self.publicada = None  # monotonic de la última publicación en la caché
+            self.remota = (None, 0.0)  # ((latencia_ms, time.time()) leída de la caché o None, monotonic hasta el que vale)
+
+    def _latencia_remota(self, ahora):
+        """Latencia publicada por el gate de otro proceso, consultada como mucho cada `PUBLICAR_SEGUNDOS`."""
+        valor, vence = self.remota
+        if vence > ahora:
+            return valor
+        valor = _backend().get(CLAVE_LATENCIA) if compartida(config('CACHE')) else None
+        self.remota = (valor, ahora + config('PUBLICAR_SEGUNDOS'))
+        return valor
+
+    def degradado(self, ahora=None):
+        """Fuera del lock: puede consultar la caché compartida."""
+        ahora = time.monotonic() if ahora is None else ahora
+        ventana, umbral = config('VENTANA_GATE_SEGUNDOS'), config('LATENCIA_GATE_MS')
+        if self.ultima_gate is not None and ahora - self.ultima_gate < ventana and self.latencia_gate_ms > umbral:
+            return True
+        remota = self._latencia_remota(ahora)
+        return remota is not None and time.time() - remota[1] < ventana and remota[0] > umbral
+
+    def _tomar(self, nivel, clave, tasa, rafaga, ahora):
+        """Consume un token del bucket; retorna los segundos a esperar si no hay."""
+        bucket = self.buckets.get((nivel, clave))
+        if bucket is None:
+            bucket = self.buckets[(nivel, clave)] = [rafaga, ahora]
+            if len(self.buckets) > config('MAX_CLIENTES'):
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end((nivel, clave))
+            bucket[0] = min(rafaga, bucket[0] + (ahora - bucket[1]) * tasa)
+            bucket[1] = ahora
+        if bucket[0] < 1:
+            return (1 - bucket[0]) / tasa
+        bucket[0] -= 1
+        return 0
+
+    def admitir(self, nivel, clave):
+        ahora = time.monotonic()
+        limite = limites(nivel)
+        if nivel in config('SACRIFICABLES') and self.degradado(ahora):
+            return Decision(False, 'degradacion', config('RETRY_AFTER'))
+        with self._lock:
+            if limite['CONCURRENCIA'] is not None and self.en_curso[nivel] >= limite['CONCURRENCIA']:
+                return Decision(False, 'concurrencia', config('RETRY_AFTER'))
+            if limite['TASA']:
+                espera = self._tomar(nivel, clave, limite['TASA'], limite['RAFAGA'], ahora)
+                if espera:
+                    return Decision(False, 'tasa', max(1, math.ceil(espera)))
+            self.en_curso[nivel] += 1
+        return Decision(True, 'admitida')
+
+    def liberar(self, nivel, segundos):
+        publicar = None
+        with self._lock:
+            self.en_curso[nivel] -= 1
+            if nivel == 'gate':
+                self.latencia_gate_ms += SUAVIZADO * (segundos * 1000 - self.latencia_gate_ms)
+                self.ultima_gate = ahora = time.monotonic()
+                if self.publicada is None or ahora - self.publicada >= config('PUBLICAR_SEGUNDOS'):
+                    self.publicada = ahora
+                    publicar = self.latencia_gate_ms
+        if publicar is not None and compartida(config('CACHE')):
+            _backend().set(CLAVE_LATENCIA, (publicar, time.time()), timeout=config('VENTANA_GATE_SEGUNDOS'))
+
+    def estado(self):
+        degradado = self.degradado()
+        with self._lock:
+            return {
+                'en_curso': dict(self.en_curso),
+                'latencia_gate_ms': round(self.latencia_gate_ms, 1),
+                'degradado': degradado,
+                'clientes': len(self.buckets),
+            }
+
+
+limitador = Limitador()
+
+
+def registrar(nivel, decision):
+    metrics.registry.inc('condominio_load_shedding_total', (nivel, decision.motivo))
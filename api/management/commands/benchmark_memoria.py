@@ -0,0 +1,78 @@
+"""
+Benchmark de memoria de los reportes con presupuesto por escala
+Uso: python manage.py benchmark_memoria [--filas 10000 100000] [--actualizar]
+
+Cada escala se restaura desde un snapshot (o se siembra y se captura, la
+primera vez) dentro de una transacción que se revierte al final, por lo que la
+base de datos queda intacta. Falla (exit code 1) si algún
+reporte supera su presupuesto de `benchmarks/presupuestos_memoria.json`.
+"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.datasets import restaurar_o_sembrar, sembrar_dataset
+from api.memory_profiling import MedicionMemoria
+from api.report_utils import generar_reporte_finanzas_excel, generar_reporte_seguridad_pdf
+
+REPORTES = {
+    'finanzas_excel': generar_reporte_finanzas_excel,
+    'seguridad_pdf': generar_reporte_seguridad_pdf,
+}
+MARGEN_ACTUALIZACION = 1.25  # Presupuesto = pico medido + 25%
+
+
+class Command(BaseCommand):
+    help = 'Mide el pico de memoria de cada reporte a varias escalas y lo compara con su presupuesto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000])
+        parser.add_argument('--reporte', choices=sorted(REPORTES), nargs='+', default=sorted(REPORTES))
+        parser.add_argument('--presupuestos', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'presupuestos_memoria.json'))
+        parser.add_argument('--actualizar', action='store_true', help='Reescribir los presupuestos con los valores medidos')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['presupuestos'])
+        presupuestos = json.loads(ruta.read_text()) if ruta.exists() else {}
+        excedidos = []
+
+        for filas in options['filas']:
+            self.stdout.write(self.style.WARNING(f'\n📦 Escala {filas:,} filas'))
+            with transaction.atomic():
+                # Los reportes leen toda la tabla: solo el dataset, para que sea reproducible
+                restaurar_o_sembrar(filas, sembrar=sembrar_dataset)
+
+                for nombre in options['reporte']:
+                    with MedicionMemoria(frames=1) as medicion:
+                        buffer = REPORTES[nombre]()
+                    tamano_kb = len(buffer.getvalue()) / 1024
+                    del buffer
+                    pico_mb = medicion.peak_bytes / 1024 / 1024
+                    limite = presupuestos.get(nombre, {}).get(str(filas))
+
+                    if options['actualizar']:
+                        presupuestos.setdefault(nombre, {})[str(filas)] = round(pico_mb * MARGEN_ACTUALIZACION, 1)
+                        estado = self.style.SUCCESS('actualizado')
+                    elif limite is None:
+                        estado = self.style.WARNING('sin presupuesto')
+                    elif pico_mb > limite:
+                        estado = self.style.ERROR(f'EXCEDE {limite} MB')
+                        excedidos.append(f'{nombre}@{filas}: {pico_mb:.1f} MB > {limite} MB')
+                    else:
+                        estado = self.style.SUCCESS(f'OK (<= {limite} MB)')
+
+                    self.stdout.write(f'  - {nombre}: pico {pico_mb:.1f} MB, archivo {tamano_kb:.0f} KB  {estado}')
+                    for sitio in medicion.top[:3]:
+                        self.stdout.write(f"      {sitio['size_diff_kb']:>10.1f} KB  {sitio['sitio']}")
+
+                transaction.set_rollback(True)
+
+        if options['actualizar']:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            ruta.write_text(json.dumps(presupuestos, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'\nPresupuestos guardados en {ruta}'))
+        if excedidos:
+            raise CommandError('Presupuesto de memoria excedido:\n  ' + '\n  '.join(excedidos))
@@ -0,0 +1,99 @@
+"""
+Micro-benchmarks de serializers, reportes y búsquedas de portería (ver api/benchmarks)
+Uso: python manage.py benchmark_micro [--filtro serializer] [--guardar] [--tolerancia 0.05]
+
+Compara contra `benchmarks/baseline_micro.json` y termina con exit code 1 si
+algún caso es una regresión estadísticamente significativa. Los casos de render
+y compresión además reportan los bytes producidos (JSON vs orjson vs msgpack,
+y cada formato sin comprimir vs gzip/brotli).
+"""
+import json
+import platform
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api import benchmarks
+from api.benchmarks import casos  # noqa: F401  (registra los casos)
+from api.datasets import restaurar_o_sembrar
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los micro-benchmarks y los compara con el baseline guardado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filtro', help='Solo casos cuyo nombre contiene este texto')
+        parser.add_argument('--repeticiones', type=int, help='Sobrescribe las repeticiones de cada caso')
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline_micro.json'))
+        parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como nuevo baseline')
+        parser.add_argument('--tolerancia', type=float, default=0.05, help='Cambio relativo ignorado (0.05 = 5%%)')
+
+    def handle(self, *args, **options):
+        seleccion = [c for c in benchmarks.REGISTRO if not options['filtro'] or options['filtro'] in c.nombre]
+        if not seleccion:
+            raise CommandError('Ningún caso coincide con el filtro.')
+
+        ruta = Path(options['baseline'])
+        baseline = json.loads(ruta.read_text())['casos'] if ruta.exists() else {}
+        resultados, regresiones = {}, []
+
+        # Un dataset por escala, compartido por todos los casos de esa escala
+        for filas, grupo in groupby(sorted(seleccion, key=lambda c: c.filas), key=lambda c: c.filas):
+            self.stdout.write(self.style.WARNING(f'\n📦 Dataset de {filas:,} filas'))
+            with transaction.atomic():
+                datos = restaurar_o_sembrar(filas)  # Desde snapshot después de la primera corrida
+                for c in grupo:
+                    funcion = c.preparar(datos)
+                    muestras = benchmarks.medir(funcion, options['repeticiones'] or c.repeticiones, c.calentamiento)
+                    resumen = resultados[c.nombre] = benchmarks.resumir(muestras)
+                    if c.tamano:
+                        resumen['bytes'] = len(funcion())
+                    self.stdout.write(f'  {c.nombre:<34} {self.formato(resumen)}  {self.comparacion(c.nombre, resumen, baseline, options, regresiones)}')
+                transaction.set_rollback(True)
+
+        self.mostrar_tamanos(seleccion, resultados)
+        if options['guardar']:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            ruta.write_text(json.dumps({
+                'fecha': timezone.now().isoformat(),
+                'entorno': {'python': platform.python_version(), 'maquina': platform.machine(), 'db': connection.vendor},
+                'casos': {**baseline, **resultados},
+            }, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'\nBaseline guardado en {ruta}'))
+        if regresiones:
+            raise CommandError('Regresiones detectadas:\n  ' + '\n  '.join(regresiones))
+
+    @staticmethod
+    def formato(r):
+        texto = f"mediana {r['mediana'] * 1000:10.3f} ms  IQR {r['iqr'] * 1000:8.3f} ms  (n={r['n']})"
+        return f"{texto}  {r['bytes']:>10,} B" if 'bytes' in r else texto
+
+    def mostrar_tamanos(self, seleccion, resultados):
+        """Bytes por formato y codificación; los comprimidos, también como % de su versión sin comprimir."""
+        casos = [c for c in seleccion if c.tamano]
+        if not casos:
+            return
+        self.stdout.write(self.style.WARNING('\n📏 Bytes producidos'))
+        for c in casos:
+            tamano = resultados[c.nombre]['bytes']
+            linea = f'  {c.nombre:<34} {tamano:>10,} B'
+            if c.crudo in resultados:
+                crudo = resultados[c.crudo]['bytes']
+                linea += f'  ({tamano / crudo:.1%} de {crudo:,} B sin comprimir)'
+            self.stdout.write(linea)
+
+    def comparacion(self, nombre, resumen, baseline, options, regresiones):
+        if nombre not in baseline:
+            return self.style.WARNING('sin baseline')
+        estado, cambio = benchmarks.comparar(resumen, baseline[nombre], options['tolerancia'])
+        texto = f'{cambio:+.1%} vs baseline'
+        if estado == 'regresion':
+            regresiones.append(f'{nombre}: {texto}')
+            return self.style.ERROR(f'REGRESIÓN {texto}')
+        if estado == 'mejora':
+            return self.style.SUCCESS(f'mejora {texto}')
+        return texto
@@ -0,0 +1,49 @@
+"""
+Compara las latencias por ruta de dos ejecuciones de replay_trafico (build base vs. build nuevo)
+Uso: python manage.py comparar_replay base.json nuevo.json [--tolerancia 0.10]
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import comparar
+
+
+class Command(BaseCommand):
+    help = 'Compara p50/p95/p99 por ruta entre dos resultados de replay_trafico'
+
+    def add_arguments(self, parser):
+        parser.add_argument('base', help='Resultado de replay del build de referencia')
+        parser.add_argument('nuevo', help='Resultado de replay del build a evaluar')
+        parser.add_argument('--tolerancia', type=float, default=0.10, help='Cambio relativo de la mediana que se ignora')
+
+    def handle(self, *args, **options):
+        with open(options['base'], encoding='utf-8') as f:
+            base = json.load(f)['rutas']
+        with open(options['nuevo'], encoding='utf-8') as f:
+            nuevo = json.load(f)['rutas']
+
+        self.stdout.write(f"{'Ruta':<45} {'p50':>17} {'p95':>17} {'p99':>17}")
+        regresiones = 0
+        for ruta in sorted(base.keys() | nuevo.keys()):
+            if ruta not in base or ruta not in nuevo:
+                self.stdout.write(self.style.WARNING(f"{ruta:<45} solo en {'nuevo' if ruta in nuevo else 'base'}"))
+                continue
+            a, b = base[ruta], nuevo[ruta]
+            columnas = ' '.join(
+                f"{a[k]:7.1f}→{b[k]:7.1f}ms" for k in ('mediana', 'p95', 'p99')
+            )
+            veredicto, cambio = comparar(b, a, options['tolerancia'])
+            linea = f'{ruta:<45} {columnas} {cambio:+.0%}'
+            if veredicto == 'regresion':
+                regresiones += 1
+                self.stdout.write(self.style.ERROR(f'{linea} REGRESIÓN'))
+            elif veredicto == 'mejora':
+                self.stdout.write(self.style.SUCCESS(f'{linea} mejora'))
+            else:
+                self.stdout.write(linea)
+            if b.get('distintos'):
+                self.stdout.write(self.style.WARNING(f"    status distintos a lo grabado: {b['distintos']}"))
+
+        resumen = f'{regresiones} ruta(s) con regresión de la mediana'
+        self.stdout.write(self.style.ERROR(resumen) if regresiones else self.style.SUCCESS(resumen))
@@ -0,0 +1,35 @@
+"""
+Genera el esquema OpenAPI precalculado (YAML, JSON y sus versiones comprimidas)
+que sirve /api/schema/ sin introspección (ver api.schema). Es un paso del build:
+correrlo después de cada cambio en viewsets, serializers o urls.
+
+Uso:
+    python manage.py esquema_openapi            escribe los archivos en ESQUEMA['DIRECTORIO']
+    python manage.py esquema_openapi --check    sale con error si los archivos están desactualizados (CI)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api import schema
+
+
+class Command(BaseCommand):
+    help = 'Genera o verifica el esquema OpenAPI precalculado de /api/schema/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='No escribe: falla si el esquema guardado difiere del generado desde el código')
+
+    def handle(self, *args, **options):
+        contenidos = schema.generar()
+        if options['check']:
+            desactualizados = schema.desactualizados(contenidos)
+            if desactualizados:
+                raise CommandError(
+                    f"Esquema desactualizado ({', '.join(desactualizados)}) en {schema.directorio()}: "
+                    'correr `python manage.py esquema_openapi`'
+                )
+            self.stdout.write(self.style.SUCCESS('Esquema al día'))
+            return
+        for ruta in schema.escribir(contenidos):
+            self.stdout.write(f'  {ruta}')
+        self.stdout.write(self.style.SUCCESS(f'Esquema escrito en {schema.directorio()}'))
@@ -0,0 +1,61 @@
+"""
+Perfil de import del arranque de un worker con presupuesto.
+Uso: python manage.py perfil_arranque [--top 15] [--actualizar]
+
+Arranca un intérprete nuevo con `python -X importtime` hasta tener la aplicación
+WSGI y las urls cargadas (lo mismo que hace un worker antes de su primera
+petición), y reporta el tiempo y el RSS resultantes y los paquetes que más
+tardan en importarse. Falla (exit code 1) si se supera el presupuesto de
+`benchmarks/presupuesto_arranque.json` o si se importa al arrancar alguno de
+los módulos diferidos (`api.startup.PROHIBIDOS`).
+"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import startup
+
+MARGEN_ACTUALIZACION = 1.5  # Presupuesto = medido x 1.5 (el tiempo de import varía entre máquinas)
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de import y el RSS del arranque de un worker y los compara con su presupuesto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Paquetes a listar')
+        parser.add_argument('--presupuesto', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'presupuesto_arranque.json'))
+        parser.add_argument('--actualizar', action='store_true', help='Reescribir el presupuesto con los valores medidos')
+
+    def handle(self, *args, **options):
+        try:
+            perfil = startup.perfilar_arranque()
+        except RuntimeError as exc:
+            raise CommandError(f'El arranque falló: {exc}')
+        segundos_ms = perfil['segundos'] * 1000
+        rss_mb = perfil['rss_kb'] / 1024
+
+        self.stdout.write(self.style.WARNING(f'\n🚀 Arranque: {segundos_ms:.0f} ms, RSS {rss_mb:.1f} MB\n'))
+        for paquete, acumulado in startup.por_paquete(perfil['modulos'])[:options['top']]:
+            self.stdout.write(f'  {paquete:<30} {acumulado / 1000:>8.1f} ms')
+
+        fallas = [f'{m} se importa al arrancar (debe ser diferido)' for m in startup.prohibidos_importados(perfil['modulos'])]
+        ruta = Path(options['presupuesto'])
+        if options['actualizar']:
+            ruta.write_text(json.dumps({
+                '_nota': f'Worker hasta tener las urls cargadas (perfil_arranque): ms y RSS en MB, medido x {MARGEN_ACTUALIZACION}.',
+                'arranque_ms': round(segundos_ms * MARGEN_ACTUALIZACION),
+                'rss_mb': round(rss_mb * MARGEN_ACTUALIZACION, 1),
+            }, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'\nPresupuesto actualizado en {ruta}'))
+        elif ruta.exists():
+            presupuesto = json.loads(ruta.read_text())
+            if segundos_ms > presupuesto['arranque_ms']:
+                fallas.append(f"arranque {segundos_ms:.0f} ms > {presupuesto['arranque_ms']} ms")
+            if rss_mb > presupuesto['rss_mb']:
+                fallas.append(f"RSS {rss_mb:.1f} MB > {presupuesto['rss_mb']} MB")
+
+        if fallas:
+            raise CommandError('Presupuesto de arranque excedido:\n  ' + '\n  '.join(fallas))
+        self.stdout.write(self.style.SUCCESS('\nArranque dentro del presupuesto'))
@@ -0,0 +1,19 @@
+"""
+Borra los tombstones (api.models.Eliminacion) más viejos que SYNC['RETENCION_DIAS'].
+Los clientes con un cursor anterior reciben 410 y sincronizan desde cero.
+Uso: python manage.py purgar_eliminaciones [--dias 90]
+"""
+from django.core.management.base import BaseCommand
+
+from api import sync
+
+
+class Command(BaseCommand):
+    help = 'Purga los tombstones de la sincronización delta más viejos que la retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Retención en días (por defecto SYNC["RETENCION_DIAS"])')
+
+    def handle(self, *args, **options):
+        borrados = sync.purgar(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{borrados} tombstones borrados'))
@@ -0,0 +1,247 @@
+"""
+Reproduce tráfico grabado por api.traffic contra una instancia local y guarda
+la distribución de latencias por ruta (para comparar builds con comparar_replay)
+Uso: python manage.py replay_trafico [archivos...] [--url http://127.0.0.1:8000]
+                                     [--velocidad 1|10|max] [--concurrencia 16] [--dataset 10000]
+                                     [--header "Authorization: Bearer ..."] [--salida replay.json]
+
+La instancia tiene que usar la misma base que este comando, con un dataset
+sembrado (`--dataset FILAS` lo restaura antes de empezar, reemplazando los datos).
+Los valores anonimizados se reemplazan por valores de ese dataset (`Dataset`): cada
+hash de un filtro por un valor existente del campo filtrado, siempre el mismo para
+el mismo hash, así los filtros conservan su repetición y devuelven filas reales.
+Los cuerpos JSON y multipart se arman con la forma grabada y valores del dataset.
+"""
+import hashlib
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import Resolver404, resolve
+
+from api import traffic
+from api.benchmarks import resumir
+from api.datasets import restaurar_o_sembrar
+
+
+def _numero(semilla):
+    return int(hashlib.blake2s(semilla.encode(), digest_size=4).hexdigest(), 16)
+
+
+def sintetizar(forma, semilla=''):
+    """Valor con la forma grabada, sin dataset: texto de la longitud grabada derivado de la semilla."""
+    if isinstance(forma, dict):
+        return {k: sintetizar(v, f'{semilla}.{k}') for k, v in forma.items()}
+    if isinstance(forma, list):
+        return [sintetizar(forma[0], f'{semilla}.0')] if forma else []
+    if forma == 'bool':
+        return True
+    if forma == 'int':
+        return _numero(semilla) % 1000 + 1
+    if forma == 'float':
+        return float(_numero(semilla) % 1000)
+    if isinstance(forma, str) and forma.startswith('str:'):
+        largo = int(forma[4:])
+        texto = hashlib.blake2s(semilla.encode()).hexdigest().upper()
+        return (texto * (largo // len(texto) + 1))[:largo]
+    return None
+
+
+def _imagen():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (128, 128, 128)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Dataset:
+    """Valores de la base (el dataset sembrado) que reemplazan a los anonimizados del tráfico."""
+
+    LIMITE = 5000  # Valores distintos por campo
+
+    def __init__(self):
+        self._modelos = {}
+        self._valores = {}
+
+    def modelo(self, registro):
+        """Modelo del ViewSet de la ruta grabada (None para vistas sin queryset)."""
+        if registro['r'] not in self._modelos:
+            try:
+                vista = resolve(registro['p']).func
+            except Resolver404:
+                vista = None
+            queryset = getattr(getattr(vista, 'cls', None), 'queryset', None)
+            self._modelos[registro['r']] = queryset.model if queryset is not None else None
+        return self._modelos[registro['r']]
+
+    @staticmethod
+    def campo(modelo, nombre):
+        """Campo concreto al final de un lookup ('cuota__residente' -> Cuota.residente)."""
+        campo = None
+        for parte in nombre.split('__'):
+            if modelo is None:
+                return None
+            try:
+                campo = modelo._meta.get_field(parte)
+            except FieldDoesNotExist:
+                return None
+            if not campo.concrete:
+                return None
+            modelo = campo.related_model
+        return campo
+
+    def valores(self, campo):
+        clave = (campo.model, campo.attname)
+        if clave not in self._valores:
+            self._valores[clave] = list(
+                campo.model._default_manager.exclude(**{f'{campo.attname}__isnull': True})
+                .order_by(campo.attname).values_list(campo.attname, flat=True).distinct()[:self.LIMITE]
+            )
+        return self._valores[clave]
+
+    def elegir(self, campo, semilla):
+        valores = self.valores(campo)
+        return valores[_numero(semilla) % len(valores)] if valores else None
+
+    def filtros(self, registro):
+        modelo = self.modelo(registro)
+        filtros = {}
+        for clave, valor in registro['q'].items():
+            campo = self.campo(modelo, clave) if valor.startswith('~') else None
+            elegido = self.elegir(campo, valor) if campo is not None else None
+            filtros[clave] = valor if elegido is None else str(elegido)
+        return filtros
+
+    def valor(self, modelo, clave, forma, semilla):
+        campo = self.campo(modelo, clave)
+        if campo is None or isinstance(forma, (dict, list)) or (campo.unique and not campo.is_relation):
+            return sintetizar(forma, semilla)  # Un valor existente chocaría con la restricción unique
+        elegido = self.elegir(campo, semilla)
+        if elegido is None or isinstance(elegido, (bool, int, float, str)):
+            return elegido if elegido is not None else sintetizar(forma, semilla)
+        return str(elegido)  # Decimal, fechas
+
+    def cuerpo(self, registro, semilla):
+        """(bytes, Content-Type) del cuerpo grabado, o (None, None)."""
+        forma = registro.get('b')
+        modelo = self.modelo(registro)
+        if isinstance(forma, dict) and '_multipart' in forma:
+            campos = forma['_multipart']
+            if isinstance(campos, list):  # Grabaciones anteriores: solo las claves
+                campos = {clave: self._forma_de(modelo, clave) for clave in campos}
+            datos = {
+                clave: SimpleUploadedFile(f'{clave}.png', _imagen(), 'image/png') if str(f).startswith('file')
+                else self.valor(modelo, clave, f, f'{semilla}.{clave}')
+                for clave, f in campos.items()
+            }
+            return encode_multipart(BOUNDARY, datos), MULTIPART_CONTENT
+        if forma is None or forma == 'invalid':
+            return None, None
+        if isinstance(forma, dict):
+            datos = {clave: self.valor(modelo, clave, f, f'{semilla}.{clave}') for clave, f in forma.items()}
+        else:
+            datos = sintetizar(forma, semilla)
+        return json.dumps(datos, default=str).encode(), 'application/json'
+
+    def _forma_de(self, modelo, clave):
+        campo = self.campo(modelo, clave)
+        return 'file' if isinstance(campo, models.FileField) or campo is None else 'str:8'
+
+
+class Command(BaseCommand):
+    help = 'Reproduce tráfico grabado (TRAFFIC_RECORDER) y mide latencias por ruta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivos', nargs='*', help='Archivos .jsonl.gz o patrones glob (por defecto todos los de TRAFFIC_RECORDER["DIR"])')
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Instancia contra la que reproducir')
+        parser.add_argument('--velocidad', default='1', help='Multiplicador de tiempo: 1, 10, ... o "max" (sin esperas)')
+        parser.add_argument('--concurrencia', type=int, default=16, help='Peticiones simultáneas como máximo')
+        parser.add_argument('--header', action='append', default=[], help='Header extra "Nombre: valor" (repetible)')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--salida', default='replay.json', help='Archivo JSON de resultados')
+        parser.add_argument('--dataset', type=int, metavar='FILAS',
+                            help='Restaurar (o sembrar) el dataset de esa escala antes de reproducir: reemplaza los datos de la base')
+
+    def handle(self, *args, **options):
+        registros = traffic.leer(options['archivos'])
+        if not registros:
+            raise CommandError('No hay tráfico grabado para reproducir.')
+
+        if options['dataset']:
+            restaurar_o_sembrar(options['dataset'])
+            self.stdout.write(f"Dataset de {options['dataset']:,} filas restaurado")
+        dataset = Dataset()
+        # Las consultas al dataset se hacen acá, antes de repartir en hilos
+        preparados = [(r, dataset.filtros(r), *dataset.cuerpo(r, str(i))) for i, r in enumerate(registros)]
+
+        velocidad = None if options['velocidad'] == 'max' else float(options['velocidad'])
+        headers = dict(h.split(':', 1) for h in options['header'])
+        headers = {k.strip(): v.strip() for k, v in headers.items()}
+        base = options['url'].rstrip('/')
+        latencias, errores, lock = {}, {}, threading.Lock()
+
+        def enviar(registro, filtros, cuerpo, tipo):
+            url = base + registro['p'] + (f"?{urlencode(filtros)}" if filtros else '')
+            peticion = urllib.request.Request(url, data=cuerpo, method=registro['m'], headers={
+                **headers, **({'Content-Type': tipo} if cuerpo is not None else {}),
+            })
+            inicio = time.perf_counter()
+            try:
+                with urllib.request.urlopen(peticion, timeout=options['timeout']) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError:
+                status = 'error'
+            ms = (time.perf_counter() - inicio) * 1000
+            with lock:
+                latencias.setdefault(registro['r'], []).append(ms)
+                if status != registro['s']:
+                    errores.setdefault(registro['r'], {}).setdefault(str(status), 0)
+                    errores[registro['r']][str(status)] += 1
+
+        t0, inicio_replay = registros[0]['t'], time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            for registro, *peticion in preparados:
+                if velocidad:
+                    espera = (registro['t'] - t0) / velocidad - (time.monotonic() - inicio_replay)
+                    if espera > 0:
+                        time.sleep(espera)
+                pool.submit(enviar, registro, *peticion)
+        total_s = time.monotonic() - inicio_replay
+
+        resultado = {
+            'url': base,
+            'velocidad': options['velocidad'],
+            'peticiones': len(registros),
+            'duracion_s': round(total_s, 2),
+            'rutas': {
+                ruta: {**resumir(muestras), 'p99': _percentil(muestras, 0.99),
+                       'p95': _percentil(muestras, 0.95), 'distintos': errores.get(ruta, {})}
+                for ruta, muestras in sorted(latencias.items())
+            },
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2)
+
+        self.stdout.write(f"{len(registros)} peticiones en {total_s:.1f}s (velocidad {options['velocidad']})")
+        for ruta, datos in resultado['rutas'].items():
+            self.stdout.write(f"  {ruta:<45} n={datos['n']:<6} p50={datos['mediana']:8.1f}ms p95={datos['p95']:8.1f}ms p99={datos['p99']:8.1f}ms")
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+
+def _percentil(muestras, q):
+    ordenadas = sorted(muestras)
+    return round(ordenadas[min(int(q * len(ordenadas)), len(ordenadas) - 1)], 3)
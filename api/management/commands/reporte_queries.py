@@ -0,0 +1,60 @@
+"""
+Resume los hallazgos del inspector de queries (N+1 y queries lentas)
+Uso: python manage.py reporte_queries [--top 10] [--log ruta.jsonl]
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from api import query_inspector
+
+
+class Command(BaseCommand):
+    help = 'Muestra los peores N+1 y queries lentas registrados por el inspector de queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Cantidad de resultados por sección')
+        parser.add_argument('--log', help='Archivo JSONL a leer (por defecto QUERY_INSPECTOR["LOG_FILE"])')
+        parser.add_argument('--explain', action='store_true', help='Mostrar el plan EXPLAIN de las queries lentas')
+
+    def handle(self, *args, **options):
+        hallazgos = query_inspector.leer_log(options['log'])
+        if not hallazgos:
+            self.stdout.write(self.style.WARNING('No hay hallazgos registrados.'))
+            return
+
+        self.mostrar_n_plus_one([h for h in hallazgos if h['tipo'] == 'n_plus_one'], options['top'])
+        self.mostrar_lentas([h for h in hallazgos if h['tipo'] == 'slow_query'], options['top'], options['explain'])
+
+    def mostrar_n_plus_one(self, hallazgos, top):
+        """Agrupa por (vista, forma) y ordena por tiempo total desperdiciado"""
+        grupos = defaultdict(lambda: {'peticiones': 0, 'repeticiones': 0, 'total_ms': 0.0, 'ejemplo': None})
+        for h in hallazgos:
+            g = grupos[(h['vista'], h['forma'])]
+            g['peticiones'] += 1
+            g['repeticiones'] += h['repeticiones']
+            g['total_ms'] += h['total_ms']
+            g['ejemplo'] = h
+
+        self.stdout.write(self.style.SUCCESS(f'\n🔁 Peores patrones N+1 ({len(grupos)} distintos)'))
+        ordenados = sorted(grupos.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]
+        for (vista, forma), g in ordenados:
+            ejemplo = g['ejemplo']
+            self.stdout.write(
+                f"  - {vista}: {g['repeticiones']} queries en {g['peticiones']} peticiones "
+                f"({g['total_ms']:.1f} ms, ~{g['repeticiones'] // g['peticiones']} por petición)"
+            )
+            self.stdout.write(f"      campo: {ejemplo.get('serializer_field') or '-'}")
+            self.stdout.write(f"      frame: {ejemplo.get('frame') or '-'}")
+            self.stdout.write(f'      sql:   {forma[:200]}')
+
+    def mostrar_lentas(self, hallazgos, top, con_explain):
+        self.stdout.write(self.style.SUCCESS(f'\n🐢 Queries más lentas ({len(hallazgos)} registradas)'))
+        for h in sorted(hallazgos, key=lambda h: h['ms'], reverse=True)[:top]:
+            self.stdout.write(f"  - {h['ms']:.1f} ms en {h['vista']} ({h['path']})")
+            self.stdout.write(f"      campo: {h.get('serializer_field') or '-'}")
+            self.stdout.write(f"      frame: {h.get('frame') or '-'}")
+            self.stdout.write(f"      sql:   {h['forma'][:200]}")
+            if con_explain and h.get('explain'):
+                for linea in h['explain'].splitlines():
+                    self.stdout.write(f'        {linea}')
@@ -0,0 +1,68 @@
+"""
+Captura y restaura snapshots binarios de los datos (ver api/snapshots.py).
+
+Uso:
+    python manage.py snapshot_datos capturar <nombre> [--sembrar 400 | --comando poblar_datos_lite]
+    python manage.py snapshot_datos restaurar <nombre>
+    python manage.py snapshot_datos listar
+
+Con --sembrar o --comando la base se vacía, se siembra, se captura y se revierte
+todo al terminar: la base de datos queda intacta y el snapshot solo tiene lo sembrado.
+"""
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import snapshots
+from api.datasets import sembrar_completo
+
+
+class Command(BaseCommand):
+    help = 'Captura o restaura un snapshot binario de las tablas de la API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('accion', choices=['capturar', 'restaurar', 'listar'])
+        parser.add_argument('nombre', nargs='?')
+        parser.add_argument('--sembrar', type=int, metavar='FILAS', help='Capturar un dataset de api.datasets a esta escala')
+        parser.add_argument('--comando', help='Capturar lo que siembra este comando (p. ej. poblar_datos_lite)')
+
+    def handle(self, *args, **options):
+        if options['accion'] == 'listar':
+            for nombre in snapshots.listar():
+                manifest = snapshots.leer_manifest(nombre)
+                filas = sum(t['filas'] for t in manifest['tablas'])
+                self.stdout.write(f"  {nombre:<20} {manifest['motor']:<10} {filas:>10,} filas  {snapshots.ruta(nombre).stat().st_size / 1024:>9.0f} KB")
+            return
+        if not options['nombre']:
+            raise CommandError('Falta el nombre del snapshot')
+
+        inicio = time.perf_counter()
+        if options['accion'] == 'capturar':
+            manifest = self._capturar(options)
+            verbo = 'capturado'
+        else:
+            try:
+                manifest = snapshots.restaurar(options['nombre'])
+            except snapshots.SnapshotInvalido as exc:
+                raise CommandError(str(exc))
+            verbo = 'restaurado'
+        filas = sum(t['filas'] for t in manifest['tablas'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {options['nombre']} {verbo}: {filas:,} filas en {time.perf_counter() - inicio:.1f} s "
+            f"({snapshots.ruta(options['nombre'])})"
+        ))
+
+    def _capturar(self, options):
+        if not (options['sembrar'] or options['comando']):
+            return snapshots.capturar(options['nombre'])
+        with transaction.atomic():
+            snapshots.vaciar()
+            if options['sembrar']:
+                sembrar_completo(options['sembrar'])
+            else:
+                call_command(options['comando'], stdout=self.stdout)
+            manifest = snapshots.capturar(options['nombre'])
+            transaction.set_rollback(True)
+        return manifest
@@ -0,0 +1,67 @@
+"""
+Muestra las trazas más lentas registradas por api.tracing como árbol de spans
+Uso: python manage.py trazas [--top 5] [--ruta /api/reportes/] [--min-ms 1]
+"""
+from django.core.management.base import BaseCommand
+
+from api import tracing
+
+
+def _atributos(span):
+    return {a['key']: next(iter(a['value'].values())) for a in span.get('attributes', [])}
+
+
+def _duracion_ms(span):
+    return (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1e6
+
+
+class Command(BaseCommand):
+    help = 'Renderiza las trazas más lentas como árbol de spans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=5, help='Cantidad de trazas a mostrar')
+        parser.add_argument('--ruta', help='Filtrar por prefijo de ruta (url.path)')
+        parser.add_argument('--min-ms', type=float, default=0.0, help='Ocultar spans más cortos que este valor')
+        parser.add_argument('--archivo', help='Archivo de trazas (por defecto TRACING["FILE"])')
+
+    def handle(self, *args, **options):
+        trazas = []
+        for trace_id, spans in tracing.leer_trazas(options['archivo']).items():
+            raiz = next((s for s in spans if s['name'] == 'request'), None)
+            if raiz is None:
+                continue
+            if options['ruta'] and not _atributos(raiz).get('url.path', '').startswith(options['ruta']):
+                continue
+            trazas.append((_duracion_ms(raiz), trace_id, raiz, spans))
+
+        if not trazas:
+            self.stdout.write(self.style.WARNING('No hay trazas registradas.'))
+            return
+
+        trazas.sort(key=lambda t: t[0], reverse=True)
+        for duracion, trace_id, raiz, spans in trazas[:options['top']]:
+            attrs = _atributos(raiz)
+            self.stdout.write(self.style.SUCCESS(
+                f"\n{duracion:8.1f} ms  {attrs.get('http.method', '')} {attrs.get('url.path', '')} "
+                f"-> {attrs.get('http.route', '?')} [{attrs.get('http.status_code', '?')}]  trace={trace_id}"
+            ))
+            hijos = {}
+            for s in spans:
+                hijos.setdefault(s.get('parentSpanId'), []).append(s)
+            self.mostrar_hijos(hijos, raiz['spanId'], 1, options['min_ms'])
+
+    def mostrar_hijos(self, hijos, span_id, nivel, min_ms):
+        omitidos = 0
+        for s in sorted(hijos.get(span_id, []), key=lambda s: int(s['startTimeUnixNano'])):
+            duracion = _duracion_ms(s)
+            if duracion < min_ms:
+                omitidos += 1
+                continue
+            attrs = _atributos(s)
+            detalle = attrs.get('db.statement', '')[:90] if s['name'] == 'sql' else ''
+            if attrs.get('aggregated'):
+                detalle = f"x{attrs.get('calls')}"
+            self.stdout.write(f"{'  ' * nivel}{duracion:8.2f} ms  {s['name']}  {detalle}")
+            self.mostrar_hijos(hijos, s['spanId'], nivel + 1, min_ms)
+        if omitidos:
+            self.stdout.write(f"{'  ' * nivel}... {omitidos} spans < {min_ms} ms")
@@ -0,0 +1,33 @@
+"""
+Calienta la base de datos, la caché de respuestas y el proceso después de un deploy
+(placas autorizadas, QR de hoy, áreas comunes, esquema OpenAPI, KPIs del dashboard).
+Ver api/warmup.py.
+
+Uso: python manage.py warmup [--etapa placas visitas_qr ...]
+Falla (exit code 1) si alguna etapa dio error.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api import warmup
+
+
+class Command(BaseCommand):
+    help = 'Precarga los datos calientes después de un deploy y reporta la duración de cada etapa'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--etapa', nargs='+', choices=[e.nombre for e in warmup.ETAPAS],
+                            help='Solo estas etapas (por defecto todas)')
+
+    def handle(self, *args, **options):
+        resultados = warmup.ejecutar(options['etapa'])
+        self.stdout.write(self.style.WARNING('\n🔥 Calentamiento\n'))
+        for r in resultados:
+            if 'error' in r:
+                self.stdout.write(self.style.ERROR(f"  {r['etapa']:<15} {r['ms']:>8.1f} ms  {r['error']}"))
+            else:
+                self.stdout.write(f"  {r['etapa']:<15} {r['ms']:>8.1f} ms  {r['detalle']}")
+        total = sum(r['ms'] for r in resultados)
+        fallidas = [r['etapa'] for r in resultados if 'error' in r]
+        if fallidas:
+            raise CommandError(f"Etapas con error: {', '.join(fallidas)}")
+        self.stdout.write(self.style.SUCCESS(f'\nListo en {total:.0f} ms'))
@@ -0,0 +1,109 @@
+"""
+Perfil de memoria con tracemalloc para vistas de reportes, exportaciones y listados.
+
+`MedicionMemoria` mide el pico de memoria asignada por Python durante un bloque
+y los sitios (archivo:línea) que más memoria retuvieron. La usan:
+    - `MemoryProfilerMiddleware`, sobre las acciones de `MEMORY_PROFILER['ACTIONS']`
+      que un administrador pide explícitamente con la cabecera `X-Memory-Profile`.
+    - `python manage.py benchmark_memoria`, que valida presupuestos por reporte.
+
+tracemalloc es global al proceso, así que las mediciones se serializan con un lock
+(y su costo es alto): activar solo en staging. El middleware no espera ese lock:
+si ya hay una medición en curso, la petición sigue sin medir.
+"""
+import json
+import logging
+import threading
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'ACTIONS': ('list', 'reporte_finanzas', 'reporte_seguridad'),
+    'HEADER': 'X-Memory-Profile',
+    'FRAMES': 10,
+    'TOP': 10,
+    'LOG_FILE': None,
+}
+
+_lock = threading.Lock()
+
+
+def config(clave):
+    return getattr(settings, 'MEMORY_PROFILER', {}).get(clave, DEFAULTS[clave])
+
+
+class Ocupado(Exception):
+    """Otra medición está en curso en el proceso."""
+
+
+class MedicionMemoria:
+    """
+    Context manager: `peak_bytes`, `net_bytes` y `top` quedan disponibles al salir.
+    Con `bloquear=False` lanza `Ocupado` en lugar de esperar a otra medición.
+    """
+
+    def __init__(self, frames=None, top=None, bloquear=True):
+        self.bloquear = bloquear
+        self.frames = frames or config('FRAMES')
+        self.top_n = top or config('TOP')
+        self.peak_bytes = 0
+        self.net_bytes = 0
+        self.top = []
+        self._iniciado_aqui = False
+
+    def __enter__(self):
+        if not _lock.acquire(blocking=self.bloquear):
+            raise Ocupado
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._iniciado_aqui = True
+        self._antes = tracemalloc.take_snapshot()
+        self._base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            actual, pico = tracemalloc.get_traced_memory()
+            self.peak_bytes = pico - self._base
+            self.net_bytes = actual - self._base
+            despues = tracemalloc.take_snapshot()
+            filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            diferencias = despues.filter_traces(filtros).compare_to(self._antes.filter_traces(filtros), 'lineno')
+            self.top = [{
+                'sitio': f'{d.traceback[0].filename}:{d.traceback[0].lineno}',
+                'size_diff_kb': round(d.size_diff / 1024, 1),
+                'count_diff': d.count_diff,
+            } for d in diferencias[:self.top_n]]
+        finally:
+            self._antes = None
+            if self._iniciado_aqui:
+                tracemalloc.stop()
+            _lock.release()
+        return False
+
+    def resumen(self):
+        return {
+            'peak_mb': round(self.peak_bytes / 1024 / 1024, 2),
+            'net_mb': round(self.net_bytes / 1024 / 1024, 2),
+            'top': self.top,
+        }
+
+
+def log_file():
+    return Path(config('LOG_FILE') or Path(settings.BASE_DIR) / 'logs' / 'memoria.jsonl')
+
+
+def guardar(vista, path, medicion):
+    registro = {'fecha': timezone.now().isoformat(), 'vista': vista, 'path': path, **medicion.resumen()}
+    logger.info('Memoria %s: pico %.2f MB', vista, registro['peak_mb'])
+    destino = log_file()
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with destino.open('a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + '\n')
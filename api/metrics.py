@@ -0,0 +1,300 @@
+"""
+Métricas de rendimiento en proceso con exposición en formato Prometheus.
+
+Cada worker acumula histogramas en memoria (tiempo total, tiempo de BD,
+cantidad de queries, tiempo de serialización y tamaño de respuesta) etiquetados
+por vista y acción. Con gunicorn hay varios procesos, así que cada worker
+vuelca periódicamente su estado a `METRICS_DIR/<pid>.json` y el endpoint
+`/metrics` fusiona todos los archivos del directorio antes de responder. Los
+archivos de workers que ya terminaron (reciclados por `max_requests` o
+reiniciados) se pliegan en `finalizados.json` y se borran: el directorio no crece
+y los contadores no retroceden. La liveness se comprueba por PID, así que el
+directorio no se comparte entre máquinas ni contenedores.
+
+`/metrics` responde solo con `METRICS_TOKEN` (Bearer) o desde `METRICS_IPS`
+(IPs o redes del scraper); sin ninguno de los dos configurado, solo con DEBUG.
+"""
+import contextvars
+import fcntl
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+LABELS = ('view', 'action', 'method')
+FINALIZADOS = 'finalizados.json'
+
+
+# ========================
+# ESTADÍSTICAS POR PETICIÓN
+# ========================
+
+class RequestStats:
+    """Contadores de la petición en curso (BD y serialización)."""
+    __slots__ = ('db_time', 'queries', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def sumar(self, otra):
+        self.db_time += otra.db_time
+        self.queries += otra.queries
+        self.serializer_time += otra.serializer_time
+
+
+_current_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+def current_stats():
+    """Retorna las estadísticas de la petición activa o None fuera de una petición."""
+    return _current_stats.get()
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current_stats.set(stats)
+
+
+def end_request(token):
+    _current_stats.reset(token)
+
+
+# ========================
+# HISTOGRAMAS
+# ========================
+
+class Histogram:
+    """Histograma acumulativo con etiquetas, compatible con Prometheus."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, labels, value):
+        serie = self.series.get(labels)
+        if serie is None:
+            serie = self.series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+        for i, limite in enumerate(self.buckets):
+            if value <= limite:
+                serie['buckets'][i] += 1
+        serie['sum'] += value
+        serie['count'] += 1
+
+
+class Counter:
+    """Contador monotónico con etiquetas propias (p. ej. aciertos de caché)."""
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.series = {}
+
+    def inc(self, labels, cantidad=1):
+        serie = self.series.get(labels)
+        if serie is None:
+            serie = self.series[labels] = {'value': 0}
+        serie['value'] += cantidad
+
+
+class MetricsRegistry:
+    """Registro de histogramas y contadores del worker actual."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self.histograms = {
+            h.name: h for h in (
+                Histogram('condominio_request_duration_seconds', 'Duración total de la petición', DURATION_BUCKETS),
+                Histogram('condominio_db_duration_seconds', 'Tiempo acumulado en la base de datos', DURATION_BUCKETS),
+                Histogram('condominio_db_queries', 'Cantidad de queries SQL por petición', QUERY_COUNT_BUCKETS),
+                Histogram('condominio_serializer_duration_seconds', 'Tiempo en to_representation de serializers', DURATION_BUCKETS),
+                Histogram('condominio_response_size_bytes', 'Tamaño del cuerpo de la respuesta', SIZE_BUCKETS),
+            )
+        }
+        self.counters = {
+            c.name: c for c in (
+                Counter('condominio_cache_requests_total', 'Consultas a la caché de respuestas por resultado', ('view', 'result')),
+                Counter('condominio_load_shedding_total', 'Decisiones de descarte de carga por nivel de prioridad', ('nivel', 'decision')),
+            )
+        }
+
+    def record(self, labels, total, stats, size):
+        with self._lock:
+            self.histograms['condominio_request_duration_seconds'].observe(labels, total)
+            self.histograms['condominio_db_duration_seconds'].observe(labels, stats.db_time)
+            self.histograms['condominio_db_queries'].observe(labels, stats.queries)
+            self.histograms['condominio_serializer_duration_seconds'].observe(labels, stats.serializer_time)
+            if size is not None:
+                self.histograms['condominio_response_size_bytes'].observe(labels, size)
+        self.maybe_flush()
+
+    def inc(self, name, labels, cantidad=1):
+        with self._lock:
+            self.counters[name].inc(labels, cantidad)
+        self.maybe_flush()
+
+    def snapshot(self):
+        """Estado serializable a JSON: {metrica: {"view|action|method": serie}}."""
+        with self._lock:
+            estado = {
+                name: {'|'.join(labels): {
+                    'buckets': list(serie['buckets']), 'sum': serie['sum'], 'count': serie['count'],
+                } for labels, serie in h.series.items()}
+                for name, h in self.histograms.items()
+            }
+            estado.update({
+                name: {'|'.join(labels): dict(serie) for labels, serie in c.series.items()}
+                for name, c in self.counters.items()
+            })
+            return estado
+
+    # --- Agregación multi-worker (gunicorn) ---
+
+    def maybe_flush(self):
+        directorio = getattr(settings, 'METRICS_DIR', None)
+        if not directorio:
+            return
+        ahora = time.monotonic()
+        if ahora - self._last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            return
+        self._last_flush = ahora
+        self.flush(directorio)
+
+    def flush(self, directorio):
+        """Escribe el snapshot del worker de forma atómica en `<directorio>/<pid>.json`."""
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        destino = directorio / f'{os.getpid()}.json'
+        temporal = destino.with_suffix('.tmp')
+        temporal.write_text(json.dumps(self.snapshot()))
+        os.replace(temporal, destino)
+
+    def collect(self):
+        """Fusiona el estado de todos los workers (incluido el propio, en vivo)."""
+        snapshots = [self.snapshot()]
+        directorio = getattr(settings, 'METRICS_DIR', None)
+        if directorio and Path(directorio).is_dir():
+            podar(Path(directorio))
+            propio = f'{os.getpid()}.json'
+            for archivo in Path(directorio).glob('*.json'):
+                if archivo.name == propio:
+                    continue
+                try:
+                    snapshots.append(json.loads(archivo.read_text()))
+                except (OSError, ValueError):
+                    continue  # Worker escribiendo o archivo corrupto: se omite en este scrape
+        return merge_snapshots(snapshots)
+
+    def render_prometheus(self):
+        return render_prometheus(self.collect(), self.histograms, self.counters)
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, de otro usuario
+    return True
+
+
+def _leer(archivo):
+    try:
+        return json.loads(archivo.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def podar(directorio):
+    """Pliega en `finalizados.json` los snapshots de los workers que ya no existen y borra sus archivos."""
+    with open(directorio / '.lock', 'a') as candado:
+        fcntl.flock(candado, fcntl.LOCK_EX)  # Dos scrapes simultáneos no pliegan el mismo archivo dos veces
+        muertos = [a for a in directorio.glob('*.json') if a.stem.isdigit() and not _vivo(int(a.stem))]
+        if not muertos:
+            return
+        destino = directorio / FINALIZADOS
+        temporal = destino.with_suffix('.tmp')
+        temporal.write_text(json.dumps(merge_snapshots([_leer(destino), *map(_leer, muertos)])))
+        os.replace(temporal, destino)
+        for archivo in muertos:
+            archivo.unlink(missing_ok=True)
+
+
+def acceso_permitido(request):
+    """`/metrics`: Bearer `METRICS_TOKEN` o una IP de `METRICS_IPS` (con DEBUG, si no hay ninguno)."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    redes = getattr(settings, 'METRICS_IPS', ())
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    if redes:
+        try:
+            ip = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+        except ValueError:
+            return False
+        return any(ip in ipaddress.ip_network(red, strict=False) for red in redes)
+    return not token and settings.DEBUG
+
+
+def merge_snapshots(snapshots):
+    fusion = {}
+    for snapshot in snapshots:
+        for name, series in snapshot.items():
+            destino = fusion.setdefault(name, {})
+            for key, serie in series.items():
+                actual = destino.get(key)
+                if 'value' in serie:
+                    destino[key] = {'value': serie['value'] + (actual['value'] if actual else 0)}
+                    continue
+                if actual is None:
+                    destino[key] = {'buckets': list(serie['buckets']), 'sum': serie['sum'], 'count': serie['count']}
+                    continue
+                actual['buckets'] = [a + b for a, b in zip(actual['buckets'], serie['buckets'])]
+                actual['sum'] += serie['sum']
+                actual['count'] += serie['count']
+    return fusion
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(snapshot, histograms, counters=None):
+    """Formato de exposición de texto de Prometheus (version 0.0.4)."""
+    lineas = []
+    for name, h in histograms.items():
+        lineas.append(f'# HELP {name} {h.documentation}')
+        lineas.append(f'# TYPE {name} histogram')
+        for key, serie in sorted(snapshot.get(name, {}).items()):
+            etiquetas = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(LABELS, key.split('|')))
+            for limite, cantidad in zip(h.buckets, serie['buckets']):
+                lineas.append(f'{name}_bucket{{{etiquetas},le="{limite}"}} {cantidad}')
+            lineas.append(f'{name}_bucket{{{etiquetas},le="+Inf"}} {serie["count"]}')
+            lineas.append(f'{name}_sum{{{etiquetas}}} {serie["sum"]}')
+            lineas.append(f'{name}_count{{{etiquetas}}} {serie["count"]}')
+    for name, c in (counters or {}).items():
+        lineas.append(f'# HELP {name} {c.documentation}')
+        lineas.append(f'# TYPE {name} counter')
+        for key, serie in sorted(snapshot.get(name, {}).items()):
+            etiquetas = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(c.labels, key.split('|')))
+            lineas.append(f'{name}{{{etiquetas}}} {serie["value"]}')
+    return '\n'.join(lineas) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,324 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from . import compression, db_routing, load_shedding, memory_profiling, metrics, profiling, query_inspector, tracing, traffic
+
+
+def resolver_vista(view_func, method):
+    """
+    Retorna (vista, acción) para etiquetar métricas.
+    Los ViewSets de DRF exponen `cls` y el mapeo `actions` ({'get': 'list'}).
+    """
+    vista = getattr(view_func, 'cls', view_func)
+    acciones = getattr(view_func, 'actions', None) or {}
+    return getattr(vista, '__name__', 'unknown'), acciones.get(method.lower(), method.lower())
+
+
+class PerformanceMetricsMiddleware:
+    """
+    Mide cada petición: tiempo total, tiempo y cantidad de queries SQL,
+    tiempo de serialización y tamaño de respuesta.
+
+    - Agrega los valores en los histogramas de `api.metrics` (expuestos en /metrics).
+    - Emite la cabecera `Server-Timing` para verlos desde las DevTools del navegador.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats, token = metrics.start_request()
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(self._medir_query))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        total = time.perf_counter() - inicio
+
+        size = None
+        if not response.streaming:
+            size = len(response.content)
+        elif response.has_header('Content-Length'):
+            size = int(response['Content-Length'])
+
+        vista, accion = getattr(request, '_metricas_vista', ('unresolved', request.method.lower()))
+        metrics.registry.record((vista, accion, request.method), total, stats, size)
+
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'ser;dur={stats.serializer_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metricas_vista = resolver_vista(view_func, request.method)
+        return None
+
+    @staticmethod
+    def _medir_query(execute, sql, params, many, context):
+        stats = metrics.current_stats()
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if stats is not None:
+                stats.db_time += time.perf_counter() - inicio
+                stats.queries += 1
+
+
+class LoadSheddingMiddleware:
+    """
+    Admite o descarta cada petición según su nivel de prioridad (ver
+    `api.load_shedding`) antes de ejecutar la vista. Va justo dentro de las
+    métricas: los 503/429 también quedan en los histogramas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            nivel = getattr(request, '_nivel_admitido', None)
+            if nivel is not None:
+                load_shedding.limitador.liberar(nivel, time.perf_counter() - request._nivel_inicio)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not load_shedding.config('ENABLED'):
+            return None
+        nivel = load_shedding.clasificar(*resolver_vista(view_func, request.method))
+        if nivel is None:
+            return None
+        decision = load_shedding.limitador.admitir(nivel, load_shedding.cliente(request, nivel))
+        load_shedding.registrar(nivel, decision)
+        if decision.admitida:
+            request._nivel_admitido, request._nivel_inicio = nivel, time.perf_counter()
+            return None
+        response = JsonResponse(decision.cuerpo(nivel), status=decision.status)
+        response['Retry-After'] = str(decision.retry_after)
+        return response
+
+
+class TracingMiddleware:
+    """
+    Abre el span raíz de las peticiones muestreadas y registra cada query SQL
+    como span hijo (ver `api.tracing`).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = tracing.config('ENABLED')
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        traza, token = tracing.iniciar(request)
+        if traza is None:
+            return self.get_response(request)
+
+        try:
+            with tracing.Span(traza, 'request', tracing.SPAN_KIND_SERVER, {
+                'http.method': request.method, 'url.path': request.path,
+            }) as raiz:
+                with ExitStack() as stack:
+                    for conn in connections.all():
+                        stack.enter_context(conn.execute_wrapper(tracing.medir_query))
+                    response = self.get_response(request)
+                vista, accion = getattr(request, '_metricas_vista', ('unresolved', ''))
+                raiz.set('http.route', f'{vista}.{accion}')
+                raiz.set('http.status_code', response.status_code)
+        finally:
+            tracing.finalizar(traza, token)
+        response['traceparent'] = f'00-{traza.trace_id}-{raiz.span_id}-01'
+        return response
+
+
+class QueryInspectorMiddleware:
+    """
+    Modo desarrollo/staging: detecta N+1 y queries lentas por petición
+    (ver `api.query_inspector`). Se activa con `QUERY_INSPECTOR['ENABLED']`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = query_inspector.config('ENABLED')
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        inspector = query_inspector.QueryInspector(vista='unresolved')
+        request._query_inspector = inspector
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(inspector))
+            response = self.get_response(request)
+        query_inspector.guardar(inspector.hallazgos(request.path))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        inspector = getattr(request, '_query_inspector', None)
+        if inspector is not None:
+            inspector.vista = '.'.join(resolver_vista(view_func, request.method))
+        return None
+
+
+class ProfilerMiddleware:
+    """
+    Perfila una sola petición cuando un administrador envía la cabecera
+    `X-Profile` (ver `api.profiling`). Sin la cabecera el costo es una
+    búsqueda en el diccionario de cabeceras.
+    Debe ir después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = profiling.config('HEADER')
+
+    def __call__(self, request):
+        valor = request.headers.get(self.header)
+        if valor is None:
+            return self.get_response(request)
+        usuario = profiling.usuario(request)
+        profiler = profiling.crear_profiler(valor) if profiling.es_admin(usuario) else None
+        if profiler is None:
+            return self.get_response(request)
+        return profiling.medir(self.get_response, request, profiler, usuario)
+
+
+class MemoryProfilerMiddleware:
+    """
+    Mide con tracemalloc el pico de memoria de las acciones configuradas en
+    `MEMORY_PROFILER['ACTIONS']` (reportes, exportaciones y listados) y registra
+    los sitios que más asignan (ver `api.memory_profiling`). Solo cuando un
+    administrador lo pide con la cabecera `MEMORY_PROFILER['HEADER']`, y sin
+    esperar si otra petición se está midiendo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = memory_profiling.config('ENABLED')
+        self.acciones = set(memory_profiling.config('ACTIONS'))
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            medicion = getattr(request, '_medicion_memoria', None)
+            if medicion is not None:
+                medicion.__exit__(None, None, None)
+        if medicion is not None:
+            memory_profiling.guardar('.'.join(request._metricas_vista), request.path, medicion)
+            response['X-Memory-Peak-MB'] = f'{medicion.peak_bytes / 1024 / 1024:.2f}'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not (self.enabled and request.headers.get(memory_profiling.config('HEADER'))):
+            return None
+        if resolver_vista(view_func, request.method)[1] in self.acciones and profiling.es_admin(profiling.usuario(request)):
+            try:
+                request._medicion_memoria = memory_profiling.MedicionMemoria(bloquear=False).__enter__()
+            except memory_profiling.Ocupado:
+                pass  # No se encolan peticiones detrás de otra medición
+        return None
+
+
+class TrafficRecorderMiddleware:
+    """
+    Graba un resumen anonimizado de cada petición para reproducirlo luego con
+    `manage.py replay_trafico` (ver `api.traffic`). Opt-in con `TRAFFIC_RECORDER['ENABLED']`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = traffic.config('ENABLED')
+
+    def __call__(self, request):
+        if not self.enabled or not traffic.debe_grabar(request):
+            return self.get_response(request)
+        cuerpo = traffic.forma_cuerpo(request)
+        inicio = time.time()
+        medida = time.perf_counter()
+        response = self.get_response(request)
+        traffic.grabador.agregar(traffic.registro(request, response, inicio, time.perf_counter() - medida, cuerpo))
+        return response
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Clasifica la petición por carga para `api.db_routing.PrimaryReplicaRouter`
+    y marca al cliente para leer del primario después de escribir.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, '_db_carga_token', None)
+            if token is not None:
+                db_routing.restaurar(token)
+        db_routing.marcar_escritura(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not db_routing.config('ENABLED'):
+            return
+        _, accion = resolver_vista(view_func, request.method)
+        carga = db_routing.clasificar(accion, request.method, db_routing.primario_forzado(request))
+        request._db_carga = carga
+        request._db_carga_token = db_routing.activar(carga)
+
+
+class CompressionMiddleware:
+    """
+    Comprime con brotli o gzip las respuestas comprimibles de más de
+    `COMPRESSION['UMBRAL_BYTES']` (ver `api.compression`). Va dentro de las
+    métricas, así `condominio_response_size_bytes` mide lo que sale por la red.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = compression.config('ENABLED')
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.enabled or response.streaming or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < compression.config('UMBRAL_BYTES') or not compression.comprimible(response):
+            return response
+        codificacion = compression.elegir(request.headers.get('Accept-Encoding', ''))
+        if codificacion is None:
+            return response
+
+        with tracing.span('compresion', codificacion=codificacion, bytes=len(response.content)):
+            comprimido = compression.comprimir(response.content, codificacion)
+        if len(comprimido) >= len(response.content):
+            return response
+        response.content = comprimido
+        response['Content-Length'] = str(len(comprimido))
+        response['Content-Encoding'] = codificacion
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # El cuerpo cambió: el ETag fuerte pasa a débil (igual que GZipMiddleware)
+            response['ETag'] = 'W/' + etag
+        return response
@@ -1,12 +1,68 @@
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import User
 
 
+# ========================
+# SINCRONIZACIÓN (App Móvil)
+# ========================
+
+class SincronizableQuerySet(models.QuerySet):
+    def delete(self):
+        from .sync import tombstones_en_lote
+
+        with tombstones_en_lote(self.db):
+            return super().delete()
+
+
+class Sincronizable(models.Model):
+    """
+    Base de los modelos que la App Móvil sincroniza por delta (ver api/sync.py).
+    `fecha_actualizacion` cambia en cada save(); las escrituras que no pasan por
+    save() (`QuerySet.update`, `bulk_update`) deben actualizarla explícitamente.
+    `delete()` (de la instancia o del queryset) inserta los tombstones de todo el
+    borrado, cascadas incluidas, con un solo bulk_create.
+    """
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = SincronizableQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, using=None, keep_parents=False):
+        from .sync import tombstones_en_lote
+
+        with tombstones_en_lote(using or router.db_for_write(self.__class__, instance=self)):
+            return super().delete(using, keep_parents)
+
+
+class Eliminacion(models.Model):
+    """
+    Tombstone: registro de una fila borrada de un modelo sincronizable, para que
+    la sincronización delta pueda informar los borrados. El `delete()` de un
+    modelo sincronizable, de una instancia o de un queryset, corre dentro de
+    `api.sync.tombstones_en_lote`: post_delete solo acumula los tombstones (los
+    de las cascadas también) y se insertan con un único `bulk_create` antes de
+    confirmar. Un borrado que no pasa por ese bloque (p. ej. la cascada desde un
+    `User`) crea su tombstone en post_delete, uno por fila.
+    """
+    recurso = models.CharField(max_length=50, help_text="Recurso de la API (ej: cuotas)")
+    objeto_id = models.BigIntegerField()
+    residente_id = models.BigIntegerField(blank=True, null=True, db_index=True, help_text="Residente dueño de la fila (None: visible para todos)")
+    fecha_eliminacion = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Eliminaciones"
+
+    def __str__(self):
+        return f"{self.recurso} #{self.objeto_id}"
+
+
 # ========================
 # GESTIÓN DE USUARIOS
 # ========================
 
-class UnidadHabitacional(models.Model):
+class UnidadHabitacional(Sincronizable):
     """
     Modelo que representa un departamento o casa dentro del condominio.
     
@@ -76,7 +132,7 @@ class PersonalMantenimiento(models.Model):
         return f"Mantenimiento: {self.user.get_full_name() or self.user.username} ({self.especialidad})"
 
 
-class Residente(models.Model):
+class Residente(Sincronizable):
     """
     Perfil principal del usuario final.
     
@@ -112,7 +168,7 @@ class Residente(models.Model):
 # FINANZAS
 # ========================
 
-class Cuota(models.Model):
+class Cuota(Sincronizable):
     """
     Registro de deuda mensual (expensas).
     Puede estar en estado pendiente, pagada o vencida.
@@ -139,7 +195,7 @@ class Cuota(models.Model):
         return f"Cuota {self.mes} - {self.residente.user.username} ({self.get_estado_display()})"
 
 
-class Pago(models.Model):
+class Pago(Sincronizable):
     """
     Registro transaccional de un pago realizado.
     Vinculado a una Cuota específica.
@@ -163,7 +219,7 @@ class Pago(models.Model):
 # ÁREAS COMUNES Y RESERVAS
 # ========================
 
-class AreaComun(models.Model):
+class AreaComun(Sincronizable):
     """
     Espacios compartidos susceptibles de reserva.
     """
@@ -180,7 +236,7 @@ class AreaComun(models.Model):
         return self.nombre
 
 
-class Reserva(models.Model):
+class Reserva(Sincronizable):
     """
     Solicitud de uso de un Área Común en un horario específico.
     """
@@ -213,7 +269,7 @@ class Reserva(models.Model):
 # MANTENIMIENTO
 # ========================
 
-class TicketMantenimiento(models.Model):
+class TicketMantenimiento(Sincronizable):
     """
     Reporte de incidencias o solicitudes de reparación.
     """
@@ -261,7 +317,7 @@ class TicketMantenimiento(models.Model):
 # SEGURIDAD Y CONTROL DE ACCESO
 # ========================
 
-class Visita(models.Model):
+class Visita(Sincronizable):
     """
     Registro de visitantes externos.
     
@@ -298,7 +354,15 @@ class Visita(models.Model):
         return f"Visita: {self.nombre_visitante} -> {self.residente}"
 
 
-class VehiculoAutorizado(models.Model):
+_SEPARADORES_PLACA = str.maketrans('', '', ' -')
+
+
+def normalizar_placa(placa):
+    """Placa en mayúsculas, sin espacios ni guiones (formato guardado y comparado con el OCR)."""
+    return placa.upper().translate(_SEPARADORES_PLACA)
+
+
+class VehiculoAutorizado(Sincronizable):
     """
     Vehículos permitidos para ingreso automático.
     
@@ -321,14 +385,14 @@ class VehiculoAutorizado(models.Model):
     def save(self, *args, **kwargs):
         # Normalización: Guardar placa siempre en mayúsculas y sin espacios
         if self.placa:
-            self.placa = self.placa.upper().replace(" ", "").replace("-", "")
+            self.placa = normalizar_placa(self.placa)
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.placa} ({self.modelo})"
 
 
-class AlertaSeguridad(models.Model):
+class AlertaSeguridad(Sincronizable):
     """
     Incidencias de seguridad detectadas automáticamente o reportadas.
     
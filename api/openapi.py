@@ -0,0 +1,22 @@
+"""
+`DEFAULT_SCHEMA_CLASS` de la API (ver `REST_FRAMEWORK` en settings).
+
+Va en su propio módulo porque `drf_spectacular.views` resuelve la clase al
+importarse: definida en `api.schema` sería un import circular. Como el resto de
+drf-spectacular, se importa recién al generar el esquema (ver `api.startup`).
+"""
+from drf_spectacular.openapi import AutoSchema as AutoSchemaSpectacular
+
+
+class AutoSchema(AutoSchemaSpectacular):
+    """
+    El PATCH masivo sobre el listado (`api.viewsets.BulkRouter`) recibe su propio
+    operationId: si no, choca con el PATCH del detalle (`<recurso>_partial_update`)
+    y drf-spectacular los numera.
+    """
+
+    def get_operation_id(self):
+        operation_id = super().get_operation_id()
+        if getattr(self.view, 'action', None) == 'bulk_partial_update':
+            return f"{operation_id.removesuffix('_partial_update')}_bulk_partial_update"
+        return operation_id
@@ -0,0 +1,191 @@
+"""
+Profiler bajo demanda para una sola petición.
+
+Un administrador envía la cabecera `X-Profile` (configurable en `PROFILER['HEADER']`):
+    - `X-Profile: sampling` (o `1`): muestreo de la pila del hilo de la petición.
+      Genera un archivo `.folded` (formato "collapsed stacks"), listo para
+      flamegraph.pl, speedscope o inferno.
+    - `X-Profile: cprofile`: profiler determinista de la stdlib. Genera un `.prof`
+      (pstats) para snakeviz / flameprof.
+
+Junto a cada perfil se guarda un `.json` con los metadatos de la petición.
+Los perfiles recientes se listan en /admin/perfiles/.
+"""
+import cProfile
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import tokens
+
+DEFAULTS = {
+    'HEADER': 'X-Profile',
+    'DIR': None,
+    'INTERVAL': 0.005,  # segundos entre muestras (el GIL limita la resolución real a ~5 ms)
+    'KEEP': 200,
+}
+
+
+def config(clave):
+    return getattr(settings, 'PROFILER', {}).get(clave, DEFAULTS[clave])
+
+
+def directorio():
+    return Path(config('DIR') or Path(settings.BASE_DIR) / 'profiles')
+
+
+class SamplingProfiler:
+    """Muestrea periódicamente la pila de un hilo y cuenta pilas idénticas."""
+    extension = 'folded'
+
+    def __init__(self, intervalo=None):
+        self.intervalo = intervalo or config('INTERVAL')
+        self.muestras = Counter()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._objetivo = None
+
+    def start(self):
+        self._objetivo = threading.get_ident()
+        self._hilo = threading.Thread(target=self._muestrear, name='sampling-profiler', daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        self._detener.set()
+        self._hilo.join()
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self._objetivo)
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                pila.append(f'{codigo.co_name} ({codigo.co_filename}:{codigo.co_firstlineno})')
+                frame = frame.f_back
+            if pila:
+                self.muestras[';'.join(reversed(pila))] += 1
+
+    def dump(self, ruta):
+        lineas = (f'{pila} {cantidad}' for pila, cantidad in self.muestras.most_common())
+        Path(ruta).write_text('\n'.join(lineas) + '\n', encoding='utf-8')
+
+
+class DeterministicProfiler:
+    """Envoltorio de cProfile con la misma interfaz que SamplingProfiler."""
+    extension = 'prof'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def dump(self, ruta):
+        self._profile.dump_stats(str(ruta))
+
+
+MODOS = {
+    '1': SamplingProfiler,
+    'sampling': SamplingProfiler,
+    'cprofile': DeterministicProfiler,
+}
+
+
+def crear_profiler(valor_cabecera):
+    clase = MODOS.get(valor_cabecera.strip().lower())
+    return clase() if clase else None
+
+
+def guardar(profiler, metadatos):
+    """Escribe el perfil y sus metadatos. Retorna el identificador del perfil."""
+    destino = directorio()
+    destino.mkdir(parents=True, exist_ok=True)
+    perfil_id = f"{timezone.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    archivo = f'{perfil_id}.{profiler.extension}'
+    profiler.dump(destino / archivo)
+    metadatos = {**metadatos, 'id': perfil_id, 'archivo': archivo, 'fecha': timezone.now().isoformat()}
+    (destino / f'{perfil_id}.json').write_text(json.dumps(metadatos, ensure_ascii=False), encoding='utf-8')
+    limpiar(destino)
+    return perfil_id
+
+
+def limpiar(destino):
+    """Conserva solo los `PROFILER['KEEP']` perfiles más recientes."""
+    for meta in sorted(destino.glob('*.json'), reverse=True)[config('KEEP'):]:
+        for archivo in destino.glob(f'{meta.stem}.*'):
+            archivo.unlink(missing_ok=True)
+
+
+def listar(limite=100):
+    destino = directorio()
+    if not destino.is_dir():
+        return []
+    perfiles = []
+    for meta in sorted(destino.glob('*.json'), reverse=True)[:limite]:
+        try:
+            perfiles.append(json.loads(meta.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue
+    return perfiles
+
+
+def ruta_archivo(perfil_id):
+    """Ruta del perfil validando que el id no escape del directorio."""
+    for meta in listar(limite=config('KEEP')):
+        if meta['id'] == perfil_id:
+            return directorio() / meta['archivo']
+    return None
+
+
+def usuario(request):
+    """
+    Quién pide el perfil. El middleware corre antes que la autenticación de DRF:
+    con `Authorization: Bearer` (App Móvil, sin sesión) se verifica acá el token
+    firmado; si no, el usuario de la sesión.
+    """
+    try:
+        autenticado = tokens.TokenFirmadoAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return autenticado[0] if autenticado else getattr(request, 'user', None)
+
+
+def es_admin(user):
+    if not (user and user.is_authenticated):
+        return False
+    if user.is_staff:
+        return True
+    rol = getattr(user, 'rol', None)  # api.tokens.UsuarioToken: el rol viene en el token
+    return rol == 'ADMIN' if rol is not None else hasattr(user, 'perfil_administrador')
+
+
+def medir(get_response, request, profiler, user):
+    inicio = time.perf_counter()
+    profiler.start()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.stop()
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    perfil_id = guardar(profiler, {
+        'method': request.method,
+        'path': request.get_full_path(),
+        'vista': '.'.join(getattr(request, '_metricas_vista', ('unresolved', ''))),
+        'usuario': user.get_username(),
+        'status': response.status_code,
+        'duracion_ms': round(duracion_ms, 2),
+        'modo': type(profiler).__name__,
+    })
+    response['X-Profile-Id'] = perfil_id
+    return response
@@ -0,0 +1,172 @@
+"""
+Inspector de queries para desarrollo y staging.
+
+Detecta, dentro de una misma petición:
+    - Patrones N+1: la misma "forma" de query (SQL sin parámetros) repetida
+      al menos `QUERY_INSPECTOR['N_PLUS_ONE_THRESHOLD']` veces.
+    - Queries lentas: las que superan `QUERY_INSPECTOR['SLOW_QUERY_MS']`,
+      junto con su plan de ejecución (EXPLAIN).
+
+Cada hallazgo guarda la vista, el campo del serializer que disparó la query
+(ej: `CuotaSerializer.residente_nombre`) y el frame del código del proyecto.
+Los resultados se escriben como JSON lines en `QUERY_INSPECTOR['LOG_FILE']`
+y se resumen con `python manage.py reporte_queries`.
+"""
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework.fields import Field
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'SLOW_QUERY_MS': 100,
+    'LOG_FILE': None,
+}
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMERIC = re.compile(r'\b\d+\b')
+
+
+def config(clave):
+    return getattr(settings, 'QUERY_INSPECTOR', {}).get(clave, DEFAULTS[clave])
+
+
+def forma_query(sql):
+    """Normaliza el SQL para agrupar queries idénticas salvo parámetros."""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _NUMERIC.sub('?', sql)
+
+
+def contexto_serializer():
+    """
+    Busca en la pila el `Field.get_attribute` que está resolviendo la query.
+    Retorna 'Serializer.campo (source=...)' o None si no viene de un serializer.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name == 'get_attribute':
+            campo = frame.f_locals.get('self')
+            if isinstance(campo, Field) and campo.parent is not None:
+                return f'{type(campo.parent).__name__}.{campo.field_name} (source={campo.source})'
+        frame = frame.f_back
+    return None
+
+
+def frame_proyecto():
+    """
+    Primer frame del código del proyecto. Excluye librerías, este módulo y las
+    funciones de instrumentación marcadas con `__tracebackhide__`.
+    """
+    base = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        archivo = frame.f_code.co_filename
+        if (archivo.startswith(base) and 'site-packages' not in archivo
+                and not archivo.endswith(('query_inspector.py', 'middleware.py'))
+                and '__tracebackhide__' not in frame.f_code.co_varnames):
+            return f'{Path(archivo).relative_to(base)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryInspector:
+    """Acumula las queries de una petición y genera los hallazgos al finalizar."""
+
+    def __init__(self, vista):
+        self.vista = vista
+        self.formas = {}
+        self.lentas = []
+        self.umbral_repeticion = config('N_PLUS_ONE_THRESHOLD')
+        self.umbral_lento = config('SLOW_QUERY_MS') / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self._registrar(sql, params, duracion, context['connection'].alias)
+
+    def _registrar(self, sql, params, duracion, alias):
+        forma = forma_query(sql)
+        entrada = self.formas.get(forma)
+        if entrada is None:
+            entrada = self.formas[forma] = {'count': 0, 'total_ms': 0.0, 'sql': sql, 'origen': None}
+        entrada['count'] += 1
+        entrada['total_ms'] += duracion * 1000
+        # El contexto se captura una sola vez, cuando la forma empieza a repetirse
+        if entrada['count'] == 2:
+            entrada['origen'] = {'serializer_field': contexto_serializer(), 'frame': frame_proyecto()}
+
+        if duracion >= self.umbral_lento:
+            self.lentas.append({
+                'sql': sql, 'params': params, 'alias': alias, 'ms': round(duracion * 1000, 2),
+                'serializer_field': contexto_serializer(), 'frame': frame_proyecto(),
+            })
+
+    def hallazgos(self, path):
+        """Lista de hallazgos de la petición (ejecuta EXPLAIN sobre las lentas)."""
+        resultado = []
+        ahora = timezone.now().isoformat()
+        for forma, entrada in self.formas.items():
+            if entrada['count'] < self.umbral_repeticion:
+                continue
+            resultado.append({
+                'tipo': 'n_plus_one', 'fecha': ahora, 'vista': self.vista, 'path': path,
+                'forma': forma, 'repeticiones': entrada['count'], 'total_ms': round(entrada['total_ms'], 2),
+                **(entrada['origen'] or {}),
+            })
+        for lenta in self.lentas:
+            resultado.append({
+                'tipo': 'slow_query', 'fecha': ahora, 'vista': self.vista, 'path': path,
+                'forma': forma_query(lenta['sql']), 'ms': lenta['ms'],
+                'serializer_field': lenta['serializer_field'], 'frame': lenta['frame'],
+                'explain': explain(lenta['sql'], lenta['params'], lenta['alias']),
+            })
+        return resultado
+
+
+def explain(sql, params, alias):
+    """Plan de ejecución de una SELECT. Se ejecuta fuera del wrapper de la petición."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    conexion = connections[alias]
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(f'{conexion.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' '.join(str(col) for col in fila) for fila in cursor.fetchall())
+    except Exception as e:  # El EXPLAIN nunca debe romper la petición
+        return f'EXPLAIN falló: {e}'
+
+
+def log_file():
+    return Path(config('LOG_FILE') or Path(settings.BASE_DIR) / 'logs' / 'query_inspector.jsonl')
+
+
+def guardar(hallazgos):
+    if not hallazgos:
+        return
+    destino = log_file()
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with destino.open('a', encoding='utf-8') as f:
+        for h in hallazgos:
+            logger.warning('%s en %s: %s', h['tipo'], h['vista'], h.get('serializer_field') or h.get('frame'))
+            f.write(json.dumps(h, default=str, ensure_ascii=False) + '\n')
+
+
+def leer_log(ruta=None):
+    ruta = Path(ruta) if ruta else log_file()
+    if not ruta.exists():
+        return []
+    with ruta.open(encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
@@ -0,0 +1,94 @@
+"""
+Renderers y parsers de la API.
+
+JSON usa orjson (serialización en C, ~5-10x más rápido que `json` + el encoder de
+DRF). La salida es byte a byte la misma que la de DRF: los tipos que orjson no
+maneja igual (Decimal, datetime, date, time, timedelta, lazy strings, QuerySets)
+pasan por el `default` del encoder de DRF; UUID, dict, list y str son nativos.
+
+MessagePack (`Accept: application/msgpack`) es una alternativa negociable para la
+App Móvil: mismo contenido, sin comillas ni separadores, y los números binarios.
+Requiere la librería `msgpack`; sin ella no se registra (ver REST_FRAMEWORK en settings).
+"""
+import orjson
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+from . import tracing
+
+try:
+    import msgpack
+except ImportError:  # Opcional: solo habilita application/msgpack
+    msgpack = None
+
+_encoder_drf = encoders.JSONEncoder()
+
+OPCIONES_JSON = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _por_defecto(obj):
+    """Tipos fuera del núcleo de orjson: mismo formato que `rest_framework.utils.encoders.JSONEncoder`."""
+    return _encoder_drf.default(obj)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer de DRF sobre orjson, con span `render` (ver api.tracing)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with tracing.span('render', renderer='json'):
+            if data is None:
+                return b''
+            # Con indentación (API navegable, `; indent=4`) o modo no compacto, el camino de DRF
+            if not self.compact or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+                return super().render(data, accepted_media_type, renderer_context)
+            ret = orjson.dumps(data, default=_por_defecto, option=OPCIONES_JSON)
+            # Igual que DRF: U+2028/U+2029 escapados para que sea un subconjunto estricto de JavaScript
+            if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+                ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+            return ret
+
+
+class JSONParser(parsers.JSONParser):
+    """JSONParser de DRF sobre orjson (cuerpos en UTF-8, que es lo que exige RFC 8259)."""
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with tracing.span('render', renderer='msgpack'):
+            if data is None:
+                return b''
+            return msgpack.packb(data, default=_por_defecto, use_bin_type=True)
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+class BrowsableAPIRenderer(renderers.BrowsableAPIRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with tracing.span('render', renderer='browsable_api'):
+            return super().render(data, accepted_media_type, renderer_context)
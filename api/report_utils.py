@@ -1,4 +1,7 @@
 import io
+from decimal import Decimal
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
@@ -8,7 +11,9 @@ from reportlab.lib.units import inch
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from .models import Cuota, Pago, AlertaSeguridad
+from .tracing import traced
 
+@traced('report.finanzas_excel')
 def generar_reporte_finanzas_excel():
     """Genera un archivo Excel profesional con el reporte financiero"""
     wb = Workbook()
@@ -36,26 +41,36 @@ def generar_reporte_finanzas_excel():
         cell.alignment = center_align
 
     # --- Datos ---
-    cuotas = Cuota.objects.select_related('residente__user', 'residente__unidad_habitacional').all().order_by('-id')
-    
-    for c in cuotas:
-        total_pagado = sum(p.monto_pagado for p in c.pagos.all())
-        saldo = c.monto - total_pagado
+    # Camino de solo lectura: tuplas de values_list con el total pagado sumado en SQL
+    # (sin instanciar modelos ni prefetch de pagos)
+    cuotas = Cuota.objects.annotate(
+        total_pagado=Coalesce(Sum('pagos__monto_pagado'), Value(Decimal('0')), output_field=DecimalField())
+    ).order_by('-id').values_list(
+        'id', 'residente__user__first_name', 'residente__user__last_name',
+        'residente__unidad_habitacional__torre', 'residente__unidad_habitacional__numero',
+        'mes', 'monto', 'estado', 'total_pagado',
+    )
+
+    estado_fonts = {
+        'pagada': Font(color="008000", bold=True),
+        'vencida': Font(color="FF0000", bold=True),
+    }
+    for current_row, (id_, nombre, apellido, torre, numero, mes, monto, estado, total_pagado) in enumerate(cuotas, start=2):
+        saldo = monto - total_pagado
         
         row = [
-            c.id,
-            c.residente.user.get_full_name(),
-            str(c.residente.unidad_habitacional),
-            c.mes,
-            c.monto,
-            c.estado.upper(),
+            id_,
+            f'{nombre} {apellido}'.strip(),  # User.get_full_name()
+            f'{torre} - {numero}' if torre else numero,  # str(UnidadHabitacional)
+            mes,
+            monto,
+            estado.upper(),
             total_pagado,
             saldo
         ]
         ws.append(row)
         
-        # Formato de celda por fila
-        current_row = ws.max_row
+        # Formato de celda por fila (la fila se lleva a mano: ws.max_row recorre la hoja entera)
         ws.cell(row=current_row, column=5).number_format = currency_format # Monto
         ws.cell(row=current_row, column=7).number_format = currency_format # Pagado
         ws.cell(row=current_row, column=8).number_format = currency_format # Saldo
@@ -63,10 +78,8 @@ def generar_reporte_finanzas_excel():
         # Colorear estado
         state_cell = ws.cell(row=current_row, column=6)
         state_cell.alignment = center_align
-        if c.estado == 'pagada':
-            state_cell.font = Font(color="008000", bold=True)
-        elif c.estado == 'vencida':
-            state_cell.font = Font(color="FF0000", bold=True)
+        if estado in estado_fonts:
+            state_cell.font = estado_fonts[estado]
 
     # --- Ajustar ancho de columnas ---
     for col in ws.columns:
@@ -87,6 +100,7 @@ def generar_reporte_finanzas_excel():
     buffer.seek(0)
     return buffer
 
+@traced('report.seguridad_pdf')
 def generar_reporte_seguridad_pdf():
     """Genera un PDF profesional con tablas usando ReportLab Platypus"""
     buffer = io.BytesIO()
@@ -0,0 +1,189 @@
+"""
+Esquema OpenAPI precalculado.
+
+`SpectacularAPIView` recorre todos los viewsets y serializers en cada GET
+/api/schema/ (cientos de ms de CPU), y Swagger y ReDoc lo piden en cada carga.
+En su lugar el esquema se genera una vez por proceso y se sirve desde memoria,
+ya renderizado (YAML y JSON), comprimido (gzip y, si está instalado, brotli) y
+con un ETag fuerte por variante:
+
+    python manage.py esquema_openapi           genera los archivos en ESQUEMA['DIRECTORIO']
+                                               (paso de build, ver api/management/commands)
+    python manage.py esquema_openapi --check   falla si los archivos no coinciden con el código
+
+Este módulo (y drf-spectacular) se importa recién en la primera petición a
+/api/schema/, /api/docs/ o /api/redoc/ (ver `api.startup.vista_diferida`).
+
+Si los archivos existen (y `USAR_ARCHIVOS`) se cargan tal cual, sin introspección;
+si no, el esquema se genera en la primera petición. En DEBUG se ignoran los
+archivos: el autoreload reinicia el proceso y el esquema en memoria se regenera.
+"""
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework import status
+
+from . import compression
+
+DEFAULTS = {
+    'DIRECTORIO': None,  # None: BASE_DIR / 'openapi'
+    'USAR_ARCHIVOS': True,
+}
+
+# Formato (el `format` del renderer de drf-spectacular) -> renderer
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+CODIFICACIONES = ('gzip', 'br')
+EXTENSIONES = {'gzip': '.gz', 'br': '.br'}
+
+
+def config(clave):
+    return getattr(settings, 'ESQUEMA', {}).get(clave, DEFAULTS[clave])
+
+
+def directorio():
+    return Path(config('DIRECTORIO') or Path(settings.BASE_DIR) / 'openapi')
+
+
+def ruta(formato):
+    return directorio() / f'schema.{formato}'
+
+
+class Variante:
+    """Un formato del esquema: contenido plano, versiones comprimidas y ETags."""
+
+    def __init__(self, formato, contenido, comprimidos=None):
+        self.formato = formato
+        self.contenido = contenido
+        self.comprimidos = dict(comprimidos or {})
+        for codificacion in self.codificaciones():
+            if codificacion not in self.comprimidos:
+                self.comprimidos[codificacion] = compression.comprimir(contenido, codificacion)
+        digest = hashlib.sha256(contenido).hexdigest()[:32]
+        self.etags = {None: f'"{digest}"', **{c: f'"{digest}-{c}"' for c in self.codificaciones()}}
+
+    @staticmethod
+    def codificaciones():
+        return [c for c in CODIFICACIONES if c != 'br' or compression.brotli is not None]
+
+    def cuerpo(self, codificacion):
+        return self.contenido if codificacion is None else self.comprimidos[codificacion]
+
+
+# ========================
+# GENERACIÓN
+# ========================
+
+def generar():
+    """{formato: bytes} con el esquema recién introspectado."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    datos = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    return {formato: renderer().render(datos, renderer_context={}) for formato, renderer in RENDERERS.items()}
+
+
+def escribir(contenidos=None):
+    """Genera (o recibe) el esquema y lo escribe junto a sus versiones comprimidas."""
+    contenidos = contenidos or generar()
+    directorio().mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for formato, contenido in contenidos.items():
+        variante = Variante(formato, contenido)
+        ruta(formato).write_bytes(contenido)
+        rutas.append(ruta(formato))
+        for codificacion, comprimido in variante.comprimidos.items():
+            destino = ruta(formato).with_name(ruta(formato).name + EXTENSIONES[codificacion])
+            destino.write_bytes(comprimido)
+            rutas.append(destino)
+    return rutas
+
+
+def desactualizados(contenidos=None):
+    """Formatos cuyo archivo falta o difiere del esquema generado desde el código."""
+    contenidos = contenidos or generar()
+    return [
+        formato for formato, contenido in contenidos.items()
+        if not ruta(formato).exists() or ruta(formato).read_bytes() != contenido
+    ]
+
+
+def _leer_archivos():
+    variantes = {}
+    for formato in RENDERERS:
+        if not ruta(formato).exists():
+            return None
+        comprimidos = {}
+        for codificacion in Variante.codificaciones():
+            archivo = ruta(formato).with_name(ruta(formato).name + EXTENSIONES[codificacion])
+            if archivo.exists():
+                comprimidos[codificacion] = archivo.read_bytes()
+        variantes[formato] = Variante(formato, ruta(formato).read_bytes(), comprimidos)
+    return variantes
+
+
+# ========================
+# CACHÉ DEL PROCESO
+# ========================
+
+_variantes = None
+_lock = threading.Lock()
+
+
+def variantes():
+    """{formato: Variante}; se carga (o genera) una sola vez por proceso."""
+    global _variantes
+    if _variantes is None:
+        with _lock:
+            if _variantes is None:
+                cargadas = _leer_archivos() if config('USAR_ARCHIVOS') and not settings.DEBUG else None
+                _variantes = cargadas or {
+                    formato: Variante(formato, contenido) for formato, contenido in generar().items()
+                }
+    return _variantes
+
+
+def reiniciar():
+    global _variantes
+    with _lock:
+        _variantes = None
+
+
+# ========================
+# VISTA
+# ========================
+
+class EsquemaView(SpectacularAPIView):
+    """
+    /api/schema/ servido desde el esquema precalculado: sin introspección por
+    petición, con ETag y cuerpo ya comprimido.
+    Con ?lang= o ?version= se genera como en drf-spectacular.
+    """
+
+    def _get_schema_response(self, request):
+        if request.GET.get('lang') or request.GET.get('version') or self.api_version or request.version:
+            return super()._get_schema_response(request)
+        renderer, media_type = self.perform_content_negotiation(request)
+        variante = variantes()[renderer.format]
+        codificacion = compression.elegir(request.headers.get('Accept-Encoding', ''))
+        etag = variante.etags[codificacion]
+
+        if etag in [e.strip().removeprefix('W/') for e in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(variante.cuerpo(codificacion), content_type=media_type)
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+            if codificacion:
+                response['Content-Encoding'] = codificacion
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'  # Siempre revalidar: el 304 no cuesta nada
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
@@ -2,17 +2,194 @@ from rest_framework import serializers
 from .models import (
     UnidadHabitacional, Administrador, Seguridad, PersonalMantenimiento, Residente,
     Cuota, Pago, AreaComun, Reserva, TicketMantenimiento,
-    Visita, VehiculoAutorizado, AlertaSeguridad
+    Visita, VehiculoAutorizado, AlertaSeguridad, normalizar_placa
 )
 from django.contrib.auth.models import User
 from django.utils import timezone
+import time
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from . import autocomplete
+from .metrics import current_stats
+from .tracing import current_trace
+
+
+# ========================
+# BASE
+# ========================
+
+class MedicionSerializerMixin:
+    """
+    Acumula el tiempo de `to_representation` en las métricas de la petición.
+    Solo mide el nivel superior: los serializers anidados quedan incluidos en su padre.
+    """
+    def to_representation(self, instance):
+        __tracebackhide__ = True  # Excluido de los frames reportados por el inspector de queries
+        stats = current_stats()
+        if stats is None or stats.serializer_depth:
+            return super().to_representation(instance)
+        stats.serializer_depth += 1
+        inicio = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_depth -= 1
+            stats.serializer_time += time.perf_counter() - inicio
+
+
+class TrazaSerializerMixin:
+    """
+    Con una traza activa, mide cada campo por separado y lo agrega en un span
+    por (serializer, campo). Replica el bucle de `Serializer.to_representation`.
+    """
+    def to_representation(self, instance):
+        __tracebackhide__ = True  # Con o sin traza, las queries de los campos no se atribuyen a este bucle
+        traza = current_trace()
+        if traza is None:
+            return super().to_representation(instance)
+
+        serializer = type(self).__name__
+        ret = {}
+        for field in self._readable_fields:
+            inicio = time.time_ns()
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            if check_for_none is None:
+                ret[field.field_name] = None
+            else:
+                ret[field.field_name] = field.to_representation(attribute)
+            traza.registrar_campo(serializer, field.field_name, inicio, time.time_ns() - inicio)
+        return ret
+
+
+def parametro_lista(request, nombre):
+    """`?nombre=a,b` -> {'a', 'b'}; None si el parámetro no vino."""
+    valor = request.GET.get(nombre)
+    if valor is None:
+        return None
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+def seleccion_campos(request):
+    """(fields, expand) de la petición, o None si no pidió una selección (respuesta completa)."""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    campos, expand = parametro_lista(request, 'fields'), parametro_lista(request, 'expand')
+    if campos is None and expand is None:
+        return None
+    return campos, expand or set()
+
+
+def ruta_relacion(modelo, source):
+    """'residente.user.get_full_name' -> 'residente__user' (solo los tramos que son relaciones)."""
+    tramos = []
+    for nombre in source.split('.'):
+        try:
+            campo = modelo._meta.get_field(nombre)
+        except FieldDoesNotExist:
+            break
+        if not campo.is_relation:
+            break
+        tramos.append(nombre)
+        modelo = campo.related_model
+    return '__'.join(tramos)
+
+
+class CamposDinamicosMixin:
+    """
+    Selección de campos por query string en lecturas (GET) de la vista:
+
+        ?fields=id,monto_pagado        solo esos campos
+        ?expand=cuota_detalle          campos base + esa expansión
+
+    Son "expandibles" los campos que necesitan un JOIN: serializers anidados
+    (`cuota_detalle`, `user`) y campos con `source` a través de una relación
+    (`residente_nombre`). Sin parámetros la respuesta es la de siempre (todo
+    expandido). Con `fields` o `expand`, un expandible solo se incluye si se
+    nombra en alguno de los dos. `relaciones()` da el `select_related` mínimo
+    para los campos que quedaron.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Solo el serializer raíz de la vista recibe `context` en el constructor
+        seleccion = seleccion_campos(kwargs.get('context', {}).get('request'))
+        if seleccion is None:
+            return
+        campos, expand = seleccion
+        for nombre, campo in list(self.fields.items()):
+            if self._es_expandible(campo):
+                incluir = nombre in expand or (campos is not None and nombre in campos)
+            else:
+                incluir = campos is None or nombre in campos
+            if not incluir:
+                self.fields.pop(nombre)
+
+    @staticmethod
+    def _es_expandible(campo):
+        return isinstance(campo, serializers.BaseSerializer) or '.' in (campo.source or '')
+
+    def relaciones(self, modelo=None):
+        """Rutas de `select_related` que necesitan los campos legibles actuales."""
+        modelo = modelo or self.Meta.model
+        rutas = set()
+        for campo in self._readable_fields:
+            if not self._es_expandible(campo):
+                continue
+            ruta = ruta_relacion(modelo, campo.source)
+            if not ruta:
+                continue
+            rutas.add(ruta)
+            if isinstance(campo, CamposDinamicosMixin):
+                relacionado = modelo
+                for tramo in ruta.split('__'):
+                    relacionado = relacionado._meta.get_field(tramo).related_model
+                rutas.update(f'{ruta}__{sub}' for sub in campo.relaciones(relacionado))
+        # 'residente__user' ya implica 'residente'
+        return sorted(r for r in rutas if not any(o.startswith(f'{r}__') for o in rutas))
+
+
+class AutocompletarRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que nunca enumera su queryset: la API navegable lo
+    dibuja como un input de ID con autocompletado (api.autocomplete) en lugar de
+    un <select> con todas las filas. Validar sigue costando un `get(pk=...)`.
+    """
+
+    def __init__(self, **kwargs):
+        style = kwargs.pop('style', {})
+        queryset = kwargs.get('queryset')
+        if queryset is not None:
+            style = {'template': 'api/autocompletar/campo.html', 'recurso': autocomplete.recurso(queryset.model), **style}
+        super().__init__(style=style, **kwargs)
+
+    def get_choices(self, cutoff=None):
+        return {}
+
+    def iter_options(self):
+        return iter(())
+
+
+class BaseModelSerializer(CamposDinamicosMixin, MedicionSerializerMixin, TrazaSerializerMixin, serializers.ModelSerializer):
+    """ModelSerializer base de la API (instrumentado, con ?fields= / ?expand=)."""
+    serializer_related_field = AutocompletarRelatedField
+
+    def get_field_names(self, declared_fields, info):
+        nombres = super().get_field_names(declared_fields, info)
+        # Columna interna de la sincronización delta (api.sync): el cursor ya la codifica
+        return [n for n in nombres if n != 'fecha_actualizacion' or n in declared_fields]
 
 
 # ========================
 # USUARIOS
 # ========================
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(BaseModelSerializer):
     """Serializer básico para User de Django con campos seguros"""
     password = serializers.CharField(write_only=True)
     
@@ -26,16 +203,16 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class UnidadHabitacionalSerializer(serializers.ModelSerializer):
+class UnidadHabitacionalSerializer(BaseModelSerializer):
     """Gestión de unidades habitacionales (Deptos/Casas)"""
     class Meta:
         model = UnidadHabitacional
         fields = '__all__'
 
 
-class AdministradorSerializer(serializers.ModelSerializer):
+class AdministradorSerializer(BaseModelSerializer):
     user = UserSerializer(read_only=True)
-    user_id = serializers.PrimaryKeyRelatedField(
+    user_id = AutocompletarRelatedField(
         queryset=User.objects.all(), 
         source='user', 
         write_only=True
@@ -46,9 +223,9 @@ class AdministradorSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class SeguridadSerializer(serializers.ModelSerializer):
+class SeguridadSerializer(BaseModelSerializer):
     user = UserSerializer(read_only=True)
-    user_id = serializers.PrimaryKeyRelatedField(
+    user_id = AutocompletarRelatedField(
         queryset=User.objects.all(), 
         source='user', 
         write_only=True
@@ -59,9 +236,9 @@ class SeguridadSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class PersonalMantenimientoSerializer(serializers.ModelSerializer):
+class PersonalMantenimientoSerializer(BaseModelSerializer):
     user = UserSerializer(read_only=True)
-    user_id = serializers.PrimaryKeyRelatedField(
+    user_id = AutocompletarRelatedField(
         queryset=User.objects.all(), 
         source='user', 
         write_only=True
@@ -72,16 +249,16 @@ class PersonalMantenimientoSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ResidenteSerializer(serializers.ModelSerializer):
+class ResidenteSerializer(BaseModelSerializer):
     user = UserSerializer(read_only=True)
-    user_id = serializers.PrimaryKeyRelatedField(
+    user_id = AutocompletarRelatedField(
         queryset=User.objects.all(), 
         source='user', 
         write_only=True
     )
     # Mostramos detalles de la unidad, pero permitimos seleccionarla por ID al crear/editar
     unidad_habitacional_detalle = UnidadHabitacionalSerializer(source='unidad_habitacional', read_only=True)
-    unidad_habitacional_id = serializers.PrimaryKeyRelatedField(
+    unidad_habitacional_id = AutocompletarRelatedField(
         queryset=UnidadHabitacional.objects.all(),
         source='unidad_habitacional',
         write_only=True
@@ -96,7 +273,7 @@ class ResidenteSerializer(serializers.ModelSerializer):
 # FINANZAS
 # ========================
 
-class CuotaSerializer(serializers.ModelSerializer):
+class CuotaSerializer(BaseModelSerializer):
     residente_nombre = serializers.CharField(source='residente.user.get_full_name', read_only=True)
     
     class Meta:
@@ -109,9 +286,9 @@ class CuotaSerializer(serializers.ModelSerializer):
         return value
 
 
-class PagoSerializer(serializers.ModelSerializer):
+class PagoSerializer(BaseModelSerializer):
     cuota_detalle = CuotaSerializer(source='cuota', read_only=True)
-    cuota_id = serializers.PrimaryKeyRelatedField(
+    cuota_id = AutocompletarRelatedField(
         queryset=Cuota.objects.all(),
         source='cuota',
         write_only=True
@@ -134,21 +311,21 @@ class PagoSerializer(serializers.ModelSerializer):
 # ÁREAS COMUNES Y RESERVAS
 # ========================
 
-class AreaComunSerializer(serializers.ModelSerializer):
+class AreaComunSerializer(BaseModelSerializer):
     class Meta:
         model = AreaComun
         fields = '__all__'
 
 
-class ReservaSerializer(serializers.ModelSerializer):
+class ReservaSerializer(BaseModelSerializer):
     area_comun_detalle = AreaComunSerializer(source='area_comun', read_only=True)
-    area_comun_id = serializers.PrimaryKeyRelatedField(
+    area_comun_id = AutocompletarRelatedField(
         queryset=AreaComun.objects.all(),
         source='area_comun',
         write_only=True
     )
     residente_nombre = serializers.CharField(source='residente.user.get_full_name', read_only=True)
-    residente_id = serializers.PrimaryKeyRelatedField(
+    residente_id = AutocompletarRelatedField(
         queryset=Residente.objects.all(),
         source='residente',
         write_only=True
@@ -179,7 +356,7 @@ class ReservaSerializer(serializers.ModelSerializer):
 # MANTENIMIENTO
 # ========================
 
-class TicketMantenimientoSerializer(serializers.ModelSerializer):
+class TicketMantenimientoSerializer(BaseModelSerializer):
     residente_nombre = serializers.CharField(source='residente.user.get_full_name', read_only=True)
     asignado_a_nombre = serializers.CharField(source='asignado_a.user.get_full_name', read_only=True, allow_null=True)
     
@@ -192,7 +369,7 @@ class TicketMantenimientoSerializer(serializers.ModelSerializer):
 # SEGURIDAD Y CONTROL DE ACCESO
 # ========================
 
-class VisitaSerializer(serializers.ModelSerializer):
+class VisitaSerializer(BaseModelSerializer):
     residente_nombre = serializers.CharField(source='residente.user.get_full_name', read_only=True)
     
     class Meta:
@@ -201,7 +378,7 @@ class VisitaSerializer(serializers.ModelSerializer):
         read_only_fields = ['codigo_qr_acceso']  # El código QR se genera automáticamente
 
 
-class VehiculoAutorizadoSerializer(serializers.ModelSerializer):
+class VehiculoAutorizadoSerializer(BaseModelSerializer):
     residente_nombre = serializers.CharField(source='residente.user.get_full_name', read_only=True)
     
     class Meta:
@@ -210,10 +387,10 @@ class VehiculoAutorizadoSerializer(serializers.ModelSerializer):
 
     def validate_placa(self, value):
         """Asegurar formato de placa limpio"""
-        return value.upper().replace(" ", "").replace("-", "")
+        return normalizar_placa(value)
 
 
-class AlertaSeguridadSerializer(serializers.ModelSerializer):
+class AlertaSeguridadSerializer(BaseModelSerializer):
     residente_nombre = serializers.CharField(
         source='residente_relacionado.user.get_full_name', 
         read_only=True, 
@@ -240,7 +417,7 @@ class ValidarPlacaSerializer(serializers.Serializer):
     placa = serializers.CharField(max_length=20, help_text="Texto de la placa leído por OCR externo")
     
     def validate_placa(self, value):
-        return value.upper().replace(" ", "").replace("-", "")
+        return normalizar_placa(value)
 
 
 class ValidarQRSerializer(serializers.Serializer):
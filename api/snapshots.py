@@ -0,0 +1,238 @@
+"""
+Snapshots binarios de los datos sembrados, para restaurarlos en segundos.
+
+Los comandos `poblar_datos*` insertan fila por fila (con Faker) y los datasets de
+benchmark (`api.datasets`) se vuelven a sembrar en cada corrida. Un snapshot
+captura una vez el contenido de las tablas de la API y de `auth_user` en un zip:
+
+    manifest.json        formato, tablas, columnas, filas y migraciones aplicadas
+    <tabla>.copy         PostgreSQL: `COPY ... (FORMAT binary)` tal cual
+    <tabla>.jsonl        otros motores: las filas crudas del cursor, una por línea (orjson)
+
+Restaurar vacía esas tablas y las recarga con `COPY FROM` (o `executemany` en
+lotes de los valores crudos), sin pasar por el ORM: sin `save()`, señales,
+`auto_now` ni conversiones. Por eso un snapshot solo se restaura en el mismo
+motor y con las mismas migraciones; si no, hay que volver a capturarlo.
+
+    python manage.py snapshot_datos capturar base --sembrar 400
+    python manage.py snapshot_datos restaurar base
+
+`api.datasets.restaurar_o_sembrar` usa esto para los datasets de la suite y de
+los benchmarks: la primera corrida siembra y captura `dataset-*`, las siguientes
+restauran. En CI el directorio se guarda en la caché del job con una clave por
+migraciones.
+"""
+import os
+import zipfile
+from pathlib import Path
+
+import orjson
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+
+from . import table_cache
+
+DEFAULTS = {
+    'DIRECTORIO': None,  # None: BASE_DIR / 'snapshots'
+    'LOTE': 2000,
+    'DATASETS': True,  # api.datasets.restaurar_o_sembrar reutiliza snapshots
+}
+
+VERSION = 1
+APPS_MIGRACIONES = ('auth', 'api')
+
+
+def config(clave):
+    return getattr(settings, 'SNAPSHOTS', {}).get(clave, DEFAULTS[clave])
+
+
+def directorio():
+    return Path(config('DIRECTORIO') or Path(settings.BASE_DIR) / 'snapshots')
+
+
+def ruta(nombre):
+    return directorio() / f'{nombre}.snap'
+
+
+class SnapshotInvalido(Exception):
+    """El snapshot no se puede restaurar en esta base de datos."""
+
+
+def modelos():
+    """Modelos incluidos, en orden de dependencias (las FKs son diferidas igual)."""
+    api = [
+        m for m in apps.get_app_config('api').get_models(include_auto_created=True)
+        if m._meta.managed and not m._meta.proxy
+    ]
+    return [User, *api]
+
+
+def _columnas(modelo):
+    return list(modelo._meta.concrete_fields)
+
+
+def migraciones(alias=DEFAULT_DB_ALIAS):
+    aplicadas = MigrationRecorder(connections[alias]).applied_migrations()
+    return sorted(f'{app}.{nombre}' for app, nombre in aplicadas if app in APPS_MIGRACIONES)
+
+
+def _formato(conexion):
+    return 'copy' if conexion.vendor == 'postgresql' else 'filas'
+
+
+
+def _por_defecto(valor):
+    # Decimal y fechas en la representación en texto que guarda Django: en SQLite las
+    # fechas se comparan como texto y el 'T' de ISO 8601 rompería los filtros por rango
+    return str(valor)
+
+
+# ========================
+# CAPTURA
+# ========================
+
+def _copiar_a(conexion, modelo, archivo):
+    columnas = ', '.join(conexion.ops.quote_name(f.column) for f in _columnas(modelo))
+    with conexion.cursor() as cursor:
+        # psycopg2: el cursor de Django delega copy_expert al cursor nativo
+        cursor.copy_expert(
+            f'COPY {conexion.ops.quote_name(modelo._meta.db_table)} ({columnas}) TO STDOUT (FORMAT binary)', archivo,
+        )
+
+
+def _filas_a(conexion, modelo, archivo):
+    sql = 'SELECT {} FROM {} ORDER BY {}'.format(
+        ', '.join(conexion.ops.quote_name(f.column) for f in _columnas(modelo)),
+        conexion.ops.quote_name(modelo._meta.db_table),
+        conexion.ops.quote_name(modelo._meta.pk.column),
+    )
+    filas = 0
+    with conexion.cursor() as cursor:
+        cursor.execute(sql)
+        while lote := cursor.fetchmany(config('LOTE')):
+            archivo.write(b''.join(orjson.dumps(fila, default=_por_defecto, option=orjson.OPT_PASSTHROUGH_DATETIME) + b'\n' for fila in lote))
+            filas += len(lote)
+    return filas
+
+
+def _escribir(zf, conexion, alias):
+    formato = _formato(conexion)
+    tablas = []
+    for modelo in modelos():
+        tabla = modelo._meta.db_table
+        with zf.open(f'{tabla}.{"copy" if formato == "copy" else "jsonl"}', 'w') as archivo:
+            if formato == 'copy':
+                _copiar_a(conexion, modelo, archivo)
+                filas = modelo._base_manager.using(alias).count()
+            else:
+                filas = _filas_a(conexion, modelo, archivo)
+        tablas.append({'tabla': tabla, 'columnas': [f.column for f in _columnas(modelo)], 'filas': filas})
+    manifest = {'version': VERSION, 'motor': conexion.vendor, 'formato': formato, 'migraciones': migraciones(alias), 'tablas': tablas}
+    zf.writestr('manifest.json', orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    return manifest
+
+
+def capturar(nombre, alias=DEFAULT_DB_ALIAS):
+    """Escribe el snapshot `nombre` con el contenido actual; retorna el manifest."""
+    directorio().mkdir(parents=True, exist_ok=True)
+    # Se escribe aparte y se renombra: otro proceso nunca lee un snapshot a medio escribir
+    temporal = ruta(nombre).with_name(f'.{nombre}.{os.getpid()}.tmp')
+    try:
+        with transaction.atomic(using=alias), zipfile.ZipFile(temporal, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            manifest = _escribir(zf, connections[alias], alias)
+        os.replace(temporal, ruta(nombre))
+    finally:
+        temporal.unlink(missing_ok=True)
+    return manifest
+
+
+# ========================
+# RESTAURACIÓN
+# ========================
+
+def leer_manifest(nombre):
+    if not ruta(nombre).exists():
+        raise SnapshotInvalido(f'No existe el snapshot {ruta(nombre)}')
+    with zipfile.ZipFile(ruta(nombre)) as zf:
+        return orjson.loads(zf.read('manifest.json'))
+
+
+def _validar(manifest, conexion, alias):
+    if manifest['version'] != VERSION:
+        raise SnapshotInvalido(f"Versión de snapshot {manifest['version']} (se esperaba {VERSION})")
+    if manifest['motor'] != conexion.vendor:
+        raise SnapshotInvalido(f"Snapshot de {manifest['motor']}: solo se restaura en ese motor")
+    if manifest['migraciones'] != migraciones(alias):
+        raise SnapshotInvalido('El snapshot se tomó con otras migraciones: volver a capturarlo')
+    por_tabla = {m._meta.db_table: m for m in modelos()}
+    for tabla in manifest['tablas']:
+        modelo = por_tabla.get(tabla['tabla'])
+        if modelo is None or tabla['columnas'] != [f.column for f in _columnas(modelo)]:
+            raise SnapshotInvalido(f"La tabla {tabla['tabla']} no coincide con los modelos actuales")
+    return por_tabla
+
+
+def _copiar_desde(conexion, modelo, archivo):
+    columnas = ', '.join(conexion.ops.quote_name(f.column) for f in _columnas(modelo))
+    with conexion.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {conexion.ops.quote_name(modelo._meta.db_table)} ({columnas}) FROM STDIN (FORMAT binary)', archivo,
+        )
+
+
+def _filas_desde(conexion, modelo, archivo):
+    campos = _columnas(modelo)
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        conexion.ops.quote_name(modelo._meta.db_table),
+        ', '.join(conexion.ops.quote_name(f.column) for f in campos),
+        ', '.join(['%s'] * len(campos)),
+    )
+    lote = []
+    with conexion.cursor() as cursor:
+        for linea in archivo:
+            lote.append(orjson.loads(linea))
+            if len(lote) >= config('LOTE'):
+                cursor.executemany(sql, lote)
+                lote = []
+        if lote:
+            cursor.executemany(sql, lote)
+
+
+def vaciar(alias=DEFAULT_DB_ALIAS, incluidos=None):
+    """Vacía las tablas del snapshot con SQL directo (TRUNCATE / DELETE): sin señales ni tombstones."""
+    conexion = connections[alias]
+    tablas = [m._meta.db_table for m in (incluidos or modelos())]
+    with conexion.cursor() as cursor:
+        for sql in conexion.ops.sql_flush(no_style(), tablas, allow_cascade=True):
+            cursor.execute(sql)
+
+
+def restaurar(nombre, alias=DEFAULT_DB_ALIAS):
+    """Reemplaza el contenido de las tablas por el del snapshot; retorna el manifest."""
+    conexion = connections[alias]
+    manifest = leer_manifest(nombre)
+    por_tabla = _validar(manifest, conexion, alias)
+    restaurados = [por_tabla[t['tabla']] for t in manifest['tablas']]
+    with transaction.atomic(using=alias), zipfile.ZipFile(ruta(nombre)) as zf:
+        vaciar(alias, restaurados)
+        for modelo in restaurados:
+            tabla = modelo._meta.db_table
+            with zf.open(f'{tabla}.{"copy" if manifest["formato"] == "copy" else "jsonl"}') as archivo:
+                if manifest['formato'] == 'copy':
+                    _copiar_desde(conexion, modelo, archivo)
+                else:
+                    _filas_desde(conexion, modelo, archivo)
+        with conexion.cursor() as cursor:
+            for sql in conexion.ops.sequence_reset_sql(no_style(), restaurados):
+                cursor.execute(sql)
+        for modelo in restaurados:
+            table_cache.invalidar(modelo, using=alias)  # Sin señales: SQL directo
+    return manifest
+
+
+def listar():
+    return sorted(p.stem for p in directorio().glob('*.snap')) if directorio().exists() else []
@@ -0,0 +1,146 @@
+"""
+Arranque de los workers: imports diferidos, perfil de import y precarga con gc.freeze.
+
+Imports diferidos
+    Lo que solo usan acciones poco frecuentes no se importa al arrancar:
+    reportlab y openpyxl (`api.report_utils`) se importan dentro de las acciones
+    de `ReporteViewSet`, y drf-spectacular (generador, Swagger, ReDoc) dentro de
+    `vista_diferida`, en la primera petición a /api/schema/, /api/docs/ o /api/redoc/.
+    Faker solo lo importan los comandos poblar_datos*. `PROHIBIDOS` lista esos
+    módulos y `manage.py perfil_arranque` falla si alguno vuelve a importarse al arrancar.
+
+Precarga (gunicorn.conf.py, `preload_app = True`)
+    El master importa la aplicación y las urls una sola vez y llama a `precargar`,
+    que la calienta (`api.warmup`) y congela (`gc.freeze`) todo lo creado hasta
+    ahí: el GC de cada worker ya no recorre esos objetos ni escribe en sus
+    cabeceras, así que las páginas quedan compartidas (copy-on-write) entre todos
+    los workers en vez de copiarse en cada uno.
+"""
+import gc
+import json
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+
+# Módulos que no deben importarse al arrancar un worker
+PROHIBIDOS = ('reportlab', 'openpyxl', 'faker', 'drf_spectacular.generators', 'drf_spectacular.views')
+
+# Lo que hace un worker antes de atender la primera petición
+SCRIPT_ARRANQUE = """
+import json, resource, time
+inicio = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from api import startup
+startup.importar_urls()
+print(json.dumps({
+    'segundos': time.perf_counter() - inicio,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+_LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+# ========================
+# IMPORTS DIFERIDOS
+# ========================
+
+def vista_diferida(ruta, **initkwargs):
+    """
+    Vista que importa `ruta` (una clase de vista) recién en la primera petición.
+    Conserva el nombre de la clase para las métricas (ver `resolver_vista`).
+    """
+    vista = None
+
+    def diferida(request, *args, **kwargs):
+        nonlocal vista
+        if vista is None:
+            vista = import_string(ruta).as_view(**initkwargs)
+        return vista(request, *args, **kwargs)
+
+    diferida.__name__ = diferida.__qualname__ = ruta.rsplit('.', 1)[1]
+    diferida.__module__ = ruta.rsplit('.', 1)[0]
+    # Las APIView de DRF ya son csrf_exempt (autentican con SessionAuthentication)
+    return csrf_exempt(diferida)
+
+
+def importar_urls():
+    """Importa el urlconf completo: vistas, serializers, filtros y renderers."""
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    get_resolver().url_patterns
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PARSER_CLASSES
+
+
+# ========================
+# PRECARGA (master de gunicorn)
+# ========================
+
+def precargar():
+    """
+    En el master, después de cargar la aplicación y antes del primer fork:
+    importa todo lo que usa un worker, lo calienta (`api.warmup`) y congela el
+    heap resultante. Las conexiones que abrió el calentamiento se cierran antes
+    del fork: cada worker abre las suyas.
+    """
+    from django.core.cache import caches
+    from django.db import connections
+
+    from . import warmup
+
+    importar_urls()
+    if warmup.config('ENABLED'):
+        warmup.ejecutar()
+        connections.close_all()
+        for cache in caches.all(initialized_only=True):
+            cache.close()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+# ========================
+# PERFIL DE IMPORT
+# ========================
+
+def perfilar_arranque():
+    """
+    Arranca un intérprete nuevo con `-X importtime` hasta tener las urls cargadas.
+    Retorna {'segundos', 'rss_kb', 'modulos': [(nombre, propio_us, acumulado_us, nivel)]}.
+    """
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT_ARRANQUE],
+        capture_output=True, text=True, check=False, cwd=settings.BASE_DIR,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else 'Error al arrancar')
+    modulos = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            modulos.append((nombre, int(propio), int(acumulado), len(sangria) // 2))
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado['modulos'] = modulos
+    return resultado
+
+
+def por_paquete(modulos):
+    """Microsegundos acumulados por paquete raíz (solo imports de primer nivel)."""
+    totales = {}
+    for nombre, _, acumulado, nivel in modulos:
+        if nivel == 0:
+            paquete = nombre.split('.')[0]
+            totales[paquete] = totales.get(paquete, 0) + acumulado
+    return sorted(totales.items(), key=lambda item: item[1], reverse=True)
+
+
+def prohibidos_importados(modulos):
+    nombres = {nombre for nombre, *_ in modulos}
+    return [p for p in PROHIBIDOS if any(n == p or n.startswith(p + '.') for n in nombres)]
@@ -0,0 +1,354 @@
+"""
+Sincronización delta para la App Móvil.
+
+    GET /api/sync/                 primera sincronización: todo el ámbito del usuario, paginado
+    GET /api/sync/?since=<cursor>  solo lo que cambió desde el cursor
+
+    {"cursor": "<opaco>", "mas": false,
+     "cambios": {"cuotas": [{...}, ...], ...},
+     "eliminados": {"visitas": [12, 15], ...}}
+
+El ámbito depende del perfil del usuario:
+    residente  su perfil y su unidad; sus cuotas, pagos, reservas, tickets, visitas
+               y vehículos; las áreas comunes
+    guardia    residentes, unidades, visitas, vehículos autorizados y alertas
+
+Cada recurso se recorre en orden (fecha_actualizacion, id) sobre el índice de
+`Sincronizable.fecha_actualizacion`, y los borrados a través de los tombstones
+(`Eliminacion`, creados en post_delete). El cursor guarda la última posición
+entregada de cada recurso y de los tombstones. Una página trae como máximo
+`PAGE_SIZE` filas entre todos los recursos; con `mas: true` el cliente vuelve a
+pedir con el cursor recibido, y guarda el último para la próxima sincronización.
+
+Las filas escritas en los últimos `MARGEN_SEGUNDOS` se entregan en la siguiente
+sincronización: `fecha_actualizacion` se fija al guardar y no al confirmar, así
+que una transacción todavía abierta podría confirmar una fila con una fecha
+anterior a la última entregada.
+
+Los borrados que empiezan en un modelo sincronizable (`Sincronizable.delete` y
+`QuerySet.delete`) juntan los tombstones de toda la cascada y los insertan con un
+solo bulk_create al final, en la misma transacción (`tombstones_en_lote`); otros
+borrados (p. ej. el de un `User`, que arrastra a su residente) pueden envolverse
+igual, y si no, cada fila crea su tombstone en post_delete.
+
+Los tombstones se conservan `RETENCION_DIAS` días (`manage.py purgar_eliminaciones`).
+Un cursor más viejo que eso recibe 410 y el cliente debe sincronizar desde cero.
+"""
+import base64
+import binascii
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import table_cache, tokens
+from .models import (
+    AlertaSeguridad, AreaComun, Cuota, Eliminacion, Pago, Reserva, Residente,
+    TicketMantenimiento, UnidadHabitacional, VehiculoAutorizado, Visita,
+)
+from .serializers import (
+    AlertaSeguridadSerializer, AreaComunSerializer, CuotaSerializer, PagoSerializer, ReservaSerializer,
+    ResidenteSerializer, TicketMantenimientoSerializer, UnidadHabitacionalSerializer,
+    VehiculoAutorizadoSerializer, VisitaSerializer,
+)
+
+DEFAULTS = {
+    'PAGE_SIZE': 500,
+    'MARGEN_SEGUNDOS': 2,
+    'RETENCION_DIAS': 90,
+}
+
+EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSEGUNDO = timedelta(microseconds=1)
+
+
+def config(clave):
+    return getattr(settings, 'SYNC', {}).get(clave, DEFAULTS[clave])
+
+
+class CursorInvalido(Exception):
+    """El cursor no se pudo decodificar."""
+
+
+class CursorVencido(Exception):
+    """El cursor es anterior a la retención de tombstones: hay que resincronizar desde cero."""
+
+
+class SinPerfil(Exception):
+    """El usuario no es residente ni guardia."""
+
+
+# ========================
+# RECURSOS SINCRONIZADOS
+# ========================
+
+def _dueno_pago(pago):
+    # En un borrado en cascada la cuota todavía existe cuando se envía post_delete del pago
+    return Cuota.objects.filter(pk=pago.cuota_id).values_list('residente_id', flat=True).first()
+
+
+def _duenos_pagos(pagos):
+    cuotas = dict(Cuota.objects.filter(pk__in={p.cuota_id for p in pagos}).values_list('pk', 'residente_id'))
+    return {p.pk: cuotas.get(p.cuota_id) for p in pagos}
+
+
+class Recurso:
+    """
+    Un recurso de la API dentro de la sincronización.
+    `ruta_residente`: lookup hasta el residente dueño (None si es compartido).
+    `dueno`: id del residente dueño de una instancia, para su tombstone.
+    `duenos`: lo mismo para varias instancias con una consulta ({pk: residente_id}),
+    si `dueno` consulta la base.
+    """
+
+    def __init__(self, nombre, modelo, serializer, relacionados=(), ruta_residente=None, dueno=None, duenos=None):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.serializer = serializer
+        self.relacionados = relacionados
+        self.ruta_residente = ruta_residente
+        self.dueno = dueno or (lambda instancia: None)
+        self.duenos = duenos
+
+
+RECURSOS = [
+    Recurso('unidades-habitacionales', UnidadHabitacional, UnidadHabitacionalSerializer, (), 'residentes'),
+    Recurso('residentes', Residente, ResidenteSerializer, ('user', 'unidad_habitacional'), 'pk',
+            lambda residente: residente.pk),
+    Recurso('areas-comunes', AreaComun, AreaComunSerializer),
+    Recurso('cuotas', Cuota, CuotaSerializer, ('residente__user',), 'residente',
+            lambda cuota: cuota.residente_id),
+    Recurso('pagos', Pago, PagoSerializer, ('cuota__residente__user',), 'cuota__residente', _dueno_pago,
+            _duenos_pagos),
+    Recurso('reservas', Reserva, ReservaSerializer, ('area_comun', 'residente__user'), 'residente',
+            lambda reserva: reserva.residente_id),
+    Recurso('tickets-mantenimiento', TicketMantenimiento, TicketMantenimientoSerializer,
+            ('residente__user', 'asignado_a__user'), 'residente', lambda ticket: ticket.residente_id),
+    Recurso('visitas', Visita, VisitaSerializer, ('residente__user',), 'residente',
+            lambda visita: visita.residente_id),
+    Recurso('vehiculos-autorizados', VehiculoAutorizado, VehiculoAutorizadoSerializer, ('residente__user',),
+            'residente', lambda vehiculo: vehiculo.residente_id),
+    Recurso('alertas-seguridad', AlertaSeguridad, AlertaSeguridadSerializer,
+            ('residente_relacionado__user', 'atendido_por__user'), 'residente_relacionado',
+            lambda alerta: alerta.residente_relacionado_id),
+]
+
+POR_NOMBRE = {r.nombre: r for r in RECURSOS}
+POR_MODELO = {r.modelo: r for r in RECURSOS}
+
+# Recursos de cada perfil
+AMBITOS = {
+    'residente': ('unidades-habitacionales', 'residentes', 'areas-comunes', 'cuotas', 'pagos', 'reservas',
+                  'tickets-mantenimiento', 'visitas', 'vehiculos-autorizados'),
+    'guardia': ('unidades-habitacionales', 'residentes', 'visitas', 'vehiculos-autorizados', 'alertas-seguridad'),
+}
+
+
+class Ambito:
+    """Qué filas y tombstones ve el usuario que sincroniza."""
+
+    def __init__(self, user):
+        # Con token firmado el rol y el residente vienen en los claims (sin consultas)
+        rol, residente_id = tokens.rol_de(user) if user.is_authenticated else (None, None)
+        if rol == 'RESIDENTE':
+            self.perfil, self.residente_id = 'residente', residente_id
+        elif rol == 'GUARDIA':
+            self.perfil, self.residente_id = 'guardia', None
+        else:
+            raise SinPerfil()
+        self.recursos = [POR_NOMBRE[nombre] for nombre in AMBITOS[self.perfil]]
+
+    def filas(self, recurso):
+        if self.residente_id is None or recurso.ruta_residente is None:
+            return Q()
+        return Q(**{recurso.ruta_residente: self.residente_id})
+
+    def eliminaciones(self):
+        filtro = Q(recurso__in=[r.nombre for r in self.recursos])
+        if self.residente_id is not None:
+            filtro &= Q(residente_id=self.residente_id) | Q(residente_id__isnull=True)
+        return filtro
+
+
+# ========================
+# CURSOR
+# ========================
+
+def _a_micros(fecha):
+    return (fecha - EPOCA) // MICROSEGUNDO
+
+
+def _de_micros(micros):
+    return EPOCA + micros * MICROSEGUNDO
+
+
+def codificar(posiciones, eliminaciones):
+    """Cursor opaco: {recurso: (fecha, id)} y la posición en los tombstones."""
+    datos = {
+        'v': 1,
+        'r': {nombre: [_a_micros(fecha), pk] for nombre, (fecha, pk) in posiciones.items()},
+        'e': [_a_micros(eliminaciones[0]), eliminaciones[1]],
+    }
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decodificar(cursor):
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        posiciones = {nombre: (_de_micros(f), int(pk)) for nombre, (f, pk) in datos['r'].items()}
+        eliminaciones = (_de_micros(datos['e'][0]), int(datos['e'][1]))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError, AttributeError):
+        raise CursorInvalido()
+    return posiciones, eliminaciones
+
+
+def _despues_de(campo, posicion):
+    fecha, pk = posicion
+    return Q(**{f'{campo}__gt': fecha}) | Q(**{campo: fecha, 'pk__gt': pk})
+
+
+# ========================
+# SINCRONIZACIÓN
+# ========================
+
+def sincronizar(user, cursor=None):
+    """Una página de cambios para `user` desde `cursor` (None: sincronización completa)."""
+    ambito = Ambito(user)
+    ahora = timezone.now()
+    hasta = ahora - timedelta(seconds=config('MARGEN_SEGUNDOS'))
+    if cursor:
+        posiciones, pos_eliminaciones = decodificar(cursor)
+        if pos_eliminaciones[0] < ahora - timedelta(days=config('RETENCION_DIAS')):
+            raise CursorVencido()
+    else:
+        # Sin datos locales no hay nada que borrar: los tombstones empiezan en `hasta`
+        posiciones, pos_eliminaciones = {}, (hasta, 0)
+
+    restante = config('PAGE_SIZE')
+    mas = False
+    eliminados = {}
+    if cursor:
+        tombstones = list(
+            Eliminacion.objects.filter(ambito.eliminaciones(), fecha_eliminacion__lte=hasta)
+            .filter(_despues_de('fecha_eliminacion', pos_eliminaciones))
+            .order_by('fecha_eliminacion', 'pk')
+            .values_list('pk', 'fecha_eliminacion', 'recurso', 'objeto_id')[:restante + 1]
+        )
+        if len(tombstones) > restante:
+            tombstones, mas = tombstones[:restante], True
+        for pk, fecha, recurso, objeto_id in tombstones:
+            eliminados.setdefault(recurso, []).append(objeto_id)
+        if tombstones:
+            pos_eliminaciones = (tombstones[-1][1], tombstones[-1][0])
+        restante -= len(tombstones)
+
+    cambios = {}
+    for recurso in ambito.recursos:
+        if restante <= 0:
+            mas = True
+            break
+        posicion = posiciones.get(recurso.nombre, (EPOCA, 0))
+        filas = list(
+            recurso.modelo.objects.select_related(*recurso.relacionados)
+            .filter(ambito.filas(recurso), fecha_actualizacion__lte=hasta)
+            .filter(_despues_de('fecha_actualizacion', posicion))
+            .order_by('fecha_actualizacion', 'pk')[:restante + 1]
+        )
+        if len(filas) > restante:
+            filas, mas = filas[:restante], True
+        if filas:
+            cambios[recurso.nombre] = recurso.serializer(filas, many=True).data
+            posicion = (filas[-1].fecha_actualizacion, filas[-1].pk)
+            restante -= len(filas)
+        posiciones[recurso.nombre] = posicion
+
+    return {
+        'cursor': codificar(posiciones, pos_eliminaciones),
+        'mas': mas,
+        'cambios': cambios,
+        'eliminados': eliminados,
+    }
+
+
+# ========================
+# TOMBSTONES
+# ========================
+
+class _Lote:
+    """Tombstones pendientes de un borrado, con los dueños resueltos por modelo."""
+
+    def __init__(self):
+        self.pendientes = {}  # modelo -> instancias (pre_delete), para `Recurso.duenos`
+        self.duenos = {}  # modelo -> {pk: residente_id}
+        self.tombstones = []
+
+    def dueno(self, recurso, instancia):
+        if recurso.duenos is None:
+            return recurso.dueno(instancia)
+        if recurso.modelo not in self.duenos:
+            # Primer post_delete del modelo: las filas de las que depende el dueño todavía existen
+            self.duenos[recurso.modelo] = recurso.duenos(self.pendientes.pop(recurso.modelo, [instancia]))
+        duenos = self.duenos[recurso.modelo]
+        return duenos[instancia.pk] if instancia.pk in duenos else recurso.dueno(instancia)
+
+
+_lote = ContextVar('sync_tombstones', default=None)
+
+
+@contextmanager
+def tombstones_en_lote(using=None):
+    """Junta los tombstones de los borrados del bloque y los inserta juntos antes de confirmar."""
+    if _lote.get() is not None:
+        yield
+        return
+    lote = _Lote()
+    token = _lote.set(lote)
+    try:
+        with transaction.atomic(using=using):
+            yield
+            if lote.tombstones:
+                Eliminacion.objects.using(using).bulk_create(lote.tombstones)
+                table_cache.invalidar(Eliminacion, using=using)  # bulk_create no emite post_save
+    finally:
+        _lote.reset(token)
+
+
+def _antes_de_eliminar(sender, instance, **kwargs):
+    lote = _lote.get()
+    recurso = POR_MODELO.get(sender)
+    if lote is not None and recurso is not None and recurso.duenos is not None:
+        lote.pendientes.setdefault(sender, []).append(instance)
+
+
+def _al_eliminar(sender, instance, using=None, **kwargs):
+    recurso = POR_MODELO.get(sender)
+    if recurso is None:
+        return
+    lote = _lote.get()
+    if lote is None:
+        Eliminacion.objects.using(using).create(
+            recurso=recurso.nombre, objeto_id=instance.pk, residente_id=recurso.dueno(instance),
+        )
+        return
+    lote.tombstones.append(Eliminacion(
+        recurso=recurso.nombre, objeto_id=instance.pk, residente_id=lote.dueno(recurso, instance),
+    ))
+
+
+def purgar(dias=None):
+    """Borra los tombstones más viejos que la retención; retorna la cantidad."""
+    limite = timezone.now() - timedelta(days=dias if dias is not None else config('RETENCION_DIAS'))
+    borrados, _ = Eliminacion.objects.filter(fecha_eliminacion__lt=limite).delete()
+    return borrados
+
+
+def conectar_senales():
+    from django.db.models.signals import post_delete, pre_delete
+
+    pre_delete.connect(_antes_de_eliminar, dispatch_uid='sync_tombstones_duenos')
+    post_delete.connect(_al_eliminar, dispatch_uid='sync_tombstones')
@@ -0,0 +1,279 @@
+"""
+Caché de respuestas versionada por tabla, con invalidación automática.
+
+Cada tabla tiene un contador de generación en la caché compartida que se
+incrementa (al confirmar la transacción) en cada save/delete de sus modelos.
+La clave de una respuesta cacheada incluye las generaciones de todas las
+tablas que lee la vista, así que al escribir en una tabla las entradas viejas
+simplemente dejan de encontrarse; no hace falta borrarlas.
+
+Dos niveles:
+    1. LRU local por proceso (sin serialización, `LOCAL_MAX_ENTRIES` entradas).
+    2. Backend compartido `CACHES[TABLE_CACHE['BACKEND']]` (Redis en producción).
+
+Las generaciones siempre se leen del backend compartido (un `get_many` por
+petición) para que la invalidación sea inmediata entre workers.
+
+Las operaciones que no emiten señales (`QuerySet.update`, `bulk_create`, SQL
+crudo) deben llamar a `invalidar(modelo)` explícitamente.
+
+GET condicional: la misma versión (generaciones + ruta + filtros + formato) da
+un ETag débil y, con la marca de tiempo de la última escritura de cada tabla,
+`Last-Modified`. Un `If-None-Match` / `If-Modified-Since` vigente se responde
+con 304 sin tocar la base de datos ni serializar. `Last-Modified` tiene
+resolución de segundos: se publica redondeado hacia arriba y solo cuando ese
+segundo ya terminó, así una escritura posterior nunca cae dentro de él.
+
+Las generaciones viven en el backend: con uno por proceso (LocMemCache) cada
+worker tiene las suyas y una escritura en uno no invalida a los demás. Por eso
+settings solo la activa con REDIS_URL, y el check `api.W001` avisa si no.
+
+Métrica: `condominio_cache_requests_total{view, result=hit_local|hit_shared|miss}`.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from . import metrics, tracing
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CONDITIONAL': True,         # ETag / Last-Modified / 304
+    'BACKEND': 'default',
+    'TTL': 300,                  # segundos en el backend compartido
+    'LOCAL_MAX_ENTRIES': 512,
+    'MAX_ENTRY_ITEMS': 5000,     # listados más grandes no se cachean
+    'APPS': ('api', 'auth'),
+}
+
+FALTA = object()
+
+
+def config(clave):
+    return getattr(settings, 'TABLE_CACHE', {}).get(clave, DEFAULTS[clave])
+
+
+def backend():
+    return caches[config('BACKEND')]
+
+
+POR_PROCESO = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+def compartida(alias):
+    """True si la caché `alias` es la misma para todos los workers (no vive en el proceso)."""
+    return settings.CACHES[alias]['BACKEND'] not in POR_PROCESO
+
+
+@checks.register(checks.Tags.caches)
+def verificar_backend(app_configs=None, **kwargs):
+    if (config('ENABLED') or config('CONDITIONAL')) and not compartida(config('BACKEND')):
+        return [checks.Warning(
+            f"TABLE_CACHE usa la caché '{config('BACKEND')}', que es local a cada proceso",
+            hint='Con varios workers las respuestas quedan viejas: configurar REDIS_URL o desactivar TABLE_CACHE.',
+            id='api.W001',
+        )]
+    return []
+
+
+# ========================
+# GENERACIONES POR TABLA
+# ========================
+
+def _clave_generacion(tabla):
+    return f'gen:{tabla}'
+
+
+def _clave_modificacion(tabla):
+    return f'mod:{tabla}'
+
+
+def estado_tablas(tablas):
+    """
+    (generaciones, última modificación) de `tablas` en un solo `get_many`.
+    Una tabla sin marca de tiempo se marca como modificada ahora: es una cota
+    superior segura para `Last-Modified`.
+    """
+    backend_ = backend()
+    valores = backend_.get_many([_clave_generacion(t) for t in tablas] + [_clave_modificacion(t) for t in tablas])
+    marcas = []
+    for tabla in tablas:
+        marca = valores.get(_clave_modificacion(tabla))
+        if marca is None:
+            marca = time.time()
+            backend_.add(_clave_modificacion(tabla), marca, timeout=None)
+        marcas.append(marca)
+    generaciones = tuple(valores.get(_clave_generacion(t), 0) for t in tablas)
+    return generaciones, max(marcas, default=None)
+
+
+def incrementar(tabla):
+    clave = _clave_generacion(tabla)
+    try:
+        backend().incr(clave)
+    except ValueError:
+        # Arranca en un valor creciente en el tiempo: si el contador fue desalojado,
+        # el nuevo nunca coincide con una generación anterior.
+        if not backend().add(clave, time.time_ns(), timeout=None):
+            backend().incr(clave)
+    backend().set(_clave_modificacion(tabla), time.time(), timeout=None)
+
+
+def invalidar(modelo, using=None):
+    """Incrementa la generación de la tabla de `modelo` al confirmar la transacción."""
+    tabla = modelo._meta.db_table
+    transaction.on_commit(lambda: incrementar(tabla), using=using)
+
+
+def tablas_de(queryset):
+    """Tablas que lee un queryset: modelo base, select_related y prefetch_related."""
+    modelos = {queryset.model}
+
+    def recorrer(modelo, arbol):
+        for nombre, sub in arbol.items():
+            relacionado = modelo._meta.get_field(nombre).related_model
+            modelos.add(relacionado)
+            recorrer(relacionado, sub)
+
+    if isinstance(queryset.query.select_related, dict):
+        recorrer(queryset.model, queryset.query.select_related)
+    for lookup in queryset._prefetch_related_lookups:
+        modelo = queryset.model
+        for nombre in getattr(lookup, 'prefetch_through', lookup).split('__'):
+            modelo = modelo._meta.get_field(nombre).related_model
+            modelos.add(modelo)
+    return sorted(m._meta.db_table for m in modelos)
+
+
+# ========================
+# CACHÉ DE DOS NIVELES
+# ========================
+
+class LRULocal:
+    """LRU en memoria del proceso (seguro entre hilos)."""
+
+    def __init__(self, max_entradas):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave, FALTA)
+            if valor is not FALTA:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+local = LRULocal(config('LOCAL_MAX_ENTRIES'))
+
+
+class Version:
+    """Identidad de una respuesta: clave de caché, ETag y `Last-Modified`."""
+    __slots__ = ('clave', 'etag', 'ultima_modificacion', 'last_modified')
+
+    def __init__(self, vista, request, tablas, usuario=None):
+        generaciones, self.ultima_modificacion = estado_tablas(tablas)
+        # Segundo entero posterior a la última escritura; mientras no haya pasado,
+        # otra escritura en ese mismo segundo sería indistinguible: no se publica
+        self.last_modified = None
+        if self.ultima_modificacion is not None and math.ceil(self.ultima_modificacion) <= time.time():
+            self.last_modified = math.ceil(self.ultima_modificacion)
+        filtros = '&'.join(f'{k}={v}' for k, v in sorted(request.GET.items()))
+        base = f'{vista}|{request.path}|{filtros}|{usuario}|{list(zip(tablas, generaciones))}'
+        self.clave = 'resp:' + hashlib.blake2b(base.encode(), digest_size=16).hexdigest()
+        # El ETag además distingue el formato (JSON, API navegable, ...)
+        renderer = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+        self.etag = 'W/"%s"' % hashlib.blake2b(f'{self.clave}|{renderer}'.encode(), digest_size=12).hexdigest()
+
+    def no_modificada(self, request):
+        """True si el cliente ya tiene esta versión (If-None-Match tiene prioridad)."""
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or self.etag.removeprefix('W/') in {e.removeprefix('W/') for e in etags}
+        desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        # Comparación con la marca exacta (no truncada): una escritura en el mismo segundo cuenta
+        return desde is not None and self.ultima_modificacion is not None and self.ultima_modificacion <= desde
+
+    def aplicar(self, response):
+        # no-cache: el cliente guarda la respuesta pero revalida siempre (evita frescura heurística)
+        patch_cache_control(response, no_cache=True)
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+    def respuesta_304(self):
+        return self.aplicar(HttpResponseNotModified())
+
+
+def obtener(clave, vista):
+    with tracing.span('cache', vista=vista):
+        valor = local.get(clave)
+        if valor is not FALTA:
+            metrics.registry.inc('condominio_cache_requests_total', (vista, 'hit_local'))
+            return valor
+        valor = backend().get(clave, FALTA)
+        if valor is not FALTA:
+            local.set(clave, valor)
+            metrics.registry.inc('condominio_cache_requests_total', (vista, 'hit_shared'))
+            return valor
+    metrics.registry.inc('condominio_cache_requests_total', (vista, 'miss'))
+    return FALTA
+
+
+def guardar(clave, valor):
+    # ReturnList/ReturnDict de DRF referencian al serializer: se guarda una copia plana
+    if isinstance(valor, list):
+        if len(valor) > config('MAX_ENTRY_ITEMS'):
+            return
+        valor = list(valor)
+    elif isinstance(valor, dict):
+        valor = dict(valor)
+    local.set(clave, valor)
+    backend().set(clave, valor, timeout=config('TTL'))
+
+
+# ========================
+# SEÑALES
+# ========================
+
+def _al_cambiar(sender, using=None, **kwargs):
+    if sender._meta.app_label in config('APPS'):
+        invalidar(sender, using=using)
+
+
+def _al_cambiar_m2m(sender, instance, using=None, **kwargs):
+    # `sender` es el modelo intermedio; también cambia la vista desde `instance`
+    invalidar(sender, using=using)
+    _al_cambiar(type(instance), using=using)
+
+
+def conectar_senales():
+    from django.db.models.signals import m2m_changed, post_delete, post_save
+
+    post_save.connect(_al_cambiar, dispatch_uid='table_cache_save')
+    post_delete.connect(_al_cambiar, dispatch_uid='table_cache_delete')
+    m2m_changed.connect(_al_cambiar_m2m, dispatch_uid='table_cache_m2m')
@@ -1,3 +1,1222 @@
-from django.test import TestCase
+"""
+Suite de regresión de rendimiento: cantidad de queries, latencia y bytes por endpoint.
 
-# Create your tests here.
+Cada endpoint se mide con datasets a varias escalas (`ESCALAS`):
+    - La cantidad de queries debe ser idéntica en todas las escalas (sin N+1)
+      e igual a la registrada en `benchmarks/presupuestos_api.json`.
+    - La latencia y los bytes de la escala mayor no deben superar su presupuesto.
+
+Para regenerar el baseline después de un cambio intencional:
+    ACTUALIZAR_PRESUPUESTOS=1 python manage.py test api
+"""
+import atexit
+import gzip
+import io
+import json
+import math
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer as JSONRendererDRF
+
+from . import benchmarks, db_routing, gate, load_shedding, memory_profiling, metrics, profiling, query_inspector, schema, snapshots, startup, table_cache, tokens, traffic, warmup
+from .datasets import restaurar_o_sembrar, sembrar_completo
+from .management.commands import replay_trafico
+from .models import Administrador, Cuota, Eliminacion, Pago, Residente, Seguridad, VehiculoAutorizado, Visita
+from .serializers import CuotaSerializer
+from .views import CuotaViewSet
+
+RUTA_PRESUPUESTOS = Path(settings.BASE_DIR) / 'benchmarks' / 'presupuestos_api.json'
+ESCALAS = (40, 400)
+MARGEN_LATENCIA = 5.0  # Presupuesto de ms = medido x 5: solo detecta regresiones groseras (varía entre máquinas)
+MARGEN_BYTES = 1.2
+
+LISTADOS = [
+    'users', 'unidades-habitacionales', 'administradores', 'seguridad', 'personal-mantenimiento',
+    'residentes', 'cuotas', 'pagos', 'areas-comunes', 'reservas', 'tickets-mantenimiento',
+    'visitas', 'vehiculos-autorizados', 'alertas-seguridad',
+]
+
+
+@override_settings(
+    QUERY_INSPECTOR={'ENABLED': False},
+    TRACING={'ENABLED': False},
+    MEMORY_PROFILER={'ENABLED': False},
+    DB_ROUTING={'ENABLED': False},
+    TABLE_CACHE={'ENABLED': False, 'CONDITIONAL': False},
+    LOAD_SHEDDING={'ENABLED': False},
+)
+class ApiTestCase(TestCase):
+    """
+    Base de la suite: inspector de queries, trazas, perfilador de memoria, ruteo
+    de lecturas, caché de respuestas y descarte de carga apagados. Cada clase
+    enciende con su propio `override_settings` solo lo que prueba (se combina con este).
+
+    Con `filas`, la clase comparte el dataset de `api.datasets` a esa escala
+    (`self.datos`), restaurado desde un snapshot en lugar de sembrarlo cada vez.
+    """
+    filas = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = restaurar_o_sembrar(cls.filas) if cls.filas else None
+
+
+def _detalles(datos):
+    """(nombre, método, url, payload) para el detalle de cada recurso."""
+    primero = {
+        'users': datos['residentes'][0].user_id,
+        'unidades-habitacionales': datos['residentes'][0].unidad_habitacional_id,
+        'administradores': datos['admin'][0].pk,
+        'seguridad': datos['guardia'][0].pk,
+        'personal-mantenimiento': datos['tecnico'][0].pk,
+        'residentes': datos['residentes'][0].pk,
+        'cuotas': datos['cuotas'][0].pk,
+        'pagos': datos['pagos'][0].pk,
+        'areas-comunes': datos['areas'][0].pk,
+        'alertas-seguridad': datos['alertas'][0].pk,
+    }
+    return [(f'{r}-detail', 'get', f'/api/{r}/{pk}/', None) for r, pk in primero.items()]
+
+
+def _acciones(datos):
+    residente = datos['residentes'][0]
+    return [
+        ('validar-placa', 'post', '/api/seguridad/validar-placa/', {'placa': '0001-abc'}),
+        ('validar-placa-desconocida', 'post', '/api/seguridad/validar-placa/', {'placa': 'ZZZ999'}),
+        ('validar-qr', 'post', '/api/seguridad/validar-qr/', {'codigo_qr': 'QR-00000003'}),
+        ('validar-qr-usado', 'post', '/api/seguridad/validar-qr/', {'codigo_qr': 'QR-00000003'}),
+        ('actualizar-score-ia', 'post', f'/api/residentes/{residente.pk}/actualizar-score-ia/', {'score_morosidad_ia': 42.5}),
+        ('dashboard-admin', 'get', '/api/dashboard/admin/', None),
+        ('reporte-finanzas', 'get', '/api/reportes/finanzas/', None),
+        ('reporte-seguridad', 'get', '/api/reportes/seguridad/', None),
+    ]
+
+
+@override_settings(
+    TABLE_CACHE={'ENABLED': False},  # Mide con ETag / Last-Modified, como en producción
+)
+class PresupuestoRendimientoTests(ApiTestCase):
+    actualizar = os.environ.get('ACTUALIZAR_PRESUPUESTOS') == '1'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.presupuestos = json.loads(RUTA_PRESUPUESTOS.read_text()) if RUTA_PRESUPUESTOS.exists() else {}
+        cls.medidos = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.actualizar and cls.medidos:
+            actuales = {**cls.presupuestos.get('endpoints', {}), **cls.medidos}
+            documento = {'escalas': list(ESCALAS), 'endpoints': dict(sorted(actuales.items()))}
+            RUTA_PRESUPUESTOS.write_text(json.dumps(documento, indent=2) + '\n')
+        super().tearDownClass()
+
+    def medir(self, metodo, url, payload):
+        with CaptureQueriesContext(connection) as queries:
+            inicio = time.perf_counter()
+            if metodo == 'post':
+                response = self.client.post(url, payload, content_type='application/json')
+            else:
+                response = self.client.get(url, HTTP_ACCEPT='application/json')
+            ms = (time.perf_counter() - inicio) * 1000
+        self.assertLess(response.status_code, 400, f'{url} -> {response.status_code}')
+        return {'queries': len(queries), 'ms': ms, 'bytes': len(response.content)}
+
+    def medir_escalas(self, endpoints_por_escala):
+        """Restaura cada escala en una transacción revertida y mide todos sus endpoints."""
+        resultados = {}
+        for filas in ESCALAS:
+            with transaction.atomic():
+                datos = restaurar_o_sembrar(filas)
+                for nombre, metodo, url, payload in endpoints_por_escala(datos):
+                    resultados.setdefault(nombre, {})[filas] = self.medir(metodo, url, payload)
+                transaction.set_rollback(True)
+        return resultados
+
+    def verificar(self, resultados):
+        for nombre, por_escala in resultados.items():
+            mayor = por_escala[max(ESCALAS)]
+            with self.subTest(endpoint=nombre):
+                queries = {filas: r['queries'] for filas, r in por_escala.items()}
+                self.assertEqual(
+                    len(set(queries.values())), 1,
+                    f'{nombre}: la cantidad de queries crece con los datos (posible N+1): {queries}'
+                )
+                if self.actualizar:
+                    self.medidos[nombre] = {
+                        'queries': mayor['queries'],
+                        'max_ms': round(max(mayor['ms'] * MARGEN_LATENCIA, 250)),
+                        'max_bytes': int(mayor['bytes'] * MARGEN_BYTES) + 256,
+                    }
+                    continue
+
+                presupuesto = self.presupuestos.get('endpoints', {}).get(nombre)
+                self.assertIsNotNone(presupuesto, f'{nombre}: sin presupuesto en {RUTA_PRESUPUESTOS.name}')
+                self.assertEqual(mayor['queries'], presupuesto['queries'], f'{nombre}: cambió la cantidad de queries')
+                self.assertLessEqual(mayor['ms'], presupuesto['max_ms'], f'{nombre}: latencia fuera de presupuesto')
+                self.assertLessEqual(mayor['bytes'], presupuesto['max_bytes'], f'{nombre}: respuesta más grande que el presupuesto')
+
+    def test_listados(self):
+        self.verificar(self.medir_escalas(
+            lambda datos: [(f'{r}-list', 'get', f'/api/{r}/', None) for r in LISTADOS]
+        ))
+
+    def test_detalles(self):
+        self.verificar(self.medir_escalas(_detalles))
+
+    def test_acciones_personalizadas(self):
+        self.verificar(self.medir_escalas(_acciones))
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricasTests(ApiTestCase):
+    """/metrics (api.metrics): acceso restringido, agregación entre workers y Server-Timing."""
+
+    filas = 20
+
+    def test_server_timing_y_exposicion(self):
+        response = self.client.get('/api/areas-comunes/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", ser;dur=[\d.]+, total;dur=[\d.]+')
+        with override_settings(METRICS_TOKEN='secreto'):
+            texto = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+        self.assertIn('condominio_request_duration_seconds_count{view="AreaComunViewSet",action="list",method="GET"}', texto)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='secreto', METRICS_IPS=['10.0.0.0/8'])
+    def test_token_o_ip_interna(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.2.3.4').status_code, 200)
+        with override_settings(METRICS_TOKEN=None, METRICS_IPS=[]):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 401)
+
+    def test_poda_de_workers_terminados(self):
+        terminado = metrics.MetricsRegistry()
+        terminado.inc('condominio_cache_requests_total', ('CuotaViewSet', 'hit'), 3)
+        with tempfile.TemporaryDirectory() as directorio, override_settings(METRICS_DIR=directorio):
+            hijo = subprocess.Popen(['true'])
+            hijo.wait()
+            terminado.flush(directorio)
+            os.replace(Path(directorio) / f'{os.getpid()}.json', Path(directorio) / f'{hijo.pid}.json')
+            for _ in range(2):  # El segundo scrape no vuelve a sumar lo plegado
+                total = metrics.MetricsRegistry().collect()['condominio_cache_requests_total']['CuotaViewSet|hit']
+                self.assertEqual(total, {'value': 3})
+            self.assertEqual(sorted(p.name for p in Path(directorio).glob('*.json')), [metrics.FINALIZADOS])
+
+
+class PerfilesTests(ApiTestCase):
+    """Perfil bajo demanda (api.profiling): solo administradores lo generan, listan y descargan."""
+
+    filas = 20
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(PROFILER={'DIR': Path(directorio.name)})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.staff = User.objects.create_user('perfilador', password='x', is_staff=True)
+        self.residente = Residente.objects.select_related('user').first().user
+
+    def perfilar(self, user):
+        self.client.force_login(user)
+        return self.client.get('/api/areas-comunes/', HTTP_X_PROFILE='cprofile').get('X-Profile-Id')
+
+    def test_solo_admins_generan_perfiles(self):
+        self.assertIsNone(self.perfilar(self.residente))
+        self.assertEqual(profiling.listar(), [])
+        perfil_id = self.perfilar(self.staff)
+        self.assertEqual([p['id'] for p in profiling.listar()], [perfil_id])
+        self.assertEqual(profiling.listar()[0]['usuario'], 'perfilador')
+
+    def test_lista_y_descarga_solo_staff(self):
+        perfil_id = self.perfilar(self.staff)
+        self.assertContains(self.client.get('/admin/perfiles/'), perfil_id)
+        response = self.client.get(f'/admin/perfiles/{perfil_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content))
+        self.assertEqual(self.client.get('/admin/perfiles/no-existe/').status_code, 404)
+
+        self.client.force_login(self.residente)
+        for ruta in ('/admin/perfiles/', f'/admin/perfiles/{perfil_id}/'):
+            response = self.client.get(ruta)
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('/admin/login/', response['Location'])
+
+
+class MicroBenchmarkTests(ApiTestCase):
+    """Casos registrados con `api.benchmarks.caso` y su comparación con el baseline (benchmark_micro)."""
+
+    def setUp(self):
+        registro = mock.patch.object(benchmarks, 'REGISTRO', [])
+        registro.start()
+        self.addCleanup(registro.stop)
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.baseline = Path(directorio.name) / 'baseline.json'
+
+        @benchmarks.caso('prueba.conteo', filas=20, repeticiones=5, calentamiento=1)
+        def _conteo(datos):
+            self.datos_del_caso = datos
+            return lambda: sum(range(100))
+
+    def correr(self, **opciones):
+        salida = io.StringIO()
+        call_command('benchmark_micro', filtro='prueba', baseline=str(self.baseline), stdout=salida, **opciones)
+        return salida.getvalue()
+
+    def test_registro_y_baseline(self):
+        self.assertEqual([c.nombre for c in benchmarks.REGISTRO], ['prueba.conteo'])
+        self.assertIn('sin baseline', self.correr(guardar=True))
+        self.assertEqual(len(self.datos_del_caso['residentes']), 5)  # El dataset de la escala del caso
+        guardado = json.loads(self.baseline.read_text())['casos']['prueba.conteo']
+        self.assertEqual(guardado['n'], 5)
+        self.assertNotIn('REGRESIÓN', self.correr())
+
+        # Un baseline mucho más rápido, con intervalos que no se solapan: regresión y exit code 1
+        guardado.update(mediana=guardado['mediana'] / 100, ic95=[0, guardado['mediana'] / 100])
+        self.baseline.write_text(json.dumps({'casos': {'prueba.conteo': guardado}}))
+        with self.assertRaisesMessage(CommandError, 'prueba.conteo'):
+            self.correr()
+
+    def test_bytes_de_render_y_compresion(self):
+        contenido = b'{"monto": 100}' * 500
+
+        @benchmarks.caso('prueba.render', filas=20, repeticiones=3, calentamiento=0, tamano=True)
+        def _render(datos):
+            return lambda: contenido
+
+        @benchmarks.caso('prueba.gzip', filas=20, repeticiones=3, calentamiento=0, tamano=True, crudo='prueba.render')
+        def _gzip(datos):
+            return lambda: gzip.compress(contenido)
+
+        salida = self.correr(guardar=True)
+        comprimido = len(gzip.compress(contenido))
+        self.assertIn(f'{len(contenido):>10,} B', salida)
+        self.assertIn(f'({comprimido / len(contenido):.1%} de {len(contenido):,} B sin comprimir)', salida)
+        casos = json.loads(self.baseline.read_text())['casos']
+        self.assertEqual((casos['prueba.render']['bytes'], casos['prueba.gzip']['bytes']), (len(contenido), comprimido))
+        self.assertNotIn('bytes', casos['prueba.conteo'])
+
+    def test_comparar(self):
+        base = {'mediana': 1.0, 'ic95': [0.95, 1.05]}
+        self.assertEqual(benchmarks.comparar({'mediana': 1.02, 'ic95': [0.97, 1.07]}, base, 0.05)[0], 'igual')
+        self.assertEqual(benchmarks.comparar({'mediana': 0.5, 'ic95': [0.45, 0.55]}, base, 0.05)[0], 'mejora')
+        self.assertEqual(benchmarks.comparar({'mediana': 1.2, 'ic95': [1.1, 1.3]}, base, 0.05)[0], 'regresion')
+        self.assertEqual(benchmarks.comparar({'mediana': 1.2, 'ic95': [1.0, 1.4]}, base, 0.05)[0], 'igual')  # Los IC se solapan
+@override_settings(QUERY_INSPECTOR={'ENABLED': True, 'N_PLUS_ONE_THRESHOLD': 3, 'SLOW_QUERY_MS': 0})
+class QueryInspectorTests(ApiTestCase):
+    """Hallazgos del inspector de queries (api.query_inspector) y su resumen con reporte_queries."""
+
+    filas = 20
+    CAMPO = 'CuotaSerializer.residente_nombre (source=residente.user.get_full_name)'
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.log = Path(directorio.name) / 'queries.jsonl'
+
+    def serializar_sin_join(self):
+        # Sin select_related: residente_nombre consulta residente y user por cada cuota
+        return CuotaSerializer(Cuota.objects.order_by('pk')[:5], many=True).data
+
+    def inspeccionar(self):
+        inspector = query_inspector.QueryInspector(vista='CuotaViewSet.list')
+        with connection.execute_wrapper(inspector):
+            self.serializar_sin_join()
+        return inspector.hallazgos('/api/cuotas/')
+
+    def test_n_plus_one_por_campo(self):
+        repetidas = [h for h in self.inspeccionar() if h['tipo'] == 'n_plus_one']
+        self.assertEqual(len(repetidas), 2)  # api_residente y auth_user
+        for hallazgo in repetidas:
+            self.assertEqual(hallazgo['repeticiones'], 5)
+            self.assertEqual(hallazgo['serializer_field'], self.CAMPO)
+            # Los mixins de medición y trazas no cuentan como origen
+            self.assertRegex(hallazgo['frame'], r'^api/tests\.py:\d+ in serializar_sin_join$')
+
+    def test_query_lenta_con_explain(self):
+        with override_settings(QUERY_INSPECTOR={'ENABLED': True, 'SLOW_QUERY_MS': 0, 'LOG_FILE': self.log}), \
+                self.assertLogs('api.query_inspector', 'WARNING'):
+            self.assertEqual(self.client.get('/api/cuotas/').status_code, 200)
+        lentas = [h for h in query_inspector.leer_log(self.log) if h['tipo'] == 'slow_query']
+        self.assertTrue(lentas)
+        self.assertEqual({h['vista'] for h in lentas}, {'CuotaViewSet.list'})
+        cuotas = next(h for h in lentas if 'FROM "api_cuota"' in h['forma'])
+        self.assertTrue(cuotas['explain'])
+        self.assertNotIn('EXPLAIN falló', cuotas['explain'])
+
+    def test_reporte_queries(self):
+        hallazgos = self.inspeccionar()
+        with override_settings(QUERY_INSPECTOR={'LOG_FILE': self.log}), self.assertLogs('api.query_inspector', 'WARNING'):
+            query_inspector.guardar(hallazgos)
+        salida = io.StringIO()
+        call_command('reporte_queries', log=str(self.log), explain=True, stdout=salida)
+        salida = salida.getvalue()
+        self.assertIn('Peores patrones N+1 (2 distintos)', salida)
+        self.assertIn('CuotaViewSet.list: 5 queries en 1 peticiones', salida)
+        self.assertIn(f'campo: {self.CAMPO}', salida)
+        lentas = [h for h in hallazgos if h['tipo'] == 'slow_query']
+        self.assertIn(f'Queries más lentas ({len(lentas)} registradas)', salida)
+        self.assertIn(f"        {lentas[0]['explain'].splitlines()[0]}", salida)
+
+
+class TrazasTests(ApiTestCase):
+    PADRE = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.archivo = Path(self.directorio.name) / 'traces.jsonl'
+
+    def _trazar(self, ip='203.0.113.5', **extra):
+        with override_settings(TRACING={
+            'ENABLED': True, 'FILE': self.archivo, 'DEFAULT_SAMPLE_RATE': 0.0,
+            'PROXIES_CONFIABLES': ['10.0.0.0/8'], **extra,
+        }):
+            return self.client.get('/api/schema/', HTTP_TRACEPARENT=self.PADRE, REMOTE_ADDR=ip)
+
+    def test_sampled_solo_desde_proxies_confiables(self):
+        self.assertNotIn('traceparent', self._trazar())
+        response = self._trazar(ip='10.1.2.3')
+        self.assertTrue(response['traceparent'].startswith('00-' + 'a' * 32))
+
+    def test_rotacion_por_tamano(self):
+        for _ in range(4):
+            self._trazar(ip='10.1.2.3', MAX_BYTES=1, RESPALDOS=2)
+        self.assertTrue(self.archivo.exists())
+        self.assertTrue(Path(f'{self.archivo}.2').exists())
+        self.assertFalse(Path(f'{self.archivo}.3').exists())
+
+
+class MemoriaTests(ApiTestCase):
+    """El perfil de memoria (api.memory_profiling) solo mide lo que un admin pide, sin encolar peticiones."""
+
+    filas = 20
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEMORY_PROFILER={'ENABLED': True, 'LOG_FILE': Path(directorio.name) / 'memoria.jsonl'})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.admin = Administrador.objects.select_related('user').first().user
+
+    def pico(self, user, **cabeceras):
+        self.client.force_login(user)
+        response = self.client.get('/api/areas-comunes/', **cabeceras)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Memory-Peak-MB')
+
+    def test_solo_a_pedido_de_un_admin(self):
+        self.assertIsNone(self.pico(self.admin))
+        self.assertIsNotNone(self.pico(self.admin, HTTP_X_MEMORY_PROFILE='1'))
+        self.assertIsNone(self.pico(Residente.objects.first().user, HTTP_X_MEMORY_PROFILE='1'))
+
+    def test_no_espera_otra_medicion(self):
+        with memory_profiling.MedicionMemoria():
+            self.assertIsNone(self.pico(self.admin, HTTP_X_MEMORY_PROFILE='1'))
+        self.assertIsNotNone(self.pico(self.admin, HTTP_X_MEMORY_PROFILE='1'))
+
+
+class LecturaRapidaTests(ApiTestCase):
+    """El camino rápido (api.fast_serialization) debe producir exactamente los mismos bytes."""
+
+    URLS = [
+        '/api/cuotas/', '/api/cuotas/?estado=pagada', '/api/pagos/', '/api/visitas/',
+        '/api/pagos/?fields=id,monto_pagado', '/api/pagos/?fields=id&expand=cuota_detalle',
+    ]
+
+    filas = 200
+
+    def test_salida_identica_al_serializer(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                respuestas = {}
+                for rapida in (False, True):
+                    with override_settings(FAST_SERIALIZATION={'ENABLED': rapida}):
+                        respuestas[rapida] = self.client.get(url, HTTP_ACCEPT='application/json').content
+                self.assertGreater(len(respuestas[True]), 2)
+                self.assertEqual(respuestas[True], respuestas[False])
+
+
+class BulkTests(ApiTestCase):
+    """Alta masiva (api.bulk): queries constantes con el tamaño del lote y errores por índice."""
+
+    filas = 40
+
+    def lote(self, n, prefijo):
+        residente = self.datos['residentes'][0].pk
+        return [
+            {'residente': residente, 'placa': f'{prefijo}{i:04d}', 'modelo': 'Sedan', 'tipo_vehiculo': 'Auto'}
+            for i in range(n)
+        ]
+
+    def test_queries_constantes(self):
+        queries = {}
+        # Lotes bajo el límite de parámetros por INSERT de SQLite (999) para que el
+        # troceo del backend no cambie la cuenta
+        for n, prefijo in ((5, 'A'), (100, 'B')):
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.client.post('/api/vehiculos-autorizados/', self.lote(n, prefijo), content_type='application/json')
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.json()['creados'], n)
+            queries[n] = len(capturadas)
+        self.assertEqual(queries[5], queries[100], f'La cantidad de queries crece con el lote: {queries}')
+
+    def test_errores_por_indice_sin_escritura(self):
+        lote = self.lote(3, 'C')
+        lote[1]['residente'] = 999999
+        lote[2]['placa'] = lote[0]['placa']
+        response = self.client.post('/api/vehiculos-autorizados/', lote, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['indice'] for e in response.json()['errores']], [1, 2])
+        self.assertFalse(VehiculoAutorizado.objects.filter(placa__startswith='C0').exists())
+
+    def test_onetoone_como_unico(self):
+        """Seguridad.user (OneToOne) sin UniqueValidator en el serializer: 400 por índice, no IntegrityError."""
+        libres = User.objects.bulk_create([User(username=f'guardia_nuevo_{i}') for i in range(2)])
+        ocupado = self.datos['guardia'][0].user_id
+        lote = [{'user_id': u, 'telefono': '70000000'} for u in (ocupado, libres[0].pk, libres[1].pk, libres[1].pk)]
+        response = self.client.post('/api/seguridad/', lote, content_type='application/json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual([e['indice'] for e in response.json()['errores']], [0, 3])
+        response = self.client.post('/api/seguridad/', lote[1:3], content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_placa_normalizada_como_unica(self):
+        """La unicidad compara la placa normalizada: 400 por índice, no IntegrityError."""
+        existente = VehiculoAutorizado.objects.first().placa
+        lote = self.lote(3, 'D')
+        lote[1]['placa'] = 'd-0000'  # Igual a lote[0] una vez normalizada
+        lote[2]['placa'] = f' {existente.lower()} '
+        response = self.client.post('/api/vehiculos-autorizados/', lote, content_type='application/json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual([e['indice'] for e in response.json()['errores']], [1, 2])
+
+    def test_patch_masivo_con_ids_repetidos(self):
+        vehiculos = list(VehiculoAutorizado.objects.order_by('pk')[:2])
+        lote = [{'id': vehiculos[0].pk, 'modelo': 'Uno'}, {'id': vehiculos[1].pk, 'modelo': 'Dos'},
+                {'id': vehiculos[0].pk, 'modelo': 'Tres'}]
+        response = self.client.patch('/api/vehiculos-autorizados/', lote, content_type='application/json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual([e['indice'] for e in response.json()['errores']], [2])
+        response = self.client.patch('/api/vehiculos-autorizados/', lote[:2], content_type='application/json')
+        self.assertEqual(response.json(), {'actualizados': 2})
+        self.assertEqual([v.modelo for v in VehiculoAutorizado.objects.order_by('pk')[:2]], ['Uno', 'Dos'])
+
+
+class BatchTests(ApiTestCase):
+    """POST /api/batch/ (api.batch) responde lo mismo que las peticiones individuales."""
+
+    RUTAS = ['/api/cuotas/?estado=pendiente', '/api/visitas/', '/api/tickets-mantenimiento/', '/api/no-existe/']
+
+    filas = 40
+
+    def test_respuestas_iguales_a_las_individuales(self):
+        response = self.client.post(
+            '/api/batch/', {'peticiones': [{'id': ruta, 'path': ruta} for ruta in self.RUTAS]},
+            content_type='application/json', HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        for respuesta in response.json()['respuestas']:
+            with self.subTest(ruta=respuesta['id']):
+                individual = self.client.get(respuesta['id'], HTTP_ACCEPT='application/json')
+                self.assertEqual(respuesta['status'], individual.status_code)
+                if individual.status_code == 200:
+                    self.assertEqual(respuesta['body'], individual.json())
+
+    def test_escrituras_en_orden(self):
+        residente = VehiculoAutorizado.objects.values_list('residente', flat=True).first()
+        response = self.client.post('/api/batch/', [
+            {'method': 'POST', 'path': '/api/vehiculos-autorizados/',
+             'body': {'residente': residente, 'placa': 'lote-1', 'modelo': 'x', 'tipo_vehiculo': 'Auto'}},
+            {'path': '/api/vehiculos-autorizados/?placa=LOTE1'},
+        ], content_type='application/json', HTTP_ACCEPT='application/json')
+        creado, listado = response.json()['respuestas']
+        self.assertEqual(creado['status'], 201)
+        self.assertIn(creado['body']['id'], [v['id'] for v in listado['body']])
+
+    @override_settings(LOAD_SHEDDING={'NIVELES': {'exportacion': {'CONCURRENCIA': 2, 'TASA': 0.1, 'RAFAGA': 1}}})
+    def test_descarte_por_subpeticion(self):
+        """Cada sub-petición pasa por el nivel de su vista, no por el del POST agrupado."""
+        load_shedding.limitador.reiniciar()
+        self.addCleanup(load_shedding.limitador.reiniciar)
+        response = self.client.post('/api/batch/', [
+            {'path': '/api/reportes/finanzas/'}, {'path': '/api/reportes/finanzas/'}, {'path': '/api/cuotas/'},
+        ], content_type='application/json', HTTP_ACCEPT='application/json')
+        reporte, descartado, cuotas = response.json()['respuestas']
+        self.assertEqual((reporte['status'], descartado['status'], cuotas['status']), (200, 429, 200))
+        self.assertEqual(descartado['body']['nivel'], 'exportacion')
+        self.assertIn('Retry-After', descartado['headers'])
+        self.assertEqual(load_shedding.limitador.estado()['en_curso'], dict.fromkeys(load_shedding.NIVELES, 0))
+
+
+class FormulariosAcotadosTests(ApiTestCase):
+    """La API navegable no enumera las tablas relacionadas (inputs de ID con autocompletado)."""
+
+    def test_queries_del_formulario_no_crecen(self):
+        queries = {}
+        for filas in ESCALAS:
+            with transaction.atomic():
+                restaurar_o_sembrar(filas)
+                with CaptureQueriesContext(connection) as capturadas:
+                    response = self.client.get('/api/pagos/?fields=id', HTTP_ACCEPT='text/html')
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(b'<option', response.content.split(b'name="cuota_id"')[1][:2000])
+                queries[filas] = len(capturadas)
+                transaction.set_rollback(True)
+        self.assertEqual(len(set(queries.values())), 1, f'El formulario consulta más con más datos: {queries}')
+
+    def test_autocompletar_paginado(self):
+        restaurar_o_sembrar(40)
+        datos = self.client.get('/api/autocompletar/cuota/', HTTP_ACCEPT='application/json').json()
+        self.assertEqual(len(datos['resultados']), 20)
+        self.assertTrue(datos['siguiente'])
+        self.assertEqual(self.client.get('/api/autocompletar/pago/').status_code, 404)
+
+
+@override_settings(SYNC={'MARGEN_SEGUNDOS': 0, 'PAGE_SIZE': 10})
+class SyncTests(ApiTestCase):
+    """GET /api/sync/ (api.sync): páginas acotadas, delta del residente y tombstones."""
+
+    filas = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.residente = Residente.objects.first()
+
+    def sincronizar_todo(self, cursor=None):
+        cambios, eliminados = {}, {}
+        while True:
+            response = self.client.get('/api/sync/', {'since': cursor} if cursor else {}, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            datos = response.json()
+            self.assertLessEqual(sum(len(f) for f in datos['cambios'].values()) + sum(len(i) for i in datos['eliminados'].values()), 10)
+            for recurso, filas in datos['cambios'].items():
+                cambios.setdefault(recurso, []).extend(f['id'] for f in filas)
+            for recurso, ids in datos['eliminados'].items():
+                eliminados.setdefault(recurso, []).extend(ids)
+            cursor = datos['cursor']
+            if not datos['mas']:
+                return cambios, eliminados, cursor
+
+    def test_delta_del_residente(self):
+        self.client.force_login(self.residente.user)
+        cambios, _, cursor = self.sincronizar_todo()
+        self.assertCountEqual(cambios['cuotas'], Cuota.objects.filter(residente=self.residente).values_list('pk', flat=True))
+        self.assertEqual(cambios['residentes'], [self.residente.pk])
+
+        cuota = Cuota.objects.filter(residente=self.residente).first()
+        cuota.estado = 'vencida'
+        cuota.save()
+        visita = Visita.objects.filter(residente=self.residente).first()
+        visita_id = visita.pk
+        visita.delete()
+        Cuota.objects.exclude(residente=self.residente).first().delete()
+
+        cambios, eliminados, _ = self.sincronizar_todo(cursor)
+        self.assertEqual(cambios, {'cuotas': [cuota.pk]})
+        self.assertEqual(eliminados, {'visitas': [visita_id]})
+
+    def test_tombstones_de_una_cascada_en_un_insert(self):
+        residente = Residente.objects.filter(cuotas__pagos__isnull=False).first()
+        pagos = dict(Pago.objects.filter(cuota__residente=residente).values_list('pk', 'cuota__residente_id'))
+        cuotas = Cuota.objects.filter(residente=residente).count()
+        with CaptureQueriesContext(connection) as consultas:
+            residente.delete()
+        sql = [q['sql'] for q in consultas.captured_queries]
+        self.assertEqual(sum('INSERT INTO "api_eliminacion"' in q for q in sql), 1)
+        self.assertEqual(sum('FROM "api_cuota"' in q and 'SELECT' in q for q in sql), 2)  # Cascada + dueños de los pagos
+        self.assertEqual(Eliminacion.objects.filter(recurso='cuotas').count(), cuotas)
+        self.assertEqual(dict(Eliminacion.objects.filter(recurso='pagos').values_list('objeto_id', 'residente_id')), pagos)
+
+    def test_sin_perfil_y_cursor_invalido(self):
+        self.assertEqual(self.client.get('/api/sync/').status_code, 401)  # WWW-Authenticate: Bearer
+        self.client.force_login(self.residente.user)
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'no-es-un-cursor'}).status_code, 400)
+
+
+class RenderTests(ApiTestCase):
+    """El JSON de orjson (api.renderers) es el de DRF byte a byte; las respuestas grandes se comprimen."""
+
+    URLS = ['/api/pagos/', '/api/cuotas/', '/api/residentes/', '/api/reservas/', '/api/dashboard/admin/']
+
+    filas = 40
+
+    def test_salida_identica_a_drf(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_ACCEPT='application/json')
+                self.assertGreater(len(response.content), 2)
+                self.assertEqual(response.content, JSONRendererDRF().render(response.data))
+
+    def test_compresion(self):
+        plano = self.client.get('/api/pagos/', HTTP_ACCEPT='application/json')
+        comprimido = self.client.get('/api/pagos/', HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(comprimido['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', comprimido['Vary'])
+        self.assertEqual(gzip.decompress(comprimido.content), plano.content)
+        rechazado = self.client.get('/api/pagos/', HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(rechazado.has_header('Content-Encoding'))
+
+
+@override_settings(TRAFFIC_RECORDER={'SAFE_PARAMS': ('estado',)})
+class TraficoTests(ApiTestCase):
+    """Grabación anonimizada (api.traffic) y reproducción sobre el dataset sembrado (replay_trafico)."""
+
+    filas = 20
+
+    def test_filtros_anonimizados(self):
+        request = RequestFactory().get('/api/cuotas/', {'estado': 'pendiente', 'residente': '12', 'mes': 'marzo'})
+        filtros = traffic.filtros(request)
+        self.assertEqual(filtros['estado'], 'pendiente')
+        self.assertEqual(filtros['residente'], traffic.anonimizar('12'))  # Los ids también identifican
+        self.assertEqual(filtros['mes'], traffic.anonimizar('marzo'))
+
+    def test_hashes_a_valores_del_dataset(self):
+        dataset = replay_trafico.Dataset()
+        registro = {'r': 'pago-list', 'p': '/api/pagos/', 'q': {'cuota__residente': traffic.anonimizar('999'), 'page': '2'}}
+        filtros = dataset.filtros(registro)
+        self.assertEqual(filtros['page'], '2')
+        self.assertTrue(Residente.objects.filter(pk=filtros['cuota__residente']).exists())
+        self.assertEqual(dataset.filtros(registro), filtros)  # Mismo hash, mismo valor
+
+        registro = {'r': 'vehiculoautorizado-list', 'p': '/api/vehiculos-autorizados/',
+                    'b': {'placa': 'str:6', 'residente': 'int', 'tipo_vehiculo': 'str:4'}}
+        cuerpo, tipo = dataset.cuerpo(registro, '1')
+        datos = json.loads(cuerpo)
+        self.assertEqual(tipo, 'application/json')
+        self.assertTrue(Residente.objects.filter(pk=datos['residente']).exists())
+        self.assertEqual(len(datos['placa']), 6)
+        self.assertFalse(VehiculoAutorizado.objects.filter(placa=datos['placa']).exists())
+        self.assertEqual(datos['tipo_vehiculo'], 'Auto')
+
+    def test_volcados_concurrentes_por_proceso(self):
+        """Volcados simultáneos de hilos y de dos workers: miembros gzip íntegros, un archivo por pid."""
+        with tempfile.TemporaryDirectory() as directorio, override_settings(TRAFFIC_RECORDER={'DIR': directorio}):
+            grabador = traffic.Grabador()
+            atexit.unregister(grabador.volcar)
+            lotes = [[{'t': lote * 1000 + i, 'p': 'x' * 500} for i in range(200)] for lote in range(8)]
+            for pid in (101, 202):
+                with mock.patch.object(traffic.os, 'getpid', return_value=pid), ThreadPoolExecutor(4) as hilos:
+                    list(hilos.map(grabador._escribir, lotes))
+            hoy = timezone.now().strftime('%Y%m%d')
+            self.assertEqual(sorted(p.name for p in Path(directorio).iterdir()),
+                             [f'trafico-{hoy}-101.jsonl.gz', f'trafico-{hoy}-202.jsonl.gz'])
+            self.assertEqual(len(traffic.leer([f'{directorio}/trafico-{hoy}-*.jsonl.gz'])), 2 * 8 * 200)
+            self.assertEqual(len(traffic.leer([f'{directorio}/trafico-{hoy}-101.jsonl.gz'])), 8 * 200)
+            self.assertEqual(len(traffic.leer()), 2 * 8 * 200)  # Sin rutas: todo el directorio
+
+    def test_multipart_se_reproduce(self):
+        self.client.force_login(Seguridad.objects.first().user)
+        cuerpo, tipo = replay_trafico.Dataset().cuerpo(
+            {'r': 'seguridad-validar-facial', 'p': '/api/seguridad/validar-facial/', 'b': {'_multipart': {'imagen': 'file:48213'}}}, '1',
+        )
+        response = self.client.generic('POST', '/api/seguridad/validar-facial/', cuerpo, content_type=tipo)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['valido'])
+
+
+# Las cargas apuntan a 'default' para que las consultas del test no salgan de su transacción
+# (el alias 'replica' es un espejo con otra conexión); es_replica se simula en setUp
+@override_settings(DB_ROUTING={'ENABLED': True, 'ALIASES': dict.fromkeys(('gate', 'reportes', 'lectura', 'escritura'), 'default')})
+class RuteoTests(ApiTestCase):
+    """Lecturas a la réplica; escrituras y lecturas recientes del mismo usuario, al primario (api.db_routing)."""
+
+    filas = 20
+
+    def setUp(self):
+        # Con una sola base los alias caen en 'default': se simula que es otro servidor
+        for parche in (mock.patch.object(db_routing, 'es_replica', return_value=True),
+                       mock.patch.object(db_routing, 'activar', wraps=db_routing.activar)):
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.addCleanup(cache.clear)
+        self.bearer = f"Bearer {tokens.emitir(Administrador.objects.first().user)['access']}"
+
+    def carga(self, metodo, ruta, **extra):
+        db_routing.activar.reset_mock()
+        response = getattr(self.client, metodo)(ruta, HTTP_AUTHORIZATION=self.bearer, **extra)
+        return response, db_routing.activar.call_args.args[0]
+
+    def test_clasificacion(self):
+        self.assertEqual(db_routing.clasificar('validar_qr', 'POST'), 'gate')
+        self.assertEqual(db_routing.clasificar('reporte_finanzas', 'GET'), 'reportes')
+        self.assertEqual(db_routing.clasificar('list', 'GET'), 'lectura')
+        self.assertEqual(db_routing.clasificar('list', 'GET', primario_forzado=True), 'escritura')
+        self.assertEqual(db_routing.clasificar('create', 'POST'), 'escritura')
+
+    @override_settings(DB_ROUTING={'ENABLED': True})
+    def test_alias_del_router(self):
+        router = db_routing.PrimaryReplicaRouter()
+        esperado = {'lectura': 'replica', 'reportes': 'reportes', 'escritura': 'default', 'gate': 'gate'}
+        for carga, alias in esperado.items():
+            with self.subTest(carga=carga), db_routing.usar_carga(carga):
+                self.assertEqual(router.db_for_read(Cuota), db_routing.alias(carga))
+                self.assertEqual(db_routing.alias(carga), alias if alias in settings.DATABASES else 'default')
+        with db_routing.usar_carga('lectura'):
+            self.assertEqual(router.db_for_write(Cuota), 'default')
+
+    def test_lectura_despues_de_escritura_por_token(self):
+        self.assertEqual(self.carga('get', '/api/areas-comunes/')[1], 'lectura')
+        response, carga = self.carga('post', '/api/areas-comunes/', data={'nombre': 'Quincho'})
+        self.assertEqual((response.status_code, carga), (201, 'escritura'))
+        # La App Móvil no devuelve la cookie: basta el sub del token
+        self.client.cookies.clear()
+        self.assertEqual(self.carga('get', '/api/areas-comunes/')[1], 'escritura')
+        otro = Residente.objects.select_related('user').first().user
+        self.bearer = f"Bearer {tokens.emitir(otro)['access']}"
+        self.assertEqual(self.carga('get', '/api/areas-comunes/')[1], 'lectura')
+
+    def test_porteria_no_fija_el_primario(self):
+        response, carga = self.carga('post', '/api/seguridad/validar-placa/', data={'placa': 'ZZZ999'})
+        self.assertEqual((response.status_code, carga), (200, 'gate'))
+        self.assertNotIn(db_routing.config('COOKIE'), response.cookies)
+        self.assertEqual(self.carga('get', '/api/areas-comunes/')[1], 'lectura')
+
+    def test_deshabilitado_no_consulta_la_cache(self):
+        with override_settings(DB_ROUTING={'ENABLED': False}), \
+                mock.patch.object(db_routing, 'primario_forzado') as forzado:
+            response = self.client.post('/api/areas-comunes/', {'nombre': 'Quincho'}, HTTP_AUTHORIZATION=self.bearer)
+        self.assertEqual(response.status_code, 201)
+        forzado.assert_not_called()
+        db_routing.activar.assert_not_called()
+        self.assertNotIn(db_routing.config('COOKIE'), response.cookies)
+
+    def test_anonimo_con_cookie(self):
+        fabrica = RequestFactory()
+        response = JsonResponse({}, status=201)
+        db_routing.marcar_escritura(fabrica.post('/'), response)
+        pegajosa = fabrica.get('/')
+        pegajosa.COOKIES[db_routing.config('COOKIE')] = response.cookies[db_routing.config('COOKIE')].value
+        self.assertTrue(db_routing.primario_forzado(pegajosa))
+        self.assertFalse(db_routing.primario_forzado(fabrica.get('/')))
+
+
+@override_settings(TABLE_CACHE={'ENABLED': True, 'CONDITIONAL': True})
+class TableCacheTests(ApiTestCase):
+    """Caché de respuestas y GET condicional (api.table_cache): cada tipo de escritura invalida."""
+
+    filas = 20
+
+    def setUp(self):
+        cache.clear()
+        table_cache.local.clear()
+
+    def get(self, url, **cabeceras):
+        return self.client.get(url, HTTP_ACCEPT='application/json', **cabeceras)
+
+    def resultados(self, vista):
+        contador = metrics.registry.snapshot().get('condominio_cache_requests_total', {})
+        return {r: contador.get(f'{vista}|{r}', {}).get('value', 0) for r in ('hit_local', 'hit_shared', 'miss')}
+
+    def test_aciertos_sin_queries_y_metricas(self):
+        antes = self.resultados('CuotaViewSet')
+        primera = self.get('/api/cuotas/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/cuotas/').content, primera.content)
+        table_cache.local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/cuotas/').content, primera.content)
+        despues = self.resultados('CuotaViewSet')
+        self.assertEqual({r: despues[r] - antes[r] for r in despues}, {'hit_local': 1, 'hit_shared': 1, 'miss': 1})
+
+    def test_invalidacion_por_cada_escritura(self):
+        cuota = Cuota.objects.first()
+        visita = Visita.objects.first()
+        residente = Residente.objects.first()
+
+        def guardar():
+            cuota.estado = 'vencida'
+            cuota.save()
+
+        def agregar_grupo():
+            residente.user.groups.add(Group.objects.create(name='morosos'))
+
+        def alta_masiva():
+            self.client.post('/api/vehiculos-autorizados/', [
+                {'residente': residente.pk, 'placa': 'NUEVA1', 'modelo': 'Sedan', 'tipo_vehiculo': 'Auto'},
+            ], content_type='application/json')
+
+        escrituras = [
+            ('post_save', 'CuotaViewSet', f'/api/cuotas/{cuota.pk}/', guardar),
+            ('post_delete', 'VisitaViewSet', '/api/visitas/', visita.delete),
+            ('m2m_changed', 'UserViewSet', '/api/users/', agregar_grupo),
+            ('bulk_create', 'VehiculoAutorizadoViewSet', '/api/vehiculos-autorizados/', alta_masiva),
+        ]
+        for nombre, vista, url, escribir in escrituras:
+            with self.subTest(escritura=nombre):
+                antes = self.get(url)
+                self.assertEqual(self.get(url)['ETag'], antes['ETag'])
+                with self.captureOnCommitCallbacks(execute=True):
+                    escribir()
+                fallos = self.resultados(vista)['miss']
+                despues = self.get(url)
+                self.assertEqual(self.resultados(vista)['miss'], fallos + 1)
+                self.assertNotEqual(despues['ETag'], antes['ETag'])
+
+    def test_update_requiere_invalidar(self):
+        url = f'/api/cuotas/{Cuota.objects.first().pk}/'
+        self.assertNotEqual(self.get(url).json()['estado'], 'vencida')
+        Cuota.objects.filter(pk=Cuota.objects.first().pk).update(estado='vencida')
+        self.assertNotEqual(self.get(url).json()['estado'], 'vencida')  # .update() no emite señales
+        with self.captureOnCommitCallbacks(execute=True):
+            table_cache.invalidar(Cuota)
+        self.assertEqual(self.get(url).json()['estado'], 'vencida')
+
+    def test_etag_y_304(self):
+        etag = self.get('/api/cuotas/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.get('/api/cuotas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        with self.captureOnCommitCallbacks(execute=True):
+            Cuota.objects.first().delete()
+        response = self.get('/api/cuotas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_last_modified_con_precision_de_subsegundo(self):
+        hace = time.time() - 5
+        for modelo in snapshots.modelos():
+            table_cache.backend().set(table_cache._clave_modificacion(modelo._meta.db_table), hace, timeout=None)
+        last_modified = self.get('/api/cuotas/')['Last-Modified']
+        self.assertEqual(last_modified, http_date(math.ceil(hace)))
+        self.assertEqual(self.get('/api/cuotas/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # Una escritura en el segundo en curso: sin Last-Modified hasta que termine y nunca 304
+        with self.captureOnCommitCallbacks(execute=True):
+            Cuota.objects.first().save()
+        response = self.get('/api/cuotas/', HTTP_IF_MODIFIED_SINCE=http_date(int(time.time())))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_respuestas_de_la_replica(self):
+        """Lo leído de una réplica no se cachea ni lleva validadores; la caché se llena desde el primario."""
+        cargas, original = [], CuotaViewSet.get_queryset
+
+        def get_queryset(vista):
+            cargas.append(db_routing.carga_actual())
+            return original(vista)
+
+        with mock.patch.object(db_routing, 'lee_de_replica', return_value=True), \
+                mock.patch.object(CuotaViewSet, 'get_queryset', get_queryset):
+            dashboard = self.get('/api/dashboard/admin/')
+            cuotas = self.get('/api/cuotas/')
+        self.assertEqual(dashboard.status_code, 200)
+        self.assertNotIn('ETag', dashboard)
+        self.assertIn('ETag', cuotas)
+        self.assertEqual(cargas[-1], 'escritura')
+
+
+@override_settings(ESQUEMA={'USAR_ARCHIVOS': False})
+class EsquemaTests(ApiTestCase):
+    """/api/schema/ (api.schema) se genera una vez por proceso y responde igual que drf-spectacular."""
+
+    def setUp(self):
+        schema.reiniciar()
+
+    def test_igual_a_spectacular_y_sin_regenerar(self):
+        esperado = schema.generar()['json']
+        with mock.patch.object(schema, 'generar', wraps=schema.generar) as generar:
+            primera = self.client.get('/api/schema/?format=json')
+            segunda = self.client.get('/api/schema/?format=json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(generar.call_count, 1)
+        self.assertEqual(primera.content, esperado)
+        self.assertEqual(segunda['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(segunda.content), esperado)
+        no_modificado = self.client.get('/api/schema/?format=json', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(no_modificado.status_code, 304)
+
+    def test_operation_ids_unicos(self):
+        ids = [
+            operacion['operationId']
+            for ruta in json.loads(schema.generar()['json'])['paths'].values() for operacion in ruta.values()
+        ]
+        self.assertIn('cuotas_bulk_partial_update', ids)
+        self.assertIn('cuotas_partial_update', ids)
+        self.assertFalse([i for i in ids if 'partial_update' in i and i[-1].isdigit()])
+
+    def test_check_detecta_desactualizado(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(ESQUEMA={'DIRECTORIO': directorio}):
+            with self.assertRaises(CommandError):
+                call_command('esquema_openapi', '--check', stdout=io.StringIO())
+            call_command('esquema_openapi', stdout=io.StringIO())
+            call_command('esquema_openapi', '--check', stdout=io.StringIO())
+
+
+class ArranqueTests(ApiTestCase):
+    """Un worker arranca sin importar reportlab, openpyxl, Faker ni drf-spectacular (api.startup)."""
+
+    def test_sin_imports_diferidos(self):
+        perfil = startup.perfilar_arranque()
+        self.assertEqual(startup.prohibidos_importados(perfil['modulos']), [])
+        self.assertIn('api.views', [nombre for nombre, *_ in perfil['modulos']])
+
+
+@override_settings(WARMUP={'ENABLED': True})
+class WarmupTests(ApiTestCase):
+    """GET /ready (api.warmup) recién da 200 cuando terminaron todas las etapas del calentamiento."""
+
+    filas = 40
+
+    def setUp(self):
+        warmup.reiniciar()
+        self.addCleanup(warmup.reiniciar)
+
+    def test_listo_despues_del_calentamiento(self):
+        with mock.patch.object(warmup, 'iniciar_en_segundo_plano') as iniciar:
+            self.assertEqual(self.client.get('/ready').status_code, 503)
+        iniciar.assert_called_once()
+
+        resultados = warmup.ejecutar(['placas', 'visitas_qr', 'areas_comunes', 'dashboard'])
+        self.assertEqual([r.get('error') for r in resultados], [None] * 4)
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e['etapa'] for e in response.json()['etapas']], ['placas', 'visitas_qr', 'areas_comunes', 'dashboard'])
+
+
+class SnapshotTests(ApiTestCase):
+    """Un snapshot (api.snapshots) restaura exactamente las filas capturadas, sin pasar por el ORM."""
+
+    def test_captura_y_restauracion(self):
+        sembrar_completo(40)
+        capturadas = {m: list(m._base_manager.order_by('pk').values_list()) for m in snapshots.modelos()}
+        with tempfile.TemporaryDirectory() as directorio, override_settings(SNAPSHOTS={'DIRECTORIO': directorio}):
+            snapshots.capturar('prueba')
+            Visita.objects.all().delete()
+            Cuota.objects.update(estado='vencida')
+            manifest = snapshots.restaurar('prueba')
+        self.assertEqual(sum(t['filas'] for t in manifest['tablas']), sum(len(f) for f in capturadas.values()))
+        for modelo, filas in capturadas.items():
+            with self.subTest(modelo=modelo.__name__):
+                self.assertEqual(list(modelo._base_manager.order_by('pk').values_list()), filas)
+
+
+class TokenTests(ApiTestCase):
+    """Tokens firmados (api.tokens): sin consultas por petición, rotación del refresh y revocación."""
+
+    filas = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.residente = Residente.objects.select_related('user').first()
+        cls.residente.user.set_password('clave-de-prueba')
+        cls.residente.user.save()
+
+    def setUp(self):
+        cache.clear()
+        tokens.reiniciar()
+        self.addCleanup(tokens.reiniciar)
+        response = self.client.post('/api/token/', {'username': self.residente.user.username, 'password': 'clave-de-prueba'})
+        self.assertEqual(response.status_code, 200)
+        self.emitidos = response.json()
+
+    def test_claims_y_verificacion_sin_consultas(self):
+        self.assertEqual(self.emitidos['user']['role'], 'RESIDENTE')
+        self.assertEqual(self.emitidos['user']['residente_id'], self.residente.pk)
+        request = mock.Mock(META={'HTTP_AUTHORIZATION': f"Bearer {self.emitidos['access']}"})
+        tokens.TokenFirmadoAuthentication().authenticate(request)  # Carga la fecha de corte del usuario
+        with CaptureQueriesContext(connection) as consultas:
+            user, _ = tokens.TokenFirmadoAuthentication().authenticate(request)
+            self.assertEqual(tokens.rol_de(user), ('RESIDENTE', self.residente.pk))
+        self.assertEqual(len(consultas), 0)
+
+        self.assertEqual(self.client.get('/api/sync/', HTTP_AUTHORIZATION=f"Bearer {self.emitidos['access']}").status_code, 200)
+
+        cabecera, carga, firma = self.emitidos['access'].split('.')
+        alterado = f"{cabecera}.{carga[:-2]}{'A' if carga[-2] != 'A' else 'B'}{carga[-1]}.{firma}"
+        self.assertEqual(self.client.get('/api/sync/', HTTP_AUTHORIZATION=f'Bearer {alterado}').status_code, 401)
+        self.assertEqual(self.client.get('/api/sync/', HTTP_AUTHORIZATION=f"Bearer {self.emitidos['refresh']}").status_code, 401)
+
+    def test_rotacion_y_revocacion(self):
+        response = self.client.post('/api/token/refresh/', {'refresh': self.emitidos['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': self.emitidos['refresh']}).status_code, 401)
+
+        nuevo = response.json()['access']
+        time.sleep(0.01)
+        self.assertEqual(self.client.post('/api/token/revocar/', HTTP_AUTHORIZATION=f'Bearer {nuevo}').status_code, 204)
+        self.assertEqual(self.client.get('/api/sync/', HTTP_AUTHORIZATION=f'Bearer {nuevo}').status_code, 401)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': response.json()['refresh']}).status_code, 401)
+
+    def test_refresh_concurrente_gana_uno(self):
+        resultados = []
+        # Ninguno de los dos ve la marca del otro antes de escribir: decide el add atómico
+        with mock.patch.object(cache, 'get', return_value=None):
+            for _ in range(2):
+                try:
+                    tokens.refrescar(self.emitidos['refresh'])
+                    resultados.append(True)
+                except tokens.TokenInvalido:
+                    resultados.append(False)
+        self.assertEqual(resultados, [True, False])
+
+    def test_cache_compartida_en_deploy(self):
+        self.assertEqual([e.id for e in tokens.verificar_cache()], ['api.E002'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://r'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(tokens.verificar_cache(), [])
+
+    def test_profiler_con_bearer(self):
+        """El ProfilerMiddleware corre antes que DRF: autentica el Bearer él mismo."""
+        admin = tokens.emitir(Administrador.objects.select_related('user').first().user)['access']
+        with tempfile.TemporaryDirectory() as directorio, override_settings(PROFILER={'DIR': directorio}):
+            perfilada = self.client.get('/api/areas-comunes/', HTTP_X_PROFILE='cprofile', HTTP_AUTHORIZATION=f'Bearer {admin}')
+            residente = self.client.get('/api/areas-comunes/', HTTP_X_PROFILE='cprofile', HTTP_AUTHORIZATION=f"Bearer {self.emitidos['access']}")
+            self.assertIn('X-Profile-Id', perfilada)
+            self.assertNotIn('X-Profile-Id', residente)
+            self.assertEqual(profiling.listar()[0]['usuario'], Administrador.objects.first().user.username)
+
+
+@override_settings(LOAD_SHEDDING={'NIVELES': {'analitica': {'CONCURRENCIA': 4, 'TASA': 1, 'RAFAGA': 1}}})
+class LoadSheddingTests(ApiTestCase):
+    """El dashboard se descarta (api.load_shedding) por tasa o si el gate se degrada; el gate sigue pasando."""
+
+    filas = 20
+
+    def setUp(self):
+        load_shedding.limitador.reiniciar()
+        self.addCleanup(load_shedding.limitador.reiniciar)
+
+    def decisiones(self, nivel, decision):
+        return metrics.registry.snapshot().get('condominio_load_shedding_total', {}).get(f'{nivel}|{decision}', {}).get('value', 0)
+
+    def test_tasa_por_cliente(self):
+        self.assertEqual(self.client.get('/api/dashboard/admin/', HTTP_X_DISPOSITIVO='panel-1').status_code, 200)
+        rechazadas = self.decisiones('analitica', 'tasa')
+        # Fuera del gate X-Dispositivo no abre otro bucket: cuenta la IP
+        response = self.client.get('/api/dashboard/admin/', HTTP_X_DISPOSITIVO='panel-2')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.decisiones('analitica', 'tasa'), rechazadas + 1)
+        self.assertEqual(self.client.get('/api/dashboard/admin/', REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_dispositivo_solo_de_guardias_en_el_gate(self):
+        guardia = Seguridad.objects.select_related('user').first().user
+        residente = Residente.objects.select_related('user').first().user
+        fabrica = RequestFactory()
+
+        def clave(nivel, user=None):
+            cabeceras = {'HTTP_X_DISPOSITIVO': 'camara-1'}
+            if user is not None:
+                cabeceras['HTTP_AUTHORIZATION'] = f"Bearer {tokens.emitir(user)['access']}"
+            return load_shedding.cliente(fabrica.get('/', **cabeceras), nivel)
+
+        self.assertEqual(clave('gate', guardia), 'dispositivo:camara-1')
+        self.assertEqual(clave('app', guardia), f'usuario:{guardia.pk}')
+        self.assertEqual(clave('gate', residente), f'usuario:{residente.pk}')
+        self.assertEqual(clave('gate'), 'ip:127.0.0.1')
+
+    def test_gate_degradado_descarta_analitica(self):
+        for _ in range(10):
+            load_shedding.limitador.admitir('gate', 'camara-1')
+            load_shedding.limitador.liberar('gate', 0.5)
+        self.assertTrue(load_shedding.limitador.degradado())
+        response = self.client.get('/api/dashboard/admin/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['motivo'], 'degradacion')
+        self.assertIn('Retry-After', response)
+
+        placa = VehiculoAutorizado.objects.filter(autorizado=True).first().placa
+        response = self.client.post('/api/seguridad/validar-placa/', {'placa': placa}, HTTP_X_DISPOSITIVO='camara-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['valido'])
+        self.assertEqual(load_shedding.limitador.estado()['en_curso'], dict.fromkeys(load_shedding.NIVELES, 0))
+
+    def test_latencia_del_gate_entre_procesos(self):
+        gate_, app = load_shedding.Limitador(), load_shedding.Limitador()  # Dos procesos
+        self.addCleanup(cache.delete, load_shedding.CLAVE_LATENCIA)
+        gate_.admitir('gate', 'camara-1')
+        gate_.liberar('gate', 1.0)
+        # Con caché local (LocMem) el proceso de la app no se entera
+        self.assertFalse(app.degradado())
+        app.reiniciar()
+        with mock.patch.object(load_shedding, 'compartida', return_value=True):
+            gate_.reiniciar()
+            gate_.admitir('gate', 'camara-1')
+            gate_.liberar('gate', 1.0)
+            self.assertTrue(app.degradado())
+            self.assertEqual(app.admitir('analitica', 'panel').motivo, 'degradacion')
+
+
+class GateAppTests(ApiTestCase):
+    """La aplicación ASGI de portería (api.gate) responde igual que las acciones de SeguridadViewSet."""
+
+    filas = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.aplicacion = gate.GateApp()  # Como config.asgi_gate: importar api.gate no la crea
+
+    async def llamar(self, ruta, datos=None, metodo='POST'):
+        scope = {
+            'type': 'http', 'method': metodo, 'path': ruta, 'query_string': b'', 'scheme': 'http',
+            'headers': [(b'content-type', b'application/json'), (b'host', b'testserver')],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        comunicador = ApplicationCommunicator(self.aplicacion, scope)
+        await comunicador.send_input({'type': 'http.request', 'body': json.dumps(datos or {}).encode()})
+        inicio = await comunicador.receive_output()
+        cuerpo = await comunicador.receive_output()
+        return inicio['status'], json.loads(cuerpo['body'])
+
+    async def test_mismas_respuestas_que_el_viewset(self):
+        placa = (await VehiculoAutorizado.objects.filter(autorizado=True).afirst()).placa
+        for datos in ({'placa': placa.lower()}, {'placa': 'ZZZ999'}, {}):
+            with self.subTest(datos=datos):
+                esperado = await sync_to_async(self.client.post)('/api/seguridad/validar-placa/', datos, content_type='application/json')
+                self.assertEqual(await self.llamar('/api/seguridad/validar-placa/', datos), (esperado.status_code, esperado.json()))
+
+        visita = await Visita.objects.filter(hora_entrada_real__isnull=True, codigo_qr_acceso__isnull=False).afirst()
+        status, datos = await self.llamar('/api/seguridad/validar-qr/', {'codigo_qr': visita.codigo_qr_acceso})
+        self.assertEqual((status, datos['autorizado']), (200, True))
+        await visita.arefresh_from_db()
+        self.assertIsNotNone(visita.hora_entrada_real)
+        esperado = await sync_to_async(self.client.post)('/api/seguridad/validar-qr/', {'codigo_qr': visita.codigo_qr_acceso}, content_type='application/json')
+        self.assertEqual(await self.llamar('/api/seguridad/validar-qr/', {'codigo_qr': visita.codigo_qr_acceso}), (200, esperado.json()))
+
+        self.assertEqual((await self.llamar('/api/users/'))[0], 404)
+        self.assertEqual((await self.llamar('/api/seguridad/validar-placa/', metodo='GET'))[0], 405)
+
+    async def test_qr_concurrente_entra_una_vez(self):
+        visita = await Visita.objects.select_related(
+            'residente__user', 'residente__unidad_habitacional',
+        ).filter(hora_entrada_real__isnull=True, codigo_qr_acceso__isnull=False).afirst()
+        self.assertTrue((await self.llamar('/api/seguridad/validar-qr/', {'codigo_qr': visita.codigo_qr_acceso}))[1]['autorizado'])
+
+        # La otra lectura vio la visita antes de que se registrara la entrada
+        async def leida_antes(*args, **kwargs):
+            return visita
+
+        with mock.patch('django.db.models.query.QuerySet.aget', leida_antes):
+            status, datos = await self.llamar('/api/seguridad/validar-qr/', {'codigo_qr': visita.codigo_qr_acceso})
+        self.assertEqual((status, datos['autorizado']), (200, False))
+
+    def test_importar_no_crea_la_aplicacion(self):
+        self.assertFalse(hasattr(gate, 'application'))
@@ -0,0 +1,286 @@
+"""
+Tokens de acceso y refresco firmados (JWT HS256), verificados sin base de datos.
+
+    POST /api/token/           {username, password}  -> {access, refresh, user}
+    POST /api/token/refresh/   {refresh}             -> {access, refresh} (el refresh se rota)
+    POST /api/token/revocar/   (Bearer)              -> revoca todos los tokens del usuario
+
+Claims: `sub` (id del usuario), `username`, `rol` (RESIDENTE / GUARDIA / ADMIN /
+OTRO), `residente_id`, `staff`, `typ` (access / refresh), `iat`, `exp` y `jti`.
+El rol se resuelve una sola vez al emitir el token; en cada petición
+`TokenFirmadoAuthentication` solo verifica la firma (HMAC-SHA256 con una clave
+derivada de SECRET_KEY), la expiración y la revocación, y entrega un
+`UsuarioToken` construido con los claims: sin sesión, sin `User` y sin las
+consultas a perfil_residente / perfil_seguridad / perfil_administrador.
+
+Revocación: `revocar_usuario` guarda en la caché compartida la fecha de corte del
+usuario (los tokens emitidos antes dejan de valer) y `revocar_jti` invalida un
+refresh ya usado. Cada proceso consulta la fecha de corte de un usuario como
+mucho cada `CACHE_REVOCACION_SEGUNDOS`: una revocación tarda eso en llegar a
+todos los workers, y en el camino normal la verificación no sale del proceso.
+Los usuarios desactivados se revocan automáticamente (post_save de User).
+La caché tiene que ser compartida entre workers (Redis): con una por proceso, una
+revocación o un refresh ya usado solo valen en el worker que los registró
+(`manage.py check --deploy` lo rechaza, api.E002).
+"""
+import base64
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+
+import orjson
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import checks
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .table_cache import compartida
+
+DEFAULTS = {
+    'ACCESS_MINUTOS': 15,
+    'REFRESH_DIAS': 7,
+    'CACHE': 'default',
+    'CACHE_REVOCACION_SEGUNDOS': 5,
+}
+
+ALGORITMO = 'HS256'
+CABECERA = base64.urlsafe_b64encode(orjson.dumps({'alg': ALGORITMO, 'typ': 'JWT'})).rstrip(b'=')
+
+
+def config(clave):
+    return getattr(settings, 'TOKENS', {}).get(clave, DEFAULTS[clave])
+
+
+class TokenInvalido(Exception):
+    """Firma, formato, tipo o vigencia inválidos, o token revocado."""
+
+
+# ========================
+# FIRMA
+# ========================
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b'=')
+
+
+def _de_b64(datos):
+    return base64.urlsafe_b64decode(datos + b'=' * (-len(datos) % 4))
+
+
+def _clave():
+    return hashlib.sha256(b'api.tokens:' + settings.SECRET_KEY.encode()).digest()
+
+
+def _firma(contenido):
+    return _b64(hmac.new(_clave(), contenido, hashlib.sha256).digest())
+
+
+def codificar(claims):
+    contenido = CABECERA + b'.' + _b64(orjson.dumps(claims))
+    return (contenido + b'.' + _firma(contenido)).decode()
+
+
+def decodificar(token, tipo):
+    """Claims de un token vigente de tipo `tipo`, o `TokenInvalido`."""
+    try:
+        contenido, _, firma = token.encode('ascii').rpartition(b'.')
+        cabecera, _, carga = contenido.partition(b'.')
+    except UnicodeEncodeError:
+        raise TokenInvalido('Formato inválido')
+    # Solo se acepta la cabecera exacta que emitimos (nada de alg=none ni otros algoritmos)
+    if cabecera != CABECERA or not carga or not hmac.compare_digest(firma, _firma(contenido)):
+        raise TokenInvalido('Firma inválida')
+    try:
+        claims = orjson.loads(_de_b64(carga))
+    except (ValueError, orjson.JSONDecodeError):
+        raise TokenInvalido('Formato inválido')
+    if claims.get('typ') != tipo:
+        raise TokenInvalido('Tipo de token incorrecto')
+    if claims.get('exp', 0) <= time.time():
+        raise TokenInvalido('Token expirado')
+    if revocado(claims):
+        raise TokenInvalido('Token revocado')
+    return claims
+
+
+# ========================
+# EMISIÓN
+# ========================
+
+def rol_de(user):
+    """(rol, residente_id) de un usuario, con una sola consulta (o ninguna si viene de un token)."""
+    if isinstance(user, UsuarioToken):
+        return user.rol, user.residente_id
+    perfiles = User.objects.select_related(
+        'perfil_residente', 'perfil_seguridad', 'perfil_administrador',
+    ).get(pk=user.pk)
+    if hasattr(perfiles, 'perfil_residente'):
+        return 'RESIDENTE', perfiles.perfil_residente.id
+    if hasattr(perfiles, 'perfil_seguridad'):
+        return 'GUARDIA', None
+    if hasattr(perfiles, 'perfil_administrador'):
+        return 'ADMIN', None
+    return 'OTRO', None
+
+
+def emitir(user):
+    """{'access', 'refresh', 'rol', 'residente_id'} para `user`."""
+    rol, residente_id = rol_de(user)
+    ahora = round(time.time(), 3)
+    base = {
+        'sub': str(user.pk), 'username': user.get_username(), 'rol': rol,
+        'residente_id': residente_id, 'staff': user.is_staff, 'iat': ahora,
+    }
+    return {
+        'access': codificar({**base, 'typ': 'access', 'exp': int(ahora + config('ACCESS_MINUTOS') * 60),
+                             'jti': uuid.uuid4().hex}),
+        'refresh': codificar({**base, 'typ': 'refresh', 'exp': int(ahora + config('REFRESH_DIAS') * 86400),
+                              'jti': uuid.uuid4().hex}),
+        'rol': rol,
+        'residente_id': residente_id,
+    }
+
+
+def refrescar(refresh):
+    """Nuevo par de tokens a partir de un refresh vigente, que queda revocado (rotación)."""
+    claims = decodificar(refresh, 'refresh')
+    user = User.objects.filter(pk=claims['sub'], is_active=True).first()
+    if user is None:
+        raise TokenInvalido('Usuario inactivo')
+    if not revocar_jti(claims):
+        # Otro refresh con el mismo token ganó (add es atómico en el backend compartido)
+        raise TokenInvalido('Token revocado')
+    return emitir(user)
+
+
+# ========================
+# REVOCACIÓN
+# ========================
+
+def _backend():
+    return caches[config('CACHE')]
+
+
+def _clave_usuario(user_id):
+    return f'tokens:revocado:{user_id}'
+
+
+def _clave_jti(jti):
+    return f'tokens:jti:{jti}'
+
+
+_local = {}  # user_id -> (fecha de corte o None, monotonic hasta el que vale la consulta)
+_local_lock = threading.Lock()
+
+
+def _corte(user_id):
+    ahora = time.monotonic()
+    entrada = _local.get(user_id)
+    if entrada is not None and entrada[1] > ahora:
+        return entrada[0]
+    corte = _backend().get(_clave_usuario(user_id))
+    with _local_lock:
+        _local[user_id] = (corte, ahora + config('CACHE_REVOCACION_SEGUNDOS'))
+    return corte
+
+
+def revocado(claims):
+    corte = _corte(claims['sub'])
+    return corte is not None and claims['iat'] <= corte
+
+
+def revocar_usuario(user_id):
+    """Invalida todos los tokens emitidos hasta ahora para el usuario."""
+    corte = round(time.time(), 3)
+    _backend().set(_clave_usuario(str(user_id)), corte, timeout=config('REFRESH_DIAS') * 86400)
+    with _local_lock:
+        _local[str(user_id)] = (corte, time.monotonic() + config('CACHE_REVOCACION_SEGUNDOS'))
+
+
+def revocar_jti(claims):
+    """Marca el token como usado; False si ya lo estaba."""
+    restante = max(int(claims['exp'] - time.time()), 1)
+    return _backend().add(_clave_jti(claims['jti']), 1, timeout=restante)
+
+
+def reiniciar():
+    with _local_lock:
+        _local.clear()
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def verificar_cache(app_configs=None, **kwargs):
+    if compartida(config('CACHE')):
+        return []
+    return [checks.Error(
+        f"TOKENS usa la caché '{config('CACHE')}', que es local a cada proceso",
+        hint='Las revocaciones y los refresh usados no llegarían a los demás workers: configurar REDIS_URL.',
+        id='api.E002',
+    )]
+
+
+def _al_guardar_usuario(sender, instance, created=False, **kwargs):
+    if not created and not instance.is_active:
+        revocar_usuario(instance.pk)
+
+
+def conectar_senales():
+    from django.db.models.signals import post_save
+
+    post_save.connect(_al_guardar_usuario, sender=User, dispatch_uid='tokens_revocar_inactivos')
+
+
+# ========================
+# AUTENTICACIÓN (DRF)
+# ========================
+
+class UsuarioToken:
+    """
+    Usuario autenticado por token: solo los claims, sin consultar la base.
+    `usuario` carga el `User` real para el código que lo necesite.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_superuser = False
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.pk = self.id = int(claims['sub'])
+        self.username = claims['username']
+        self.rol = claims['rol']
+        self.residente_id = claims.get('residente_id')
+        self.is_staff = claims.get('staff', False)
+
+    def get_username(self):
+        return self.username
+
+    def __str__(self):
+        return self.username
+
+    @cached_property
+    def usuario(self):
+        return User.objects.get(pk=self.pk)
+
+
+class TokenFirmadoAuthentication(BaseAuthentication):
+    """`Authorization: Bearer <access>`; sin la cabecera sigue la autenticación por sesión."""
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        partes = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(partes) != 2 or partes[0] != self.keyword:
+            return None
+        try:
+            claims = decodificar(partes[1], 'access')
+        except TokenInvalido as exc:
+            raise AuthenticationFailed(str(exc))
+        return UsuarioToken(claims), claims
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,326 @@
+"""
+Trazas estructuradas por petición (árbol de spans).
+
+Cada petición muestreada se descompone en spans anidados:
+    request -> authentication, queryset, sql (cada query), serializer.field
+    (agregado por campo), render y report.* (generación en report_utils).
+
+Las trazas se escriben como JSON lines en formato OTLP-JSON
+(`resourceSpans` / `scopeSpans` / `spans`), por lo que pueden importarse en
+cualquier colector compatible. La política de muestreo se define por prefijo
+de ruta en `TRACING['SAMPLE_RATES']` y `python manage.py trazas` muestra las
+trazas más lentas.
+
+El flag `sampled` de un `traceparent` entrante solo fuerza el muestreo si la
+petición llega desde `PROXIES_CONFIABLES` (IPs o redes del balanceador o del
+gateway): de cualquier otro cliente, la cabecera solo aporta el trace_id y el
+muestreo lo decide la tasa de la ruta. El archivo rota al superar `MAX_BYTES`
+y se conservan `RESPALDOS` archivos anteriores (`traces.jsonl.1`, `.2`, ...).
+
+Sin traza activa, `span()` devuelve un context manager nulo compartido: el
+costo es una lectura de ContextVar.
+"""
+import contextvars
+import functools
+import ipaddress
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULTS = {
+    'ENABLED': False,
+    'FILE': None,
+    'SAMPLE_RATES': [],
+    'DEFAULT_SAMPLE_RATE': 0.0,
+    'SERVICE_NAME': 'condominio-api',
+    'PROXIES_CONFIABLES': (),  # IPs o redes (CIDR) cuyo traceparent decide el muestreo
+    'MAX_BYTES': 50 * 1024 * 1024,
+    'RESPALDOS': 3,
+}
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_traza_actual = contextvars.ContextVar('traza_actual', default=None)
+_lock_escritura = threading.Lock()
+
+
+def config(clave):
+    return getattr(settings, 'TRACING', {}).get(clave, DEFAULTS[clave])
+
+
+def _nuevo_id(bytes_):
+    return os.urandom(bytes_).hex()
+
+
+class Span:
+    __slots__ = ('traza', 'span_id', 'parent_id', 'name', 'kind', 'start', 'end', 'attributes')
+
+    def __init__(self, traza, name, kind=SPAN_KIND_INTERNAL, attributes=None):
+        self.traza = traza
+        self.span_id = _nuevo_id(8)
+        self.parent_id = None
+        self.name = name
+        self.kind = kind
+        self.start = 0
+        self.end = 0
+        self.attributes = attributes or {}
+
+    def __enter__(self):
+        pila = self.traza.pila
+        self.parent_id = pila[-1].span_id if pila else self.traza.parent_id
+        pila.append(self)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.time_ns()
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        self.traza.pila.pop()
+        self.traza.spans.append(self)
+        return False
+
+    def set(self, clave, valor):
+        self.attributes[clave] = valor
+
+
+class _SpanNulo:
+    """Context manager sin efecto para peticiones no muestreadas."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, clave, valor):
+        pass
+
+
+SPAN_NULO = _SpanNulo()
+
+
+class Traza:
+    def __init__(self, trace_id=None, parent_id=None):
+        self.trace_id = trace_id or _nuevo_id(16)
+        self.parent_id = parent_id
+        self.spans = []
+        self.pila = []
+        # (serializer, campo) -> [inicio_ns, total_ns, llamadas, span_padre]
+        self.campos = {}
+
+    def rama(self):
+        """
+        Traza para otro hilo: mismo trace_id y su propia pila, colgando del span
+        abierto ahora. Se crea en el hilo dueño y se incorpora con `unir`.
+        """
+        return Traza(self.trace_id, self.pila[-1].span_id if self.pila else self.parent_id)
+
+    def unir(self, rama):
+        self.spans.extend(rama.spans)
+        for clave, (inicio, total, llamadas, padre) in rama.campos.items():
+            entrada = self.campos.get(clave)
+            if entrada is None:
+                self.campos[clave] = [inicio, total, llamadas, padre]
+            else:
+                entrada[1] += total
+                entrada[2] += llamadas
+
+    def registrar_campo(self, serializer, campo, inicio, duracion):
+        clave = (serializer, campo)
+        entrada = self.campos.get(clave)
+        if entrada is None:
+            padre = self.pila[-1].span_id if self.pila else self.parent_id
+            self.campos[clave] = [inicio, duracion, 1, padre]
+        else:
+            entrada[1] += duracion
+            entrada[2] += 1
+
+    def spans_de_campos(self):
+        """Un span agregado por campo de serializer (duración = suma de llamadas)."""
+        for (serializer, campo), (inicio, total, llamadas, padre) in self.campos.items():
+            span = Span(self, f'serializer.field {serializer}.{campo}', attributes={
+                'serializer': serializer, 'field': campo, 'calls': llamadas, 'aggregated': True,
+            })
+            span.parent_id = padre
+            span.start = inicio
+            span.end = inicio + total
+            yield span
+
+
+def current_trace():
+    return _traza_actual.get()
+
+
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    traza = _traza_actual.get()
+    if traza is None:
+        return SPAN_NULO
+    return Span(traza, name, kind, attributes)
+
+
+def traced(name):
+    """Decorador: envuelve la función en un span cuando hay traza activa."""
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# ========================
+# MUESTREO
+# ========================
+
+def tasa_muestreo(path):
+    for prefijo, tasa in config('SAMPLE_RATES'):
+        if path.startswith(prefijo):
+            return tasa
+    return config('DEFAULT_SAMPLE_RATE')
+
+
+def parse_traceparent(valor):
+    """W3C traceparent: '00-<trace_id>-<parent_id>-<flags>'. Retorna (trace_id, parent_id, sampled)."""
+    partes = (valor or '').split('-')
+    if len(partes) != 4 or len(partes[1]) != 32 or len(partes[2]) != 16:
+        return None
+    return partes[1], partes[2], partes[3] == '01'
+
+
+@functools.lru_cache(maxsize=8)
+def _redes(proxies):
+    return tuple(ipaddress.ip_network(p, strict=False) for p in proxies)
+
+
+def proxy_confiable(request):
+    try:
+        ip = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(ip in red for red in _redes(tuple(config('PROXIES_CONFIABLES'))))
+
+
+def iniciar(request):
+    """Decide el muestreo y activa la traza. Retorna (traza, token) o (None, None)."""
+    padre = parse_traceparent(request.headers.get('traceparent'))
+    # Un cliente cualquiera no puede forzar el muestreo (y la escritura a disco) con sampled=01
+    if not (padre and padre[2] and proxy_confiable(request)) and random.random() >= tasa_muestreo(request.path):
+        return None, None
+    traza = Traza(trace_id=padre[0], parent_id=padre[1]) if padre else Traza()
+    return traza, _traza_actual.set(traza)
+
+
+def activar(traza):
+    return _traza_actual.set(traza)
+
+
+def finalizar(traza, token):
+    _traza_actual.reset(token)
+    escribir(traza)
+
+
+def medir_query(execute, sql, params, many, context):
+    with span('sql', SPAN_KIND_CLIENT, **{'db.statement': sql[:500], 'db.alias': context['connection'].alias}):
+        return execute(sql, params, many, context)
+
+
+# ========================
+# EXPORTACIÓN (OTLP-JSON)
+# ========================
+
+def _valor_otlp(valor):
+    if isinstance(valor, bool):
+        return {'boolValue': valor}
+    if isinstance(valor, int):
+        return {'intValue': str(valor)}
+    if isinstance(valor, float):
+        return {'doubleValue': valor}
+    return {'stringValue': str(valor)}
+
+
+def span_a_otlp(span):
+    datos = {
+        'traceId': span.traza.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        'startTimeUnixNano': str(span.start),
+        'endTimeUnixNano': str(span.end),
+        'attributes': [{'key': k, 'value': _valor_otlp(v)} for k, v in span.attributes.items()],
+        'status': {'code': 2 if 'error' in span.attributes else 1},
+    }
+    if span.parent_id:
+        datos['parentSpanId'] = span.parent_id
+    return datos
+
+
+def archivo_trazas():
+    return Path(config('FILE') or Path(settings.BASE_DIR) / 'logs' / 'traces.jsonl')
+
+
+def _respaldo(destino, n):
+    return destino.with_name(f'{destino.name}.{n}')
+
+
+def _rotar(destino):
+    """traces.jsonl -> .1 -> .2 ...; el más viejo se descarta."""
+    respaldos = config('RESPALDOS')
+    if not respaldos:
+        destino.unlink(missing_ok=True)
+        return
+    for n in range(respaldos - 1, 0, -1):
+        if _respaldo(destino, n).exists():
+            os.replace(_respaldo(destino, n), _respaldo(destino, n + 1))
+    os.replace(destino, _respaldo(destino, 1))
+
+
+def escribir(traza):
+    spans = [span_a_otlp(s) for s in traza.spans]
+    spans.extend(span_a_otlp(s) for s in traza.spans_de_campos())
+    documento = {'resourceSpans': [{
+        'resource': {'attributes': [
+            {'key': 'service.name', 'value': {'stringValue': config('SERVICE_NAME')}},
+            {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}},
+        ]},
+        'scopeSpans': [{'scope': {'name': 'api.tracing'}, 'spans': spans}],
+    }]}
+    destino = archivo_trazas()
+    linea = json.dumps(documento, ensure_ascii=False, default=str) + '\n'
+    with _lock_escritura:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if destino.stat().st_size + len(linea) > config('MAX_BYTES'):
+                _rotar(destino)
+        except FileNotFoundError:
+            pass  # Primera traza, u otro worker acaba de rotar
+        with destino.open('a', encoding='utf-8') as f:
+            f.write(linea)
+
+
+def leer_trazas(ruta=None):
+    """Lee el archivo (y sus respaldos rotados, del más viejo al actual) y retorna {trace_id: [spans]}."""
+    ruta = Path(ruta) if ruta else archivo_trazas()
+    rutas = [_respaldo(ruta, n) for n in range(config('RESPALDOS'), 0, -1)] + [ruta]
+    trazas = {}
+    for actual in rutas:
+        if not actual.exists():
+            continue
+        with actual.open(encoding='utf-8') as f:
+            for linea in f:
+                if not linea.strip():
+                    continue
+                for recurso in json.loads(linea)['resourceSpans']:
+                    for scope in recurso['scopeSpans']:
+                        for s in scope['spans']:
+                            trazas.setdefault(s['traceId'], []).append(s)
+    return trazas
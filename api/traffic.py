@@ -0,0 +1,199 @@
+"""
+Grabación anonimizada de tráfico real para reproducirlo en benchmarks.
+
+Con `TRAFFIC_RECORDER['ENABLED']`, cada petición se resume en un registro compacto:
+    t  timestamp (epoch, s)        m  método HTTP
+    r  nombre de la ruta           p  path con parámetros no numéricos anonimizados
+    q  filtros (query string)      b  forma del cuerpo JSON (claves y tipos, sin valores)
+    s  status                      d  duración (ms)          z  bytes de respuesta
+
+Los valores de filtros solo se conservan si el parámetro está en
+`TRAFFIC_RECORDER['SAFE_PARAMS']` (enumeraciones como `estado`); el resto,
+ids numéricos incluidos, se reemplaza por un hash. De los formularios multipart
+se guardan las claves, la forma de cada campo y el tamaño de los archivos. Los registros se acumulan en memoria y se vuelcan como
+JSON lines comprimidas: un archivo por proceso (`trafico-AAAAMMDD-<pid>.jsonl.gz`,
+así los workers nunca escriben en el mismo) y un miembro gzip por volcado.
+
+Reproducción: `python manage.py replay_trafico` contra una instancia con un
+dataset sembrado (`--dataset`), reemplazando cada hash por un valor del dataset;
+comparación entre builds: `python manage.py comparar_replay`.
+"""
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULTS = {
+    'ENABLED': False,
+    'DIR': None,
+    'SAMPLE_RATE': 1.0,
+    'SAFE_PARAMS': (),
+    'FLUSH_EVERY': 200,       # registros
+    'FLUSH_INTERVAL': 10,     # segundos
+    'EXCLUDE_PREFIXES': ('/admin/', '/static/', '/media/', '/metrics'),
+}
+
+
+def config(clave):
+    return getattr(settings, 'TRAFFIC_RECORDER', {}).get(clave, DEFAULTS[clave])
+
+
+def anonimizar(valor):
+    digest = hashlib.blake2s(f'{settings.SECRET_KEY}:{valor}'.encode(), digest_size=5).hexdigest()
+    return f'~{digest}'
+
+
+def forma(valor, profundidad=0):
+    """Estructura de un JSON sin sus valores: {'placa': 'str:7', 'items': ['int']}."""
+    if isinstance(valor, dict):
+        return {k: forma(v, profundidad + 1) for k, v in valor.items()} if profundidad < 4 else 'dict'
+    if isinstance(valor, list):
+        return [forma(valor[0], profundidad + 1)] if valor else []
+    if isinstance(valor, bool):
+        return 'bool'
+    if isinstance(valor, (int, float)):
+        return type(valor).__name__
+    if isinstance(valor, str):
+        return f'str:{len(valor)}'
+    return 'null'
+
+
+def forma_cuerpo(request):
+    """
+    Forma del cuerpo JSON. Debe llamarse antes de la vista: DRF consume el
+    stream de la petición y después `request.body` ya no es accesible.
+    """
+    if request.content_type != 'application/json' or not request.body:
+        return None
+    try:
+        return forma(json.loads(request.body))
+    except ValueError:
+        return 'invalid'
+
+
+def forma_multipart(request):
+    """Forma de un formulario multipart (DRF deja POST/FILES parseados tras la vista): {'imagen': 'file:48213'}."""
+    try:
+        campos = {clave: forma(valor) for clave, valor in request.POST.items()}
+        campos.update({clave: f'file:{archivo.size}' for clave, archivo in request.FILES.items()})
+    except Exception:
+        return None
+    return {'_multipart': campos}
+
+
+def path_anonimo(request):
+    path = request.path
+    match = request.resolver_match
+    if match is not None:
+        for valor in map(str, match.kwargs.values()):
+            if not valor.isdigit():
+                path = path.replace(f'/{valor}/', f'/{anonimizar(valor)}/')
+    return path
+
+
+def filtros(request):
+    seguros = set(config('SAFE_PARAMS'))
+    return {
+        clave: (valor if clave in seguros else anonimizar(valor))
+        for clave, valor in request.GET.items()
+    }
+
+
+class Grabador:
+    """Buffer en memoria con volcado periódico a disco (seguro entre hilos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_escritura = threading.Lock()  # Un volcado a la vez por proceso
+        self._buffer = []
+        self._ultimo_volcado = time.monotonic()
+        atexit.register(self.volcar)
+
+    def agregar(self, registro):
+        with self._lock:
+            self._buffer.append(registro)
+            if (len(self._buffer) < config('FLUSH_EVERY')
+                    and time.monotonic() - self._ultimo_volcado < config('FLUSH_INTERVAL')):
+                return
+            pendientes, self._buffer = self._buffer, []
+            self._ultimo_volcado = time.monotonic()
+        self._escribir(pendientes)
+
+    def volcar(self):
+        with self._lock:
+            pendientes, self._buffer = self._buffer, []
+        self._escribir(pendientes)
+
+    def _escribir(self, registros):
+        if not registros:
+            return
+        destino = directorio() / f"trafico-{timezone.now().strftime('%Y%m%d')}-{os.getpid()}.jsonl.gz"
+        contenido = ''.join(json.dumps(r, separators=(',', ':'), ensure_ascii=False) + '\n' for r in registros)
+        # El miembro gzip se arma en memoria y se agrega con un solo write(): un volcado
+        # concurrente nunca intercala sus bytes con los de otro
+        miembro = gzip.compress(contenido.encode('utf-8'))
+        with self._lock_escritura:
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            with destino.open('ab') as f:
+                f.write(miembro)
+
+
+def directorio():
+    return Path(config('DIR') or Path(settings.BASE_DIR) / 'logs' / 'trafico')
+
+
+def debe_grabar(request):
+    if request.path.startswith(tuple(config('EXCLUDE_PREFIXES'))):
+        return False
+    return random.random() < config('SAMPLE_RATE')
+
+
+def registro(request, response, inicio, duracion, cuerpo):
+    match = request.resolver_match
+    if cuerpo is None and (request.content_type or '').startswith('multipart/'):
+        cuerpo = forma_multipart(request)
+    return {
+        't': round(inicio, 3),
+        'm': request.method,
+        'r': match.view_name if match else 'unresolved',
+        'p': path_anonimo(request),
+        'q': filtros(request),
+        'b': cuerpo,
+        's': response.status_code,
+        'd': round(duracion * 1000, 2),
+        'z': len(response.content) if not response.streaming else None,
+    }
+
+
+def archivos(patrones=None):
+    """
+    Rutas o patrones glob (`trafico-20261019-*.jsonl.gz`: todos los workers de un
+    día) a archivos; sin patrones, todos los de `directorio()`.
+    """
+    if not patrones:
+        return sorted(directorio().glob('trafico-*.jsonl.gz'))
+    rutas = []
+    for patron in map(str, patrones):
+        rutas.extend(sorted(glob.glob(patron)) if any(c in patron for c in '*?[') else [patron])
+    return rutas
+
+
+def leer(rutas=None):
+    """Registros de uno o más archivos `.jsonl.gz` (o patrones, ver `archivos`), ordenados por timestamp."""
+    registros = []
+    for ruta in archivos(rutas):
+        with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+            registros.extend(json.loads(linea) for linea in f if linea.strip())
+    return sorted(registros, key=lambda r: r['t'])
+
+
+grabador = Grabador()
@@ -1,16 +1,16 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
 from .views import (
     api_root,
     UserViewSet, UnidadHabitacionalViewSet, AdministradorViewSet, SeguridadViewSet,
     PersonalMantenimientoViewSet, ResidenteViewSet, CuotaViewSet, PagoViewSet,
     AreaComunViewSet, ReservaViewSet, TicketMantenimientoViewSet,
     VisitaViewSet, VehiculoAutorizadoViewSet, AlertaSeguridadViewSet,
-    DashBoardView, ObtenerTokenView, ReporteViewSet
+    DashBoardView, ObtenerTokenView, RefrescarTokenView, RevocarTokenView, ReporteViewSet, BatchView, AutocompletarView, SyncView
 )
+from .viewsets import BulkRouter
 
-# Crear router
-router = DefaultRouter()
+# Crear router (DefaultRouter + PATCH masivo sobre los listados)
+router = BulkRouter()
 
 # Registrar ViewSets
 # Usuarios
@@ -42,6 +42,11 @@ router.register(r'reportes', ReporteViewSet, basename='reportes')
 urlpatterns = [
     path('', api_root, name='api-root'),  # Vista de bienvenida
     path('dashboard/admin/', DashBoardView, name='dashboard-admin'),  # Endpoint para KPIs
-    path('token/', ObtenerTokenView.as_view(), name='token_obtain_pair'), # Endpoint Auth (Simulado)
+    path('token/', ObtenerTokenView.as_view(), name='token_obtain_pair'),  # Tokens firmados (api/tokens.py)
+    path('token/refresh/', RefrescarTokenView.as_view(), name='token_refresh'),
+    path('token/revocar/', RevocarTokenView.as_view(), name='token_revocar'),
+    path('batch/', BatchView.as_view(), name='batch'),  # Varias peticiones en una (api/batch.py)
+    path('sync/', SyncView.as_view(), name='sync'),  # Sincronización delta de la App Móvil (api/sync.py)
+    path('autocompletar/<str:recurso>/', AutocompletarView.as_view(), name='autocompletar'),  # Inputs de ID (api/autocomplete.py)
     path('', include(router.urls)),
 ]
@@ -55,13 +55,16 @@ def api_root(request):
 
 from rest_framework.views import APIView
 from django.db.models import Count, Sum
+from .viewsets import BaseModelViewSet, TrazaViewMixin, condicional
+from .models import AlertaSeguridad, Cuota, Pago, Residente, Seguridad, TicketMantenimiento, UnidadHabitacional
 
-class DashboardAdminView(APIView):
+class DashboardAdminView(TrazaViewMixin, APIView):
     """
     Endpoint agregado para el Dashboard de Administrador.
     Retorna KPIs y datos listos para gráficos.
     """
     
+    @condicional(UnidadHabitacional, Residente, User, Cuota, Pago, AlertaSeguridad, Seguridad, TicketMantenimiento)
     def get(self, request):
         # 1. KPIs Generales
         total_unidades = UnidadHabitacional.objects.count()
@@ -79,7 +82,9 @@ class DashboardAdminView(APIView):
         
         # 3. Alertas de Seguridad
         alertas_activas = AlertaSeguridad.objects.filter(resuelto=False).count()
-        ultimas_alertas = AlertaSeguridad.objects.order_by('-fecha_hora')[:5]
+        ultimas_alertas = AlertaSeguridad.objects.select_related(
+            'residente_relacionado__user', 'atendido_por__user'
+        ).order_by('-fecha_hora')[:5]
         
         # 4. Tickets Mantenimiento
         tickets_abiertos = TicketMantenimiento.objects.filter(estado__in=['abierto', 'en_proceso']).count()
@@ -110,12 +115,68 @@ class DashboardAdminView(APIView):
 DashBoardView = DashboardAdminView.as_view()  # Helper para urls.py
 
 
+from django.conf import settings
+from django.http import JsonResponse
+from . import warmup
+from .metrics import acceso_permitido, registry as metrics_registry
+
+def metrics_view(request):
+    """
+    Exposición de métricas en formato Prometheus (agregadas entre workers).
+    Solo con `Authorization: Bearer <METRICS_TOKEN>` o desde `METRICS_IPS`.
+    """
+    if not acceso_permitido(request):
+        return HttpResponse('No autorizado', status=401, content_type='text/plain')
+    return HttpResponse(
+        metrics_registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def readiness_view(request):
+    """
+    Readiness probe: 503 hasta que terminó el calentamiento del proceso (api.warmup)
+    y 200 después, con la duración de cada etapa. Si nadie lo lanzó (servidor sin
+    precarga), la primera consulta lo inicia en segundo plano.
+    """
+    if not warmup.config('ENABLED'):
+        return JsonResponse({'estado': 'deshabilitado', 'etapas': []})
+    if not warmup.listo():
+        warmup.iniciar_en_segundo_plano()
+        return JsonResponse(warmup.estado(), status=503)
+    return JsonResponse(warmup.estado())
+
+
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from . import profiling
+
+@staff_member_required
+def perfiles_lista(request):
+    """Página de administración con los perfiles recientes (X-Profile)"""
+    return render(request, 'api/perfiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Perfiles de peticiones',
+        'perfiles': profiling.listar(),
+        'cabecera': profiling.config('HEADER'),
+    })
+
+@staff_member_required
+def perfil_descarga(request, perfil_id):
+    ruta = profiling.ruta_archivo(perfil_id)
+    if ruta is None or not ruta.exists():
+        raise Http404('Perfil no encontrado')
+    return FileResponse(ruta.open('rb'), as_attachment=True, filename=ruta.name)
+
+
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from django.contrib.auth.models import User
-from django.db.models import Sum
-from .report_utils import generar_reporte_finanzas_excel, generar_reporte_seguridad_pdf
+from django.db.models import F, Sum
+from . import table_cache
 import uuid
 
 from .models import (
@@ -136,29 +197,40 @@ from .serializers import (
 # USUARIOS
 # ========================
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(BaseModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
+    def perform_bulk_create(self, instancias):
+        """Igual que UserSerializer.create (create_user): la contraseña se guarda hasheada"""
+        for user in instancias:
+            user.set_password(user.password)
+        super().perform_bulk_create(instancias)
 
-class UnidadHabitacionalViewSet(viewsets.ModelViewSet):
+
+class UnidadHabitacionalViewSet(BaseModelViewSet):
     queryset = UnidadHabitacional.objects.all()
     serializer_class = UnidadHabitacionalSerializer
 
 
-class AdministradorViewSet(viewsets.ModelViewSet):
-    queryset = Administrador.objects.all()
+class AdministradorViewSet(BaseModelViewSet):
+    queryset = Administrador.objects.select_related('user')
     serializer_class = AdministradorSerializer
 
 
 from django.contrib.auth import authenticate
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from . import gate_responses, tokens
 
-class ObtenerTokenView(APIView):
+class ObtenerTokenView(TrazaViewMixin, APIView):
     """
-    Vista personalizada para simular la obtención de Token (JWT Style)
-    y devolver la estructura exacta que espera la App Móvil.
+    Emite tokens firmados de acceso y refresco (api/tokens.py) con la
+    estructura exacta que espera la App Móvil. El rol y el residente_id van
+    como claims: las peticiones con el token no vuelven a consultarlos.
     """
+    authentication_classes = []  # Un Bearer vencido no debe impedir volver a iniciar sesión
+
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
@@ -166,40 +238,48 @@ class ObtenerTokenView(APIView):
         user = authenticate(username=username, password=password)
         
         if user:
-            # Determinar Rol y ID específico
-            role = "OTRO"
-            residente_id = None
-            
-            if hasattr(user, 'perfil_residente'):
-                role = "RESIDENTE"
-                residente_id = user.perfil_residente.id
-            elif hasattr(user, 'perfil_seguridad'):
-                role = "GUARDIA"
-            elif hasattr(user, 'perfil_administrador'):
-                role = "ADMIN"
-                
-            # Simular tokens JWT (Strings fijos por ahora para que pase la validación móvil)
-            # En producción real instalar simplejwt
+            emitidos = tokens.emitir(user)
             return Response({
-                "access": f"ey_simulated_access_token_{user.id}",
-                "refresh": f"ey_simulated_refresh_token_{user.id}",
+                "access": emitidos["access"],
+                "refresh": emitidos["refresh"],
                 "user": {
                     "id": user.id,
                     "username": user.username,
                     "email": user.email,
                     "first_name": user.first_name,
                     "last_name": user.last_name,
-                    "role": role,
-                    "residente_id": residente_id
+                    "role": emitidos["rol"],
+                    "residente_id": emitidos["residente_id"]
                 }
             })
         else:
             return Response({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
 
 
-class SeguridadViewSet(viewsets.ModelViewSet):
+class RefrescarTokenView(TrazaViewMixin, APIView):
+    """Nuevo par de tokens a partir del refresh, que queda revocado (rotación)."""
+    authentication_classes = []
+
+    def post(self, request):
+        try:
+            emitidos = tokens.refrescar(str(request.data.get('refresh', '')))
+        except tokens.TokenInvalido as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response({"access": emitidos["access"], "refresh": emitidos["refresh"]})
+
+
+class RevocarTokenView(TrazaViewMixin, APIView):
+    """Cierra todas las sesiones del usuario: invalida sus tokens de acceso y refresco."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        tokens.revocar_usuario(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SeguridadViewSet(BaseModelViewSet):
     """ViewSet para personal de seguridad con acciones personalizadas"""
-    queryset = Seguridad.objects.all()
+    queryset = Seguridad.objects.select_related('user')
     serializer_class = SeguridadSerializer
     
     @action(detail=False, methods=['post'], url_path='validar-facial')
@@ -215,29 +295,10 @@ class SeguridadViewSet(viewsets.ModelViewSet):
         
         try:
             # Buscamos el primer residente "Propietario" de la base de datos para mostrar sus datos
-            residente = Residente.objects.filter(es_propietario=True).first()
-            
-            if not residente:
-                return Response({
-                    'valido': True,
-                    'mensaje': 'Rostro verificado (Demo)',
-                    'es_propietario': True,
-                    'residente': {
-                        'nombre': 'Residente Demo',
-                        'unidad': 'A-101 (Demo)'
-                    }
-                }, status=status.HTTP_200_OK)
-                
-            return Response({
-                'valido': True,
-                'mensaje': 'Rostro verificado exitosamente',
-                'es_propietario': residente.es_propietario,
-                'residente': {
-                    'nombre': residente.user.get_full_name(),
-                    'unidad': str(residente.unidad_habitacional),
-                    'foto_perfil': request.build_absolute_uri(residente.foto_perfil.url) if residente.foto_perfil else None
-                }
-            }, status=status.HTTP_200_OK)
+            residente = Residente.objects.select_related('user', 'unidad_habitacional').filter(
+                es_propietario=True
+            ).first()
+            return Response(gate_responses.respuesta_facial(residente, request.build_absolute_uri), status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response({
@@ -256,23 +317,13 @@ class SeguridadViewSet(viewsets.ModelViewSet):
         placa = serializer.validated_data['placa'].upper().strip()
         
         try:
-            vehiculo = VehiculoAutorizado.objects.get(placa=placa, autorizado=True)
-            # MATCH SPEC MÓVIL EXACTO: "valido": true, "residente": string nombre, "tipo": string
-            return Response({
-                'valido': True,
-                'mensaje': 'Vehículo autorizado',
-                'residente': f"{vehiculo.residente.user.first_name} {vehiculo.residente.user.last_name}",
-                'tipo': vehiculo.tipo_vehiculo or "Vehículo",
-                # Extras útiles pero opcionales para la app
-                'unidad': str(vehiculo.residente.unidad_habitacional)
-            }, status=status.HTTP_200_OK)
+            vehiculo = VehiculoAutorizado.objects.select_related(
+                'residente__user', 'residente__unidad_habitacional'
+            ).get(placa=placa, autorizado=True)
         except VehiculoAutorizado.DoesNotExist:
-            return Response({
-                'valido': False,
-                'mensaje': 'Vehículo no autorizado',
-                'residente': 'Desconocido',
-                'tipo': 'Desconocido'
-            }, status=status.HTTP_200_OK) # La app espera 200 OK con valido: false, no 404
+            vehiculo = None
+        # Mismas respuestas que la aplicación ASGI de portería (api/gate_responses.py)
+        return Response(gate_responses.respuesta_placa(vehiculo), status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['post'], url_path='validar-qr')
     def validar_qr(self, request):
@@ -285,50 +336,36 @@ class SeguridadViewSet(viewsets.ModelViewSet):
         codigo_qr = serializer.validated_data['codigo_qr']
         
         try:
-            visita = Visita.objects.get(codigo_qr_acceso=codigo_qr)
-            
-            # Verificar si ya ingresó
-            if visita.hora_entrada_real:
-                # MATCH SPEC MÓVIL: Las claves deben ser 'autorizado', 'visita' object
-                return Response({
-                    'autorizado': False,
-                    'mensaje': 'QR ya utilizado anteriormente',
-                    'visita': {
-                        'nombre_visitante': visita.nombre_visitante,
-                        'residente_nombre': str(visita.residente.user.get_full_name()),
-                        'unidad': str(visita.residente.unidad_habitacional)
-                    }
-                }, status=status.HTTP_200_OK)
-            
-            # Registrar entrada
-            visita.hora_entrada_real = timezone.now()
-            visita.save()
-            
-            return Response({
-                'autorizado': True,
-                'mensaje': 'Acceso permitido',
-                'visita': {
-                    'nombre_visitante': visita.nombre_visitante,
-                    'residente_nombre': str(visita.residente.user.get_full_name()),
-                    'unidad': str(visita.residente.unidad_habitacional)
-                }
-            }, status=status.HTTP_200_OK)
-            
+            visita = Visita.objects.select_related(
+                'residente__user', 'residente__unidad_habitacional'
+            ).get(codigo_qr_acceso=codigo_qr)
         except Visita.DoesNotExist:
-            return Response({
-                'autorizado': False,
-                'mensaje': 'Código QR inválido o no existe',
-                'visita': None
-            }, status=status.HTTP_200_OK)
+            return Response(gate_responses.respuesta_qr(None, False), status=status.HTTP_200_OK)
+            
+        # Verificar si ya ingresó
+        if visita.hora_entrada_real:
+            return Response(gate_responses.respuesta_qr(visita, False), status=status.HTTP_200_OK)
+        
+        # Registrar entrada solo si sigue libre (mismo criterio que api/gate.py)
+        ahora = timezone.now()
+        actualizadas = Visita.objects.filter(pk=visita.pk, hora_entrada_real__isnull=True).update(
+            hora_entrada_real=ahora, fecha_actualizacion=ahora,
+        )
+        if actualizadas != 1:
+            return Response(gate_responses.respuesta_qr(visita, False), status=status.HTTP_200_OK)
+        table_cache.invalidar(Visita)  # update() no emite post_save
+        visita.hora_entrada_real = ahora
+        
+        return Response(gate_responses.respuesta_qr(visita, True), status=status.HTTP_200_OK)
 
 
-class PersonalMantenimientoViewSet(viewsets.ModelViewSet):
-    queryset = PersonalMantenimiento.objects.all()
+class PersonalMantenimientoViewSet(BaseModelViewSet):
+    queryset = PersonalMantenimiento.objects.select_related('user')
     serializer_class = PersonalMantenimientoSerializer
 
 
-class ResidenteViewSet(viewsets.ModelViewSet):
-    queryset = Residente.objects.all()
+class ResidenteViewSet(BaseModelViewSet):
+    queryset = Residente.objects.select_related('user', 'unidad_habitacional')
     serializer_class = ResidenteSerializer
     
     @action(detail=True, methods=['post'], url_path='actualizar-score-ia')
@@ -366,31 +403,33 @@ class ResidenteViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
 
-from django_filters.rest_framework import DjangoFilterBackend
+from .viewsets import FiltroBackend
 
 # ========================
 # FINANZAS
 # ========================
 
-class CuotaViewSet(viewsets.ModelViewSet):
+class CuotaViewSet(BaseModelViewSet):
     """
     Gestión de cuotas/expensas.
     FILTROS: ?residente={id} & ?estado={pendiente|pagada|vencida}
     """
-    queryset = Cuota.objects.all()
+    queryset = Cuota.objects.select_related('residente__user')
     serializer_class = CuotaSerializer
-    filter_backends = [DjangoFilterBackend]
+    lectura_rapida = True
+    filter_backends = [FiltroBackend]
     filterset_fields = ['residente', 'estado', 'mes']
 
 
-class PagoViewSet(viewsets.ModelViewSet):
+class PagoViewSet(BaseModelViewSet):
     """
     Registro de pagos realizados.
     FILTROS: ?cuota__residente={id} (Para ver todos los pagos de un residente)
     """
-    queryset = Pago.objects.all()
+    queryset = Pago.objects.select_related('cuota__residente__user')
     serializer_class = PagoSerializer
-    filter_backends = [DjangoFilterBackend]
+    lectura_rapida = True
+    filter_backends = [FiltroBackend]
     filterset_fields = ['cuota', 'cuota__residente']
     
     def create(self, request, *args, **kwargs):
@@ -408,26 +447,37 @@ class PagoViewSet(viewsets.ModelViewSet):
         
         return response
 
+    def perform_bulk_create(self, instancias):
+        """Mismo efecto que `create`: marca como pagadas las cuotas cubiertas (en una sola query de update)"""
+        super().perform_bulk_create(instancias)
+        cubiertas = Cuota.objects.filter(
+            pk__in={pago.cuota_id for pago in instancias}
+        ).exclude(estado='pagada').annotate(
+            total_pagado=Sum('pagos__monto_pagado')
+        ).filter(total_pagado__gte=F('monto')).values_list('pk', flat=True)
+        if Cuota.objects.filter(pk__in=list(cubiertas)).update(estado='pagada', fecha_actualizacion=timezone.now()):
+            table_cache.invalidar(Cuota)
+
 
 # ========================
 # ÁREAS COMUNES Y RESERVAS
 # ========================
 
-class AreaComunViewSet(viewsets.ModelViewSet):
+class AreaComunViewSet(BaseModelViewSet):
     queryset = AreaComun.objects.all()
     serializer_class = AreaComunSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [FiltroBackend]
     filterset_fields = ['disponible']
 
 
-class ReservaViewSet(viewsets.ModelViewSet):
+class ReservaViewSet(BaseModelViewSet):
     """
     Gestión de reservas.
     FILTROS: ?residente={id} & ?fecha_reserva={YYYY-MM-DD}
     """
-    queryset = Reserva.objects.all()
+    queryset = Reserva.objects.select_related('area_comun', 'residente__user')
     serializer_class = ReservaSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [FiltroBackend]
     filterset_fields = ['residente', 'area_comun', 'fecha_reserva', 'estado']
 
 
@@ -435,14 +485,14 @@ class ReservaViewSet(viewsets.ModelViewSet):
 # MANTENIMIENTO
 # ========================
 
-class TicketMantenimientoViewSet(viewsets.ModelViewSet):
+class TicketMantenimientoViewSet(BaseModelViewSet):
     """
     Tickets de mantenimiento.
     FILTROS: ?residente={id} & ?estado={abierto|en_proceso...}
     """
-    queryset = TicketMantenimiento.objects.all()
+    queryset = TicketMantenimiento.objects.select_related('residente__user', 'asignado_a__user')
     serializer_class = TicketMantenimientoSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [FiltroBackend]
     filterset_fields = ['residente', 'estado', 'prioridad', 'asignado_a']
 
 
@@ -450,44 +500,52 @@ class TicketMantenimientoViewSet(viewsets.ModelViewSet):
 # SEGURIDAD Y CONTROL DE ACCESO
 # ========================
 
-class VisitaViewSet(viewsets.ModelViewSet):
+class VisitaViewSet(BaseModelViewSet):
     """
     Registro de visitantes y generación de QR.
     Para crear una visita se debe enviar datos del visitante y residente.
     El QR se genera automáticamente en el serializador/modelo.
     """
-    queryset = Visita.objects.all()
+    queryset = Visita.objects.select_related('residente__user')
     serializer_class = VisitaSerializer
-    filter_backends = [DjangoFilterBackend]
+    lectura_rapida = True
+    filter_backends = [FiltroBackend]
     filterset_fields = ['residente', 'fecha_visita']
     
     def perform_create(self, serializer):
         """Generar código QR único antes de guardar"""
         serializer.save(codigo_qr_acceso=str(uuid.uuid4()))
 
+    def perform_bulk_create(self, instancias):
+        for visita in instancias:
+            visita.codigo_qr_acceso = str(uuid.uuid4())
+        super().perform_bulk_create(instancias)
 
-class VehiculoAutorizadoViewSet(viewsets.ModelViewSet):
-    queryset = VehiculoAutorizado.objects.all()
+
+class VehiculoAutorizadoViewSet(BaseModelViewSet):
+    queryset = VehiculoAutorizado.objects.select_related('residente__user')
     serializer_class = VehiculoAutorizadoSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [FiltroBackend]
     filterset_fields = ['residente', 'autorizado', 'placa']
 
 
-class AlertaSeguridadViewSet(viewsets.ModelViewSet):
-    queryset = AlertaSeguridad.objects.all()
+class AlertaSeguridadViewSet(BaseModelViewSet):
+    queryset = AlertaSeguridad.objects.select_related('residente_relacionado__user', 'atendido_por__user')
     serializer_class = AlertaSeguridadSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [FiltroBackend]
     filterset_fields = ['resuelto', 'tipo_alerta', 'residente_relacionado']
 
 
-class ReporteViewSet(viewsets.ViewSet):
+class ReporteViewSet(TrazaViewMixin, viewsets.ViewSet):
     """
     ViewSet para generar reportes administrativos (PDF/Excel).
     """
     
     @action(detail=False, methods=['get'], url_path='finanzas')
+    @condicional(Cuota, Pago, Residente, User, UnidadHabitacional)
     def reporte_finanzas(self, request):
         """Descargar reporte de cuotas y pagos en Excel"""
+        from .report_utils import generar_reporte_finanzas_excel  # openpyxl solo al usarse (api.startup)
         buffer = generar_reporte_finanzas_excel()
         response = HttpResponse(
             buffer,
@@ -497,9 +555,72 @@ class ReporteViewSet(viewsets.ViewSet):
         return response
 
     @action(detail=False, methods=['get'], url_path='seguridad')
+    @condicional(AlertaSeguridad, Residente, User)
     def reporte_seguridad(self, request):
         """Descargar reporte de alertas de seguridad recientes en PDF"""
+        from .report_utils import generar_reporte_seguridad_pdf  # reportlab solo al usarse (api.startup)
         buffer = generar_reporte_seguridad_pdf()
         response = HttpResponse(buffer, content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="reporte_seguridad.pdf"'
         return response
+
+
+from . import batch
+
+class BatchView(TrazaViewMixin, APIView):
+    """
+    Varias peticiones a la API en un solo POST (ver api.batch).
+    Pensado para la pantalla de inicio de la App Móvil: residente, cuotas,
+    reservas, visitas, tickets y vehículos en un solo viaje.
+    """
+    def post(self, request):
+        try:
+            especificaciones = batch.normalizar(request.data)
+        except batch.BatchInvalido as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        respuestas, escribio = batch.ejecutar(request._request, especificaciones)
+        # Sin escrituras no hace falta leer del primario en las próximas peticiones
+        request._request._db_solo_lectura = not escribio
+        return Response({'respuestas': respuestas})
+
+
+from . import autocomplete
+
+class AutocompletarView(TrazaViewMixin, APIView):
+    """
+    Búsqueda paginada para los inputs de ID de formularios y filtros (ver api.autocomplete).
+    GET /api/autocompletar/<recurso>/?q=<texto>&pagina=<n>
+    """
+    def get(self, request, recurso):
+        if recurso not in autocomplete.BUSCADORES:
+            return Response({'detail': 'Recurso sin autocompletado.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            pagina = max(int(request.query_params.get('pagina', 1)), 1)
+        except ValueError:
+            pagina = 1
+        resultados, siguiente = autocomplete.buscar(recurso, request.query_params.get('q', ''), pagina)
+        return Response({'resultados': resultados, 'pagina': pagina, 'siguiente': siguiente})
+
+
+from rest_framework.permissions import IsAuthenticated
+from . import db_routing, sync
+
+class SyncView(TrazaViewMixin, APIView):
+    """
+    Sincronización delta de la App Móvil (ver api.sync).
+    GET /api/sync/?since=<cursor>: solo las filas que cambiaron y los ids borrados.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # Siempre del primario: una réplica atrasada haría que el cursor saltee filas
+        with db_routing.usar_carga('escritura'):
+            try:
+                datos = sync.sincronizar(request.user, request.query_params.get('since'))
+            except sync.SinPerfil:
+                return Response({'detail': 'Solo residentes y guardias sincronizan.'}, status=status.HTTP_403_FORBIDDEN)
+            except sync.CursorInvalido:
+                return Response({'detail': 'Cursor inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+            except sync.CursorVencido:
+                return Response({'detail': 'Cursor vencido: sincronizar desde cero (sin since).'}, status=status.HTTP_410_GONE)
+        return Response(datos)
@@ -0,0 +1,244 @@
+"""
+Clases base y mixins compartidos por los ViewSets de api/views.py.
+"""
+import functools
+from contextlib import nullcontext
+
+from django import forms
+from django.db import transaction
+from django.utils import timezone
+from django_filters import ModelChoiceFilter
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet
+from rest_framework import status, viewsets
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter, Route
+
+from . import autocomplete, bulk, db_routing, fast_serialization, table_cache, tracing
+from .models import Sincronizable
+from .serializers import seleccion_campos
+
+
+class TrazaViewMixin:
+    """Spans de autenticación y construcción del queryset (ver api.tracing)."""
+
+    def perform_authentication(self, request):
+        with tracing.span('authentication'):
+            super().perform_authentication(request)
+
+    def filter_queryset(self, queryset):
+        with tracing.span('queryset', view=type(self).__name__):
+            return super().filter_queryset(queryset)
+
+
+def respuesta_versionada(vista, request, tablas, generar, cachear=False):
+    """
+    Resuelve una lectura con `api.table_cache`: 304 si el cliente tiene la
+    versión vigente, datos de la caché si `cachear`, o `generar()` en otro caso.
+
+    La versión es la de las generaciones actuales; una réplica atrasada todavía
+    puede devolver filas anteriores. Por eso lo que se guarda en la caché se
+    genera leyendo del primario, y una respuesta leída de la réplica sale sin
+    ETag ni Last-Modified.
+    """
+    __tracebackhide__ = True  # Las queries se atribuyen a la vista, no a este wrapper
+    cachear = cachear and table_cache.config('ENABLED')
+    if not (cachear or table_cache.config('CONDITIONAL')):
+        return generar()
+
+    nombre = type(vista).__name__
+    usuario = request.user.pk if getattr(vista, 'cache_por_usuario', False) else None
+    version = table_cache.Version(nombre, request, tablas, usuario)
+    if table_cache.config('CONDITIONAL') and version.no_modificada(request):
+        return version.respuesta_304()
+
+    replica = db_routing.lee_de_replica()
+    datos = table_cache.obtener(version.clave, nombre) if cachear else table_cache.FALTA
+    if datos is not table_cache.FALTA:
+        response = Response(datos)
+    elif cachear:
+        with db_routing.usar_carga('escritura') if replica else nullcontext():
+            response = generar()
+        if response.status_code == 200:
+            table_cache.guardar(version.clave, response.data)
+    else:
+        response = generar()
+    if table_cache.config('CONDITIONAL') and response.status_code == 200 and (cachear or not replica):
+        version.aplicar(response)
+    return response
+
+
+def condicional(*modelos):
+    """
+    ETag / Last-Modified / 304 para vistas fuera de los ModelViewSets
+    (dashboard, reportes): `modelos` son las tablas que lee la vista.
+    """
+    tablas = sorted({m._meta.db_table for m in modelos})
+
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            __tracebackhide__ = True
+            generar = functools.partial(metodo, self, request, *args, **kwargs)
+            return respuesta_versionada(self, request, tablas, generar)
+        return envoltura
+    return decorador
+
+
+class CacheViewMixin:
+    """
+    Cachea `list` y `retrieve` en `api.table_cache`, con clave por ruta, filtros y
+    generación de las tablas del queryset, y responde 304 a GETs condicionales.
+    Las vistas cuyo resultado depende del usuario deben declarar
+    `cache_por_usuario = True`; `cache_tablas_extra` suma tablas que el
+    serializer lee fuera del queryset.
+    """
+    cache_habilitado = True
+    cache_por_usuario = False
+    cache_tablas_extra = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._lectura_versionada(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._lectura_versionada(super().retrieve, request, *args, **kwargs)
+
+    def _lectura_versionada(self, vista, request, *args, **kwargs):
+        __tracebackhide__ = True
+        tablas = sorted({*table_cache.tablas_de(self.get_queryset()), *self.cache_tablas_extra})
+        generar = functools.partial(vista, request, *args, **kwargs)
+        return respuesta_versionada(self, request, tablas, generar, cachear=self.cache_habilitado)
+
+
+class CamposDinamicosViewMixin:
+    """
+    Ajusta el plan de la query a `?fields=` / `?expand=` (ver
+    `api.serializers.CamposDinamicosMixin`): solo se hace JOIN de lo que se devuelve.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if seleccion_campos(self.request) is None:
+            return queryset
+        relaciones = self.get_serializer().relaciones()
+        queryset = queryset.select_related(None)
+        return queryset.select_related(*relaciones) if relaciones else queryset
+
+
+class LecturaRapidaViewMixin:
+    """
+    `list` por el camino rápido de `api.fast_serialization` (values_list + conversores
+    precompilados) en las vistas que declaran `lectura_rapida = True`.
+    """
+    lectura_rapida = False
+
+    def list(self, request, *args, **kwargs):
+        if not (self.lectura_rapida and fast_serialization.config('ENABLED')):
+            return super().list(request, *args, **kwargs)
+        plan = fast_serialization.plan_para(self.get_serializer())
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        return Response(plan.filas(self.filter_queryset(self.get_queryset())))
+
+
+class BulkViewMixin:
+    """
+    Alta y actualización masivas (ver `api.bulk`): POST con una lista crea en lote
+    y PATCH sobre el listado actualiza parcialmente en lote. Las vistas con lógica
+    propia al guardar la replican en `perform_bulk_create` / `perform_bulk_update`.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer()
+        try:
+            validados = bulk.validar(serializer, request.data)
+        except bulk.LoteInvalido as exc:
+            return Response({'errores': exc.errores}, status=status.HTTP_400_BAD_REQUEST)
+        modelo = serializer.Meta.model
+        instancias = [modelo(**datos) for datos in validados]
+        with transaction.atomic():
+            self.perform_bulk_create(instancias)
+        return Response({'creados': len(instancias), 'ids': [i.pk for i in instancias]}, status=status.HTTP_201_CREATED)
+
+    def bulk_partial_update(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        try:
+            instancias = bulk.instancias_para_actualizar(self.get_queryset(), request.data)
+            validados = bulk.validar(serializer, request.data, instancias)
+        except bulk.LoteInvalido as exc:
+            return Response({'errores': exc.errores}, status=status.HTTP_400_BAD_REQUEST)
+        campos = set()
+        for instancia, datos in zip(instancias, validados):
+            for campo, valor in datos.items():
+                setattr(instancia, campo, valor)
+            campos.update(datos)
+        if campos:
+            with transaction.atomic():
+                self.perform_bulk_update(instancias, sorted(campos))
+        return Response({'actualizados': len(instancias)})
+
+    def perform_bulk_create(self, instancias):
+        modelo = type(instancias[0])
+        modelo.objects.bulk_create(instancias, batch_size=bulk.config('BATCH_SIZE'))
+        table_cache.invalidar(modelo)  # bulk_create no emite post_save
+
+    def perform_bulk_update(self, instancias, campos):
+        modelo = type(instancias[0])
+        if issubclass(modelo, Sincronizable):
+            # bulk_update no llama a pre_save: auto_now no se aplica solo
+            ahora = timezone.now()
+            for instancia in instancias:
+                instancia.fecha_actualizacion = ahora
+            campos = [*campos, 'fecha_actualizacion']
+        modelo.objects.bulk_update(instancias, campos, batch_size=bulk.config('BATCH_SIZE'))
+        table_cache.invalidar(modelo)
+
+
+class AutocompletarInput(forms.TextInput):
+    """Widget de ID con autocompletado (api.autocomplete) para los filtros por FK."""
+    template_name = 'api/autocompletar/widget.html'
+
+    def __init__(self, recurso, attrs=None):
+        super().__init__(attrs)
+        self.recurso = recurso
+
+    def get_context(self, name, value, attrs):
+        contexto = super().get_context(name, value, attrs)
+        contexto['widget']['recurso'] = self.recurso
+        return contexto
+
+
+class FilterSetAcotado(FilterSet):
+    """
+    FilterSet cuyos filtros por FK se dibujan como input de ID en el formulario
+    de filtros de la API navegable, en lugar de un <select> con toda la tabla.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for filtro in self.filters.values():
+            if isinstance(filtro, ModelChoiceFilter) and filtro.queryset is not None:
+                filtro.extra['widget'] = AutocompletarInput(autocomplete.recurso(filtro.queryset.model))
+
+
+class FiltroBackend(DjangoFilterBackend):
+    """DjangoFilterBackend con `FilterSetAcotado` para los `filterset_fields`."""
+    filterset_base = FilterSetAcotado
+
+
+class BulkRouter(DefaultRouter):
+    """DefaultRouter que además enruta PATCH sobre el listado a `bulk_partial_update`."""
+    routes = [
+        Route(
+            url=ruta.url,
+            mapping={**ruta.mapping, 'patch': 'bulk_partial_update'},
+            name=ruta.name, detail=ruta.detail, initkwargs=ruta.initkwargs,
+        ) if isinstance(ruta, Route) and ruta.mapping.get('get') == 'list' else ruta
+        for ruta in DefaultRouter.routes
+    ]
+
+
+class BaseModelViewSet(TrazaViewMixin, CamposDinamicosViewMixin, CacheViewMixin, LecturaRapidaViewMixin,
+                       BulkViewMixin, viewsets.ModelViewSet):
+    """ModelViewSet base de la API (instrumentado, con caché de lectura y campos a pedido)."""
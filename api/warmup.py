@@ -0,0 +1,209 @@
+"""
+Calentamiento después de un deploy: datos calientes en la base, la caché y el proceso.
+
+Tras cada deploy las primeras validaciones de portería y cargas del dashboard
+encuentran frías la caché de respuestas, los buffers de la base de datos (páginas
+de tablas e índices) y las estructuras en memoria del proceso. Cada etapa ejecuta
+las mismas lecturas que el tráfico real, sobre el mismo alias de base de datos
+(ver `api.db_routing`):
+
+    conexiones     abre una conexión a cada alias de DATABASES
+    placas         vehículos autorizados con residente y unidad (alias del gate)
+    visitas_qr     QR de las visitas esperadas hoy (alias del gate)
+    areas_comunes  GET /api/areas-comunes/ -> queda en `api.table_cache`
+    esquema        esquema OpenAPI precalculado (`api.schema`)
+    dashboard      GET /api/dashboard/admin/ (KPIs)
+
+Dónde corre:
+    - gunicorn: en el master, antes del primer fork (`api.startup.precargar`). Los
+      workers heredan el proceso ya caliente y nacen listos.
+    - `python manage.py warmup`: desde el script de deploy, reporta cada etapa.
+    - Cualquier otro servidor: el primer GET /ready lo lanza en segundo plano.
+
+GET /ready responde 503 hasta que el calentamiento del proceso terminó y 200
+después, con la duración de cada etapa. Una etapa que falla queda registrada
+con su error pero no bloquea el resto.
+"""
+import io
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import resolve
+from django.utils import timezone
+
+from . import db_routing
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+}
+
+
+def config(clave):
+    return getattr(settings, 'WARMUP', {}).get(clave, DEFAULTS[clave])
+
+
+class Etapa:
+    def __init__(self, nombre, funcion, carga):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.carga = carga
+
+
+ETAPAS = []
+
+
+def etapa(nombre, carga='lectura'):
+    """Registra `funcion() -> detalle` ejecutada con la carga de BD `carga`."""
+    def decorador(funcion):
+        ETAPAS.append(Etapa(nombre, funcion, carga))
+        return funcion
+    return decorador
+
+
+def _get(ruta):
+    """GET interno a la vista de `ruta` (sin middleware), renderizado como JSON."""
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': ruta,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(b''),
+    }
+    request = WSGIRequest(environ)
+    request.user = AnonymousUser()
+    coincidencia = resolve(ruta)
+    response = coincidencia.func(request, *coincidencia.args, **coincidencia.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        raise RuntimeError(f'{ruta} respondió {response.status_code}')
+    return f'{len(response.content)} bytes'
+
+
+# ========================
+# ETAPAS
+# ========================
+
+@etapa('conexiones', carga=None)
+def _conexiones():
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    return f'{len(list(connections))} alias'
+
+
+@etapa('placas', carga='gate')
+def _placas():
+    from .models import VehiculoAutorizado
+
+    filas = VehiculoAutorizado.objects.filter(autorizado=True).order_by('placa').values_list(
+        'placa', 'tipo_vehiculo', 'residente__user__first_name', 'residente__user__last_name',
+        'residente__unidad_habitacional__torre', 'residente__unidad_habitacional__numero',
+    )
+    return f'{sum(1 for _ in filas.iterator(chunk_size=2000))} placas'
+
+
+@etapa('visitas_qr', carga='gate')
+def _visitas_qr():
+    from .models import Visita
+
+    filas = Visita.objects.filter(
+        fecha_visita=timezone.localdate(), codigo_qr_acceso__isnull=False,
+    ).order_by('codigo_qr_acceso').values_list(
+        'codigo_qr_acceso', 'nombre_visitante', 'hora_entrada_real', 'residente__user__first_name',
+        'residente__user__last_name', 'residente__unidad_habitacional__torre',
+        'residente__unidad_habitacional__numero',
+    )
+    return f'{sum(1 for _ in filas.iterator(chunk_size=2000))} visitas de hoy'
+
+
+@etapa('areas_comunes')
+def _areas_comunes():
+    return _get('/api/areas-comunes/')
+
+
+@etapa('esquema', carga=None)
+def _esquema():
+    from . import schema
+
+    return f"{len(schema.variantes()['json'].contenido)} bytes"
+
+
+@etapa('dashboard')
+def _dashboard():
+    return _get('/api/dashboard/admin/')
+
+
+# ========================
+# EJECUCIÓN Y ESTADO
+# ========================
+
+_lock = threading.Lock()
+_estado = {'estado': 'pendiente', 'etapas': []}
+
+
+def estado():
+    with _lock:
+        return {'estado': _estado['estado'], 'etapas': list(_estado['etapas'])}
+
+
+def listo():
+    return _estado['estado'] == 'listo'
+
+
+def ejecutar(nombres=None):
+    """Ejecuta las etapas (todas o `nombres`) en orden; retorna el resultado de cada una."""
+    with _lock:
+        _estado.update(estado='en_curso', etapas=[])
+    for e in ETAPAS:
+        if nombres and e.nombre not in nombres:
+            continue
+        inicio = time.perf_counter()
+        resultado = {'etapa': e.nombre}
+        try:
+            if e.carga is None:
+                resultado['detalle'] = e.funcion()
+            else:
+                with db_routing.usar_carga(e.carga):
+                    resultado['detalle'] = e.funcion()
+        except Exception as exc:
+            logger.exception('Falló la etapa de calentamiento %s', e.nombre)
+            resultado['error'] = f'{type(exc).__name__}: {exc}'
+        resultado['ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+        with _lock:
+            _estado['etapas'].append(resultado)
+    with _lock:
+        _estado['estado'] = 'listo'
+        return list(_estado['etapas'])
+
+
+def _en_hilo():
+    try:
+        ejecutar()
+    finally:
+        connections.close_all()  # Conexiones de este hilo
+
+
+def iniciar_en_segundo_plano():
+    """Lanza el calentamiento en un hilo si el proceso todavía no lo hizo."""
+    with _lock:
+        if _estado['estado'] != 'pendiente':
+            return False
+        _estado['estado'] = 'en_curso'
+    threading.Thread(target=_en_hilo, name='warmup', daemon=True).start()
+    return True
+
+
+def reiniciar():
+    with _lock:
+        _estado.update(estado='pendiente', etapas=[])
@@ -0,0 +1,20 @@
+"""
+ASGI de portería: solo las validaciones de placa, QR y rostro (api/gate.py).
+
+    uvicorn config.asgi_gate:application --port 8001 --workers 2
+
+El resto del proyecto se sigue sirviendo con config.wsgi / config.asgi.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+django.setup(set_prefix=False)
+
+from api.gate import GateApp  # noqa: E402
+
+# Solo este proceso crea la aplicación (y conecta la medición de queries del gate)
+application = GateApp()
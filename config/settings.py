@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryInspectorMiddleware',  # N+1 / queries lentas (solo dev y staging)
+    'api.middleware.PerformanceMetricsMiddleware',  # Métricas + Server-Timing (envuelve todo el stack)
+    'api.middleware.LoadSheddingMiddleware',  # Prioridad gate > app > analítica > exportaciones (api/load_shedding.py)
+    'api.middleware.TracingMiddleware',  # Trazas con árbol de spans (muestreadas)
+    'api.middleware.CompressionMiddleware',  # brotli/gzip sobre JSON y MessagePack (api/compression.py)
+    'api.middleware.MemoryProfilerMiddleware',  # tracemalloc en reportes/listados (solo staging)
+    'api.middleware.TrafficRecorderMiddleware',  # Grabación anonimizada de tráfico (opt-in)
+    'api.middleware.DatabaseRoutingMiddleware',  # Primario/réplica por carga (api/db_routing.py)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -54,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilerMiddleware',  # Perfil bajo demanda con cabecera X-Profile (solo admins)
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -90,15 +100,57 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# DB_PERFIL=local: SQLite en un archivo, sin PostgreSQL (desarrollo y la suite de tests en CI).
+# Los cuatro alias apuntan al mismo archivo; restaurar datos con: python manage.py snapshot_datos restaurar <nombre>
+DB_PERFIL = os.environ.get('DB_PERFIL', 'postgres')
+
+
+def _base_datos(host, statement_timeout_ms, conn_max_age, mirror=None):
+    """
+    Un alias por carga: mismas credenciales, pero conexiones persistentes y
+    statement_timeout propios (ver api/db_routing.py).
+    """
+    if DB_PERFIL == 'local':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.local.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,  # Espera de locks entre alias (segundos)
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            },
+            'TEST': {'MIRROR': mirror},
+        }
+    return {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME', 'smart_condo_db'),
         'USER': os.environ.get('DB_USER', 'postgres'),
         'PASSWORD': os.environ.get('DB_PASSWORD', '0808'),
-        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'HOST': host,
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'options': f'-c statement_timeout={statement_timeout_ms}'},
+        'TEST': {'MIRROR': mirror},
     }
+
+
+DB_HOST = os.environ.get('DB_HOST', 'localhost')
+# Sin réplica configurada, las lecturas usan el primario (con sus propios timeouts)
+DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST', DB_HOST)
+
+DATABASES = {
+    'default': _base_datos(DB_HOST, 10_000, 60),                                # Escrituras y API general
+    'gate': _base_datos(DB_HOST, 2_000, 600, mirror='default'),                 # Validación de placas/QR en portería
+    'replica': _base_datos(DB_REPLICA_HOST, 15_000, 60, mirror='default'),      # Listados, detalles y dashboard
+    'reportes': _base_datos(DB_REPLICA_HOST, 120_000, 0, mirror='default'),     # Exportaciones Excel/PDF
+}
+
+DATABASE_ROUTERS = ['api.db_routing.PrimaryReplicaRouter']
+
+# Lecturas después de escribir: segundos que un cliente lee del primario tras un POST/PUT/PATCH/DELETE
+DB_ROUTING = {
+    'ENABLED': os.environ.get('DB_ROUTING', '1') == '1',
+    'STICKY_SECONDS': 5,
 }
 
 # Password validation
@@ -146,7 +198,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # AutoSchema de drf-spectacular con operationId propios para el PATCH masivo (se importa al generar el esquema)
+    'DEFAULT_SCHEMA_CLASS': 'api.openapi.AutoSchema',
+    # Bearer firmado (App Móvil, sin consultas por petición); sesión para el panel y la API navegable
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.tokens.TokenFirmadoAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    # JSON con orjson; MessagePack (App Móvil) solo si la librería está instalada
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.JSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'api.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.JSONParser',
+        *(['api.renderers.MessagePackParser'] if find_spec('msgpack') else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # Spectacular Settings - Configuración de Swagger/ReDoc
@@ -159,3 +230,162 @@ SPECTACULAR_SETTINGS = {
     'SCHEMA_PATH_PREFIX': '/api/',
 }
 
+
+# Métricas de rendimiento (api/metrics.py, expuestas en /metrics)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# Con gunicorn: directorio compartido donde cada worker vuelca su snapshot (<pid>.json)
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5  # segundos entre volcados de cada worker
+# /metrics responde con el Bearer token o desde estas IPs/redes del scraper (sin ninguno: solo con DEBUG)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_IPS = [ip for ip in os.environ.get('METRICS_IPS', '').split(',') if ip]
+
+# Inspector de queries: N+1 y queries lentas con EXPLAIN (api/query_inspector.py)
+# Apagado salvo QUERY_INSPECTOR=1 (desarrollo/staging): corre EXPLAIN y escribe a disco.
+# Resumen: python manage.py reporte_queries
+QUERY_INSPECTOR = {
+    'ENABLED': os.environ.get('QUERY_INSPECTOR', '0') == '1',
+    'N_PLUS_ONE_THRESHOLD': 5,   # repeticiones de la misma forma de query en una petición
+    'SLOW_QUERY_MS': 100,
+    'LOG_FILE': BASE_DIR / 'logs' / 'query_inspector.jsonl',
+}
+
+# Profiler bajo demanda (api/profiling.py). Perfiles listados en /admin/perfiles/
+PROFILER = {
+    'HEADER': 'X-Profile',  # valores: sampling | cprofile
+    'DIR': BASE_DIR / 'profiles',
+    'INTERVAL': 0.005,
+    'KEEP': 200,
+}
+
+# Trazas por petición en formato OTLP-JSON (api/tracing.py). CLI: python manage.py trazas
+TRACING = {
+    'ENABLED': os.environ.get('TRACING_ENABLED', '1') == '1',
+    'FILE': BASE_DIR / 'logs' / 'traces.jsonl',
+    # Política de muestreo por prefijo de ruta (el primero que coincide gana)
+    'SAMPLE_RATES': [
+        ('/api/seguridad/validar-', 0.01),  # Validaciones de portería: alto volumen
+        ('/api/reportes/', 1.0),
+        ('/api/dashboard/', 0.25),
+    ],
+    'DEFAULT_SAMPLE_RATE': 0.05,
+    'SERVICE_NAME': 'condominio-api',
+    # Solo estos clientes (balanceador / gateway) pueden forzar el muestreo con traceparent sampled=01
+    'PROXIES_CONFIABLES': [p for p in os.environ.get('TRACING_PROXIES', '').split(',') if p],
+    'MAX_BYTES': int(os.environ.get('TRACING_MAX_BYTES', 50 * 1024 * 1024)),
+    'RESPALDOS': 3,
+}
+
+# Perfil de memoria con tracemalloc (api/memory_profiling.py). Costoso: solo staging.
+MEMORY_PROFILER = {
+    'ENABLED': os.environ.get('MEMORY_PROFILER', '0') == '1',
+    'ACTIONS': ('list', 'reporte_finanzas', 'reporte_seguridad'),
+    'HEADER': 'X-Memory-Profile',  # Solo se mide lo que un admin pide con esta cabecera
+    'FRAMES': 10,
+    'TOP': 10,
+    'LOG_FILE': BASE_DIR / 'logs' / 'memoria.jsonl',
+}
+
+# Grabación de tráfico para replay (api/traffic.py). CLI: replay_trafico / comparar_replay
+TRAFFIC_RECORDER = {
+    'ENABLED': os.environ.get('TRAFFIC_RECORDER', '0') == '1',
+    'DIR': BASE_DIR / 'logs' / 'trafico',
+    'SAMPLE_RATE': 1.0,
+    # Filtros cuyo valor se conserva tal cual (enumeraciones sin datos personales)
+    'SAFE_PARAMS': ('estado', 'prioridad', 'tipo_alerta', 'resuelto', 'disponible', 'autorizado', 'fecha_reserva', 'fecha_visita', 'format'),
+}
+
+# Caché compartida: Redis si REDIS_URL está definido; si no, memoria local (solo desarrollo)
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'condominio',
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'condominio',
+    },
+}
+
+# Caché de respuestas versionada por tabla (api/table_cache.py). Las generaciones de cada
+# tabla tienen que ser compartidas entre workers: sin REDIS_URL queda apagada (check api.W001)
+_table_cache = os.environ.get('TABLE_CACHE', '1' if REDIS_URL else '0') == '1'
+TABLE_CACHE = {
+    'ENABLED': _table_cache,
+    'CONDITIONAL': _table_cache,  # ETag / Last-Modified / 304 en listados, detalles, dashboard y reportes
+    'BACKEND': 'default',
+    'TTL': 300,
+    'LOCAL_MAX_ENTRIES': 512,
+}
+
+# Listados de solo lectura vía values_list (api/fast_serialization.py), en vistas con `lectura_rapida = True`
+FAST_SERIALIZATION = {
+    'ENABLED': os.environ.get('FAST_SERIALIZATION', '1') == '1',
+}
+
+# POST /api/batch/: varias peticiones en una, lecturas en paralelo (api/batch.py)
+BATCH = {
+    'MAX_REQUESTS': 20,
+    'PARALLEL_WORKERS': int(os.environ.get('BATCH_WORKERS', '4')),
+}
+
+# GET /api/sync/?since=<cursor>: sincronización delta de la App Móvil (api/sync.py)
+SYNC = {
+    'PAGE_SIZE': 500,
+    'MARGEN_SEGUNDOS': 2,
+    'RETENCION_DIAS': 90,  # tombstones; purgar con: python manage.py purgar_eliminaciones
+}
+
+# Compresión de respuestas JSON/MessagePack (api/compression.py). brotli si está instalado, si no gzip
+COMPRESSION = {
+    'ENABLED': os.environ.get('COMPRESSION', '1') == '1',
+    'UMBRAL_BYTES': 1024,
+}
+
+# /api/schema/ precalculado (api/schema.py). Generar en el build: python manage.py esquema_openapi
+ESQUEMA = {
+    'DIRECTORIO': BASE_DIR / 'openapi',
+    'USAR_ARCHIVOS': True,
+}
+
+# Calentamiento post-deploy (api/warmup.py): en el master de gunicorn antes del fork,
+# con `python manage.py warmup`, o lanzado por el primer GET /ready
+WARMUP = {
+    'ENABLED': os.environ.get('WARMUP', '1') == '1',
+}
+
+# Snapshots binarios de datos sembrados (api/snapshots.py): python manage.py snapshot_datos.
+# Con DATASETS, la suite y los benchmarks restauran sus datasets desde aquí en vez de sembrarlos
+SNAPSHOTS = {
+    'DIRECTORIO': BASE_DIR / 'snapshots',
+    'DATASETS': os.environ.get('SNAPSHOTS_DATASETS', '1') == '1',
+}
+
+# Tokens firmados de la App Móvil (api/tokens.py). Una revocación tarda hasta
+# CACHE_REVOCACION_SEGUNDOS en llegar a todos los workers
+TOKENS = {
+    'ACCESS_MINUTOS': int(os.environ.get('TOKEN_ACCESS_MINUTOS', '15')),
+    'REFRESH_DIAS': int(os.environ.get('TOKEN_REFRESH_DIAS', '7')),
+    'CACHE': 'default',
+    'CACHE_REVOCACION_SEGUNDOS': 5,
+}
+
+# Descarte de carga por prioridad (api/load_shedding.py). Límites por proceso
+LOAD_SHEDDING = {
+    'ENABLED': os.environ.get('LOAD_SHEDDING', '1') == '1',
+    'NIVELES': {
+        'gate': {'CONCURRENCIA': None, 'TASA': 10, 'RAFAGA': 30},  # Por cámara / lector
+        'app': {'CONCURRENCIA': 32, 'TASA': 20, 'RAFAGA': 100},
+        'analitica': {'CONCURRENCIA': 4, 'TASA': 1, 'RAFAGA': 10},
+        'exportacion': {'CONCURRENCIA': 2, 'TASA': 0.1, 'RAFAGA': 3},
+    },
+    'LATENCIA_GATE_MS': int(os.environ.get('LOAD_SHEDDING_LATENCIA_GATE_MS', '150')),
+    'SACRIFICABLES': ('analitica', 'exportacion'),
+}
+
+# Aplicación ASGI de portería (api/gate.py): uvicorn config.asgi_gate:application
+GATE_APP = {
+    'PREFIJO': '/api/seguridad/',
+    'MAX_CUERPO_BYTES': 10 * 1024 * 1024,
+}
@@ -16,18 +16,22 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
-from api.views import api_root  # Importamos la vista de bienvenida
+from api.startup import vista_diferida
+from api.views import api_root, metrics_view, readiness_view, perfiles_lista, perfil_descarga  # Importamos la vista de bienvenida
 
 urlpatterns = [
     path('', api_root, name='root'),  # Ruta raíz del proyecto
+    path('admin/perfiles/', perfiles_lista, name='perfiles-lista'),  # Antes de admin.site.urls (catch-all)
+    path('admin/perfiles/<str:perfil_id>/', perfil_descarga, name='perfil-descarga'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),  # Scrape de Prometheus
+    path('ready', readiness_view, name='ready'),  # Readiness: 200 cuando terminó el calentamiento (api/warmup.py)
     path('api/', include('api.urls')),  # Rutas de la API
     
-    # Documentación de la API
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    # Documentación de la API (drf-spectacular se importa en la primera petición, ver api/startup.py)
+    path('api/schema/', vista_diferida('api.schema.EsquemaView'), name='schema'),  # Precalculado (api/schema.py)
+    path('api/docs/', vista_diferida('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('api/redoc/', vista_diferida('drf_spectacular.views.SpectacularRedocView', url_name='schema'), name='redoc'),
 ]
 
 from django.conf import settings
@@ -0,0 +1,31 @@
+"""
+Configuración de gunicorn: gunicorn config.wsgi
+
+Con `preload_app` el master importa Django, las urls, vistas y serializers una
+sola vez y los workers los heredan por fork. `gc.freeze` (ver api/startup.py)
+mantiene ese heap compartido entre workers en lugar de copiarse en cada uno.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+preload_app = True
+worker_tmp_dir = '/dev/shm'  # Heartbeat en memoria: un disco lento no bloquea a los workers
+
+# Sin GC en el master mientras carga la app: una colección deja huecos en páginas
+# que después se copiarían en cada worker (recomendación de la documentación de gc.freeze)
+gc.disable()
+
+
+def when_ready(server):
+    """Aplicación cargada y sockets abiertos; todavía no hay workers."""
+    from api import startup
+
+    congelados = startup.precargar()
+    server.log.info('Precarga lista: %d objetos congelados (gc.freeze)', congelados)
+
+
+def post_fork(server, worker):
+    gc.enable()